@@ -0,0 +1,693 @@
+#!/usr/bin/env python3
+"""
+JFinder Geo Bench - Micro-benchmarks for the geo pipeline
+=========================================================
+Đo tốc độ các bước nóng của geo_normalize / geo_normalize_admin / geo_qa
+trên bộ GADM 3 thành phố và dataset listings hiện tại.
+
+Usage:
+    python scripts/geo_bench.py pip
+    python scripts/geo_bench.py pip --gadm data/boundaries/gadm41_VNM_3.json --repeat 5
+    python scripts/geo_bench.py dissolve
+    python scripts/geo_bench.py grid --points 2000000
+    python scripts/geo_bench.py reader
+    python scripts/geo_bench.py fetch
+    python scripts/geo_bench.py sample
+    python scripts/geo_bench.py ingest --copies 40
+    python scripts/geo_bench.py ingest --boundaries data/boundaries/gadm41_VNM_3.json
+    python scripts/geo_bench.py service --boundaries data/boundaries/vn_wards.geojson --concurrency 64
+    python scripts/geo_bench.py service --url http://127.0.0.1:8765   # against a running geo_service
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+from urllib.request import urlopen
+
+try:
+    import numpy as np
+    import shapely
+    from shapely.geometry import Point, shape
+    from shapely.ops import unary_union
+except ImportError as e:
+    print(f"Missing package: {e}")
+    print("Run: pip install shapely numpy")
+    sys.exit(1)
+
+from geo_hierarchy import BoundaryHierarchy
+from geo_reader import read_features, peak_rss_mb
+from geo_sampling import PolygonSampler
+from geo_spatial import to_coord_array, batch_contains, PointLocator, PolygonTiers, format_tier_stats
+from geo_grid import GRID_CELL_SIZE, WardGrid, format_grid_stats
+from geo_table import read_csv_table
+
+# ==============================================================================
+# CONFIGURATION
+# ==============================================================================
+
+GADM_FILE = Path("data/boundaries/gadm41_VNM_3.json")
+LISTINGS_CSV = Path("app/data/listings_vn_postmerge.csv")
+CITIES = ["HồChíMinh", "ĐàNẵng", "HàNội"]
+
+# ==============================================================================
+# HELPERS
+# ==============================================================================
+
+def load_city_wards(gadm_file: Path) -> List[Tuple[Dict, object]]:
+    """Load (properties, geometry) for the 3-city wards."""
+    wards = []
+    for props, geom in read_features(gadm_file, provinces=CITIES):
+        if not geom.is_valid:
+            geom = geom.buffer(0)
+        wards.append((props, geom))
+    return wards
+
+
+def sample_points(polygons: List, per_polygon: int, seed: int = 42) -> List[Tuple[int, float, float]]:
+    """Random (polygon_idx, lat, lon) points in each polygon's bounding box."""
+    rng = np.random.default_rng(seed)
+    points = []
+    for i, poly in enumerate(polygons):
+        minx, miny, maxx, maxy = poly.bounds
+        xs = rng.uniform(minx, maxx, per_polygon)
+        ys = rng.uniform(miny, maxy, per_polygon)
+        points.extend((i, y, x) for x, y in zip(xs.tolist(), ys.tolist()))
+    return points
+
+
+def timed(fn, repeat: int) -> float:
+    """Best wall time of `repeat` runs, in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def report(name: str, n: int, seconds: float, baseline: float = None, unit: str = "pts"):
+    """Print one timing line, with speedup against `baseline` if given."""
+    rate = n / seconds if seconds > 0 else float('inf')
+    speedup = f"  ({baseline / seconds:.1f}x)" if baseline else ""
+    print(f"  {name:<32} {seconds * 1000:9.1f} ms  {rate:12,.0f} {unit}/s{speedup}")
+
+# ==============================================================================
+# BENCHMARKS
+# ==============================================================================
+
+def bench_pip(args) -> int:
+    """Unprepared vs prepared vs tiered point-in-polygon on ward and district geometries."""
+    print(f"Loading GADM wards from {args.gadm}...")
+    wards = load_city_wards(args.gadm)
+    if not wards:
+        print("No 3-city wards found")
+        return 1
+    ward_geoms = [g for _, g in wards]
+
+    by_district: Dict[str, List] = {}
+    for props, geom in wards:
+        by_district.setdefault(f"{props['NAME_1']}|{props['NAME_2']}", []).append(geom)
+    district_geoms = [shapely.union_all(g) for g in by_district.values()]
+    print(f"{len(ward_geoms)} wards, {len(district_geoms)} districts")
+
+    for level, geoms in (("ward", ward_geoms), ("district", district_geoms)):
+        points = sample_points(geoms, args.points)
+        raw = [shapely.from_wkb(shapely.to_wkb(g)) for g in geoms]
+        prepared = [shapely.from_wkb(shapely.to_wkb(g)) for g in geoms]
+        shapely.prepare(prepared)
+
+        def run_raw():
+            for i, lat, lon in points:
+                raw[i].contains(Point(lon, lat))
+
+        def run_prepared():
+            for i, lat, lon in points:
+                shapely.contains_xy(prepared[i], lon, lat)
+
+        # Batch per polygon, exact vs simplified tiers (tiers forced on every polygon)
+        grouped = [(np.array([lon for _, _, lon in g]), np.array([lat for _, lat, _ in g]))
+                   for g in np.array_split(np.array(points, dtype=np.float64), len(geoms))]
+        tiers = PolygonTiers(min_vertices=0)
+        start = time.perf_counter()
+        tiers.add(prepared)
+        build_seconds = time.perf_counter() - start
+
+        def run_batch():
+            for geom, (lons, lats) in zip(prepared, grouped):
+                shapely.contains_xy(geom, lons, lats)
+
+        def run_tiered():
+            for geom, (lons, lats) in zip(prepared, grouped):
+                tiers.contains(geom, lons, lats)
+
+        print(f"\n{level}: {len(points)} points")
+        base = timed(run_raw, args.repeat)
+        report("contains(Point) unprepared", len(points), base)
+        report("contains_xy prepared", len(points), timed(run_prepared, args.repeat), base)
+        batch = timed(run_batch, args.repeat)
+        report("contains_xy batch per polygon", len(points), batch, base)
+        report("tiered batch per polygon", len(points), timed(run_tiered, args.repeat), base)
+        print(f"  tiers built in {build_seconds * 1000:.1f} ms; {format_tier_stats(tiers.stats())}")
+    return 0
+
+
+def bench_grid(args) -> int:
+    """STRtree point locator vs ward grid for reverse geocoding and ward PIP of a large batch."""
+    print(f"Loading GADM wards from {args.gadm}...")
+    ward_geoms = [g for _, g in load_city_wards(args.gadm)]
+    if not ward_geoms:
+        print("No 3-city wards found")
+        return 1
+    shapely.prepare(ward_geoms)
+
+    start = time.perf_counter()
+    grid = WardGrid(ward_geoms, args.cell_size)
+    build_seconds = time.perf_counter() - start
+    stats = grid.stats()
+    print(f"{len(ward_geoms)} wards; grid built in {build_seconds:.2f}s: {stats['tables']} tables, "
+          f"{stats['cells']} cells ({stats['boundary_cells']} on boundaries)")
+
+    # Points spread over the metros in proportion to their grid area
+    rng = np.random.default_rng(42)
+    cells = np.array([t['nx'] * t['ny'] for t in grid.tables], dtype=np.float64)
+    lons, lats = [], []
+    for table, n in zip(grid.tables, rng.multinomial(args.points, cells / cells.sum())):
+        lons.append(rng.uniform(table['x0'], table['x0'] + table['nx'] * grid.cell_size, n))
+        lats.append(rng.uniform(table['y0'], table['y0'] + table['ny'] * grid.cell_size, n))
+    lons, lats = np.concatenate(lons), np.concatenate(lats)
+
+    locator = PointLocator(ward_geoms)
+    located = locator.locate(lats, lons)
+    targets = np.where(located >= 0, located, rng.integers(0, len(ward_geoms), len(lats)))
+    target_geoms = [ward_geoms[t] for t in targets.tolist()]
+
+    print(f"\nreverse geocode: {len(lats)} points")
+    base = timed(lambda: locator.locate(lats, lons), args.repeat)
+    report("STRtree PointLocator", len(lats), base)
+    report("ward grid", len(lats), timed(lambda: grid.locate(lats, lons), args.repeat), base)
+
+    print(f"\nward PIP: {len(lats)} points")
+    base = timed(lambda: batch_contains(target_geoms, lats, lons), args.repeat)
+    report("contains_xy batch per polygon", len(lats), base)
+    report("ward grid", len(lats), timed(lambda: grid.contains(targets, lats, lons), args.repeat), base)
+    print(f"  {format_grid_stats(grid.stats())}")
+    return check_grid(grid, ward_geoms, locator, rng)
+
+
+def check_grid(grid: WardGrid, ward_geoms: List[Any], locator: PointLocator, rng, points: int = 20000) -> int:
+    """Grid verdicts vs PointLocator / contains_xy for points in a band around each table's edge."""
+    size = grid.cell_size
+    lons, lats = [], []
+    for table in grid.tables:
+        x0, y0 = table['x0'], table['y0']
+        x1, y1 = x0 + table['nx'] * size, y0 + table['ny'] * size
+        n = max(points // len(grid.tables), 100)
+        # Uniform along the extent's perimeter, up to two cells in or out
+        side = rng.integers(0, 4, n)
+        t = rng.uniform(0, 1, n)
+        off = rng.uniform(-2 * size, 2 * size, n)
+        lons.append(np.select([side == 0, side == 1], [x0 + off, x1 + off], x0 + t * (x1 - x0)))
+        lats.append(np.select([side == 2, side == 3], [y0 + off, y1 + off], y0 + t * (y1 - y0)))
+    lons, lats = np.concatenate(lons), np.concatenate(lats)
+
+    located = locator.locate(lats, lons)
+    targets = np.where(located >= 0, located, rng.integers(-1, len(ward_geoms), len(lats)))
+    expected = np.zeros(len(lats), dtype=bool)
+    known = targets >= 0
+    expected[known] = shapely.contains_xy(np.asarray(ward_geoms, dtype=object)[targets[known]],
+                                          lons[known], lats[known])
+    locate_bad = int(np.count_nonzero(grid.locate(lats, lons) != located))
+    contains_bad = int(np.count_nonzero(grid.contains(targets, lats, lons) != expected))
+    print(f"\nedge check: {len(lats)} points near table edges: "
+          f"{locate_bad} locate / {contains_bad} contains mismatches")
+    return 1 if locate_bad or contains_bad else 0
+
+
+def bench_dissolve(args) -> int:
+    """Incremental per-ward unary_union vs grouped BoundaryHierarchy dissolve."""
+    print(f"Loading GADM wards from {args.gadm}...")
+    wards = load_city_wards(args.gadm)
+    if not wards:
+        print("No 3-city wards found")
+        return 1
+    print(f"{len(wards)} wards")
+
+    def run_incremental():
+        district_index, province_index = {}, {}
+        for props, geom in wards:
+            dist_key = (props['NAME_1'], props['NAME_2'])
+            if dist_key not in district_index:
+                district_index[dist_key] = geom
+            else:
+                district_index[dist_key] = unary_union([district_index[dist_key], geom])
+            if props['NAME_1'] not in province_index:
+                province_index[props['NAME_1']] = geom
+            else:
+                province_index[props['NAME_1']] = unary_union([province_index[props['NAME_1']], geom])
+
+    def run_hierarchy():
+        hierarchy = BoundaryHierarchy(('district', 'province'))
+        for props, geom in wards:
+            hierarchy.add(geom, district=(props['NAME_1'], props['NAME_2']), province=props['NAME_1'])
+        hierarchy.level('district')
+        hierarchy.level('province')
+
+    print()
+    base = timed(run_incremental, args.repeat)
+    report("incremental unary_union", len(wards), base, unit="wards")
+    report("BoundaryHierarchy grouped", len(wards), timed(run_hierarchy, args.repeat), base, unit="wards")
+    return 0
+
+
+def bench_sample(args) -> int:
+    """Bounding-box rejection sampling vs cached triangulation sampler."""
+    print(f"Loading GADM wards from {args.gadm}...")
+    wards = load_city_wards(args.gadm)
+    if not wards:
+        print("No 3-city wards found")
+        return 1
+    geoms = [g for _, g in wards]
+    shapely.prepare(geoms)
+    n = len(geoms) * args.points
+    print(f"{len(geoms)} wards, {args.points} points each")
+
+    rng = np.random.default_rng(42)
+    fallbacks = 0
+
+    def run_rejection():
+        nonlocal fallbacks
+        fallbacks = 0
+        for poly in geoms:
+            minx, miny, maxx, maxy = poly.bounds
+            for _ in range(args.points):
+                for _ in range(100):
+                    if shapely.contains_xy(poly, rng.uniform(minx, maxx), rng.uniform(miny, maxy)):
+                        break
+                else:
+                    fallbacks += 1
+
+    def run_triangles():
+        sampler = PolygonSampler(seed=42)
+        for poly in geoms:
+            sampler.sample(poly, args.points)
+
+    warm = PolygonSampler(seed=42)
+    warm.sample_many(geoms)
+
+    def run_triangles_warm():
+        warm.sample_many([poly for poly in geoms for _ in range(args.points)])
+
+    print()
+    base = timed(run_rejection, args.repeat)
+    report("rejection (<=100 tries)", n, base)
+    report("triangulation (cold cache)", n, timed(run_triangles, args.repeat), base)
+    report("triangulation (warm, sample_many)", n, timed(run_triangles_warm, args.repeat), base)
+    print(f"\n  rejection fell back to centroid {fallbacks} times")
+    return 0
+
+
+def bench_ingest(args) -> int:
+    """csv.DictReader records vs typed column ingestion (geo_table) of the listings CSV."""
+    with open(args.csv, 'r', encoding='utf-8', newline='') as f:
+        header, *rows = list(csv.reader(f))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / args.csv.name
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            for _ in range(args.copies):
+                writer.writerows(rows)
+        n = len(rows) * args.copies
+        print(f"{args.csv} x {args.copies}: {n} rows, {path.stat().st_size / 1e6:.1f} MB")
+
+        def run_dictreader():
+            with open(path, 'r', encoding='utf-8', newline='') as f:
+                return list(csv.DictReader(f))
+
+        def run_dictreader_arrays():
+            # What the batch stage then needs: float coordinates and admin names
+            listings = run_dictreader()
+            to_coord_array([l.get('latitude', 0) for l in listings])
+            to_coord_array([l.get('longitude', 0) for l in listings])
+            for field in ('province', 'district', 'ward'):
+                [l.get(field, '') for l in listings]
+
+        def run_table():
+            read_csv_table(path)
+
+        print()
+        base = timed(run_dictreader_arrays, args.repeat)
+        report("DictReader records only", n, timed(run_dictreader, args.repeat), unit="rows")
+        report("DictReader + coord/admin arrays", n, base, unit="rows")
+        report("typed columns (read_csv_table)", n, timed(run_table, args.repeat), base, unit="rows")
+
+        if args.boundaries is None:
+            return 0
+
+        # End to end: ingest + batch normalize + QC counters, dict records vs typed columns
+        from geo_normalize import (PROVINCE_KEYS_3CITIES, QCReportBuilder, build_index,
+                                   process_listings_sharded, process_table)
+        index = build_index(str(args.boundaries), None, PROVINCE_KEYS_3CITIES, seed=42)
+
+        def run_dict_pipeline():
+            process_listings_sharded(run_dictreader(), index, args.batch_size, qc=QCReportBuilder())
+
+        def run_table_pipeline():
+            process_table(read_csv_table(path), index, args.batch_size, qc=QCReportBuilder())
+
+        print()
+        base = timed(run_dict_pipeline, args.repeat)
+        report("pipeline: DictReader records", n, base, unit="rows")
+        report("pipeline: typed columns", n, timed(run_table_pipeline, args.repeat), base, unit="rows")
+    return 0
+
+
+READER_MODES = ("json.load", "geopandas", "stream")
+
+
+def _reader_child(mode: str, gadm_file: Path):
+    """Load the 3-city wards one way and print time / peak RSS as JSON."""
+    start = time.perf_counter()
+    if mode == "json.load":
+        with open(gadm_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        count = len([shape(ft['geometry']) for ft in data.get('features', [])
+                     if ft.get('properties', {}).get('NAME_1') in CITIES])
+    elif mode == "geopandas":
+        import geopandas as gpd
+        gdf = gpd.read_file(gadm_file)
+        count = len(gdf[gdf['NAME_1'].isin(CITIES)])
+    else:
+        count = len(list(read_features(gadm_file, provinces=CITIES)))
+    print(json.dumps({"count": count, "seconds": time.perf_counter() - start, "rss_mb": peak_rss_mb()}))
+
+
+def bench_reader(args) -> int:
+    """Full-file GADM load vs streaming province-filtered reader (fresh process each)."""
+    if args.child:
+        _reader_child(args.child, args.gadm)
+        return 0
+
+    print(f"Reading {args.gadm} ({args.gadm.stat().st_size / 1e6:.1f} MB)\n")
+    base = None
+    for mode in READER_MODES:
+        proc = subprocess.run(
+            [sys.executable, __file__, 'reader', '--gadm', str(args.gadm), '--child', mode],
+            capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            print(f"  {mode:<12} failed: {proc.stderr.strip().splitlines()[-1:]}")
+            continue
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        base = base or result['seconds']
+        rss = f"{result['rss_mb']:8.0f} MB" if result['rss_mb'] is not None else "      n/a"
+        print(f"  {mode:<12} {result['count']:6d} wards  {result['seconds']:7.2f} s  "
+              f"peak RSS {rss}  ({base / result['seconds']:.1f}x)")
+    return 0
+
+
+class RangeRequestHandler(SimpleHTTPRequestHandler):
+    """Static file handler that honours `Range: bytes=N-` (local GADM stand-in)."""
+
+    def log_message(self, *args):
+        pass
+
+    def send_head(self):
+        range_header = self.headers.get('Range', '')
+        path = Path(self.translate_path(self.path))
+        if not range_header.startswith('bytes=') or not path.is_file():
+            return super().send_head()
+        size = path.stat().st_size
+        start = int(range_header[len('bytes='):].split('-')[0])
+        if start >= size:
+            self.send_response(416)
+            self.send_header('Content-Range', f'bytes */{size}')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return None
+        f = open(path, 'rb')
+        f.seek(start)
+        self.send_response(206)
+        self.send_header('Content-Type', 'application/zip')
+        self.send_header('Content-Range', f'bytes {start}-{size - 1}/{size}')
+        self.send_header('Content-Length', str(size - start))
+        self.end_headers()
+        return f
+
+
+def bench_fetch(args) -> int:
+    """Streamed download, resume, 416 handling and mirror seeding against a local file server."""
+    from geo_fetch import fetch_gadm, sha256_file
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        served = tmp / 'served'
+        served.mkdir()
+        zip_path = served / f"{args.gadm.name}.zip"
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+            zf.write(args.gadm, args.gadm.name)
+        checksum = sha256_file(zip_path)
+        size = zip_path.stat().st_size
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), partial(RangeRequestHandler, directory=str(served)))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/{zip_path.name}"
+        print(f"Serving {zip_path.name} ({size / 1e6:.1f} MB) at {url}\n")
+
+        try:
+            # 1. Fresh streamed download
+            target = tmp / 'fresh' / args.gadm.name
+            start = time.perf_counter()
+            fetch_gadm(url, target, expected_sha256=checksum)
+            report("fresh download + extract", size, time.perf_counter() - start, unit="B")
+
+            # 2. Resume from a half-written .part file
+            target = tmp / 'resume' / args.gadm.name
+            target.parent.mkdir()
+            with open(zip_path, 'rb') as src, open(target.parent / (zip_path.name + '.part'), 'wb') as part:
+                part.write(src.read(size // 2))
+            start = time.perf_counter()
+            fetch_gadm(url, target, expected_sha256=checksum)
+            report("resume from 50% + extract", size, time.perf_counter() - start, unit="B")
+
+            # 3. Seed from a mirror directory, no network
+            target = tmp / 'mirror' / args.gadm.name
+            (served / (zip_path.name + '.sha256')).write_text(checksum, encoding='utf-8')
+            start = time.perf_counter()
+            fetch_gadm(f"http://127.0.0.1:9/{zip_path.name}", target, mirror_dir=served)
+            report("mirror seed + extract", size, time.perf_counter() - start, unit="B")
+
+            # 4. Complete .part file (server answers 416) and one longer than the archive (restart)
+            for name, extra in (('complete', b''), ('oversized', b'garbage')):
+                target = tmp / name / args.gadm.name
+                target.parent.mkdir()
+                (target.parent / (zip_path.name + '.part')).write_bytes(zip_path.read_bytes() + extra)
+                start = time.perf_counter()
+                fetch_gadm(url, target, expected_sha256=checksum)
+                report(f"{name} .part + extract", size, time.perf_counter() - start, unit="B")
+
+            # 5. Plain JSON mirror, verified through its .sha256 sidecar
+            target = tmp / 'mirror_json' / args.gadm.name
+            json_mirror = tmp / 'json_mirror'
+            json_mirror.mkdir()
+            shutil.copyfile(args.gadm, json_mirror / args.gadm.name)
+            (json_mirror / (args.gadm.name + '.sha256')).write_text(sha256_file(args.gadm), encoding='utf-8')
+            start = time.perf_counter()
+            fetch_gadm(f"http://127.0.0.1:9/{zip_path.name}", target, mirror_dir=json_mirror)
+            report("JSON mirror seed (verified)", args.gadm.stat().st_size, time.perf_counter() - start, unit="B")
+        finally:
+            server.shutdown()
+
+        for name in ('fresh', 'resume', 'mirror', 'complete', 'oversized', 'mirror_json'):
+            same = sha256_file(tmp / name / args.gadm.name) == sha256_file(args.gadm)
+            print(f"  {name:<11} extracted file matches source: {same}")
+    return 0
+
+
+async def _http_call(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, method: str, path: str,
+                     body: Optional[bytes] = None) -> Tuple[int, Any]:
+    """One keep-alive HTTP/1.1 request; returns (status, decoded JSON body)."""
+    head = f"{method} {path} HTTP/1.1\r\nHost: bench\r\nContent-Length: {len(body or b'')}\r\n\r\n"
+    writer.write(head.encode('utf-8') + (body or b''))
+    await writer.drain()
+    lines = (await reader.readuntil(b"\r\n\r\n")).decode('latin-1').split("\r\n")
+    length = next(int(line.split(":", 1)[1]) for line in lines if line.lower().startswith("content-length:"))
+    return int(lines[0].split(" ")[1]), json.loads(await reader.readexactly(length))
+
+
+async def _load(host: str, port: int, requests: List[Tuple[str, str, Optional[bytes]]],
+                concurrency: int) -> Tuple[float, List[float], int]:
+    """Send `requests` over `concurrency` keep-alive connections; (seconds, latencies, errors)."""
+    queue = iter(requests)
+    latencies: List[float] = []
+    errors = 0
+
+    async def client():
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for method, path, body in queue:
+                start = time.perf_counter()
+                status, _ = await _http_call(reader, writer, method, path, body)
+                latencies.append(time.perf_counter() - start)
+                errors += status != 200
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return time.perf_counter() - start, latencies, errors
+
+
+def _start_service(args) -> Tuple[subprocess.Popen, str]:
+    """geo_service.py on a free port; returns (process, base URL) once it serves."""
+    cmd = [sys.executable, str(Path(__file__).with_name('geo_service.py')), '--port', '0', '--engine', args.engine,
+           '--tolerance-m', str(args.tolerance_m)]
+    if args.boundaries:
+        cmd += ['--boundaries', str(args.boundaries)]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    for line in proc.stdout:
+        if line.startswith("Serving on "):
+            # Keep draining the pipe so the service never blocks on output
+            threading.Thread(target=proc.stdout.read, daemon=True).start()
+            return proc, line.split()[-1]
+    proc.wait()
+    raise RuntimeError(f"geo_service.py exited with code {proc.returncode}")
+
+
+def bench_service(args) -> int:
+    """Load test of geo_service: single GET locate/validate and POST batches over keep-alive connections."""
+    with open(args.csv, 'r', encoding='utf-8', newline='') as f:
+        records = [
+            {'province': row['province'], 'district': row['district'], 'ward': row['ward'],
+             'latitude': float(row['latitude']), 'longitude': float(row['longitude'])}
+            for row in csv.DictReader(f) if row.get('latitude') and row.get('longitude')
+        ]
+    if not records:
+        print(f"No listings with coordinates in {args.csv}")
+        return 1
+
+    proc = None
+    url = args.url
+    if url is None:
+        print(f"Starting geo_service ({args.engine} engine)...")
+        proc, url = _start_service(args)
+    target = urlsplit(url)
+    host, port = target.hostname, target.port
+    print(f"Service at {url}; {len(records)} listings, {args.concurrency} connections\n")
+
+    def cycle(n: int) -> List[Dict]:
+        return [records[i % len(records)] for i in range(n)]
+
+    locate = [('GET', '/locate?' + urlencode({'lat': r['latitude'], 'lon': r['longitude']}), None)
+              for r in cycle(args.requests)]
+    validate = [('GET', '/validate?' + urlencode({'lat': r['latitude'], 'lon': r['longitude'], 'province': r['province'],
+                                                  'district': r['district'], 'ward': r['ward']}), None)
+                for r in cycle(args.requests)]
+    batch_body = json.dumps({'records': cycle(args.batch)}, ensure_ascii=False).encode('utf-8')
+    batches = [('POST', '/validate', batch_body)] * args.batches
+
+    try:
+        asyncio.run(_load(host, port, locate[:args.concurrency], args.concurrency))  # warm-up
+        for name, requests, per_request, concurrency in (
+            ("GET /locate", locate, 1, args.concurrency),
+            ("GET /validate", validate, 1, args.concurrency),
+            (f"POST /validate x{args.batch}", batches, args.batch, min(args.concurrency, 4)),
+        ):
+            seconds, latencies, errors = asyncio.run(_load(host, port, requests, concurrency))
+            latencies.sort()
+            p50 = latencies[len(latencies) // 2] * 1000
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+            lookups = len(requests) * per_request
+            print(f"  {name:<24} {len(requests):7d} req  {len(requests) / seconds:9,.0f} req/s  "
+                  f"{lookups / seconds:10,.0f} lookups/s  p50 {p50:7.1f} ms  p99 {p99:7.1f} ms"
+                  + (f"  {errors} errors" if errors else ""))
+        with urlopen(f"{url}/stats") as f:
+            stats = json.loads(f.read())
+        print(f"\n  micro-batches: {stats['micro_batches']}; "
+              + (format_grid_stats(stats['ward_grid']) if 'ward_grid' in stats else ""))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Geo pipeline micro-benchmarks')
+    sub = parser.add_subparsers(dest='bench', required=True)
+
+    p = sub.add_parser('pip', help='Prepared vs unprepared vs tiered point-in-polygon')
+    p.add_argument('--gadm', type=Path, default=GADM_FILE, help='GADM level-3 GeoJSON')
+    p.add_argument('--points', type=int, default=200, help='Points per polygon')
+    p.add_argument('--repeat', type=int, default=3, help='Runs per measurement (best is kept)')
+    p.set_defaults(func=bench_pip)
+
+    p = sub.add_parser('grid', help='STRtree locator vs precomputed ward grid on a large point batch')
+    p.add_argument('--gadm', type=Path, default=GADM_FILE, help='GADM level-3 GeoJSON')
+    p.add_argument('--points', type=int, default=1_000_000, help='Points spread over the 3 metros')
+    p.add_argument('--cell-size', type=float, default=GRID_CELL_SIZE, help='Grid cell edge in degrees')
+    p.add_argument('--repeat', type=int, default=3, help='Runs per measurement (best is kept)')
+    p.set_defaults(func=bench_grid)
+
+    p = sub.add_parser('dissolve', help='Incremental vs grouped district/province dissolve')
+    p.add_argument('--gadm', type=Path, default=GADM_FILE, help='GADM level-3 GeoJSON')
+    p.add_argument('--repeat', type=int, default=3, help='Runs per measurement (best is kept)')
+    p.set_defaults(func=bench_dissolve)
+
+    p = sub.add_parser('reader', help='Full GADM load vs streaming filtered reader (time, peak RSS)')
+    p.add_argument('--gadm', type=Path, default=GADM_FILE, help='GADM level-3 GeoJSON')
+    p.add_argument('--child', choices=READER_MODES, help=argparse.SUPPRESS)
+    p.set_defaults(func=bench_reader)
+
+    p = sub.add_parser('fetch', help='GADM download/resume/mirror against a local file server')
+    p.add_argument('--gadm', type=Path, default=GADM_FILE, help='GADM level-3 GeoJSON to serve zipped')
+    p.set_defaults(func=bench_fetch)
+
+    p = sub.add_parser('sample', help='Rejection vs triangulation random-point-in-polygon')
+    p.add_argument('--gadm', type=Path, default=GADM_FILE, help='GADM level-3 GeoJSON')
+    p.add_argument('--points', type=int, default=50, help='Points per polygon')
+    p.add_argument('--repeat', type=int, default=3, help='Runs per measurement (best is kept)')
+    p.set_defaults(func=bench_sample)
+
+    p = sub.add_parser('ingest', help='csv.DictReader vs typed column ingestion of the listings CSV')
+    p.add_argument('--csv', type=Path, default=LISTINGS_CSV, help='Listings CSV')
+    p.add_argument('--copies', type=int, default=20, help='Times the rows are repeated in the benchmark file')
+    p.add_argument('--repeat', type=int, default=5, help='Runs per measurement (best is kept)')
+    p.add_argument('--boundaries', type=Path,
+                   help='Ward GeoJSON; also time ingest + batch normalize + QC counters end to end')
+    p.add_argument('--batch-size', type=int, default=10000, help='Batch size of the end-to-end run')
+    p.set_defaults(func=bench_ingest)
+
+    p = sub.add_parser('service', help='Load test of the geo_service HTTP endpoints')
+    p.add_argument('--url', help='Running service to test (default: start geo_service.py on a free port)')
+    p.add_argument('--engine', choices=('normalize', 'admin'), default='normalize', help='Engine of the started service')
+    p.add_argument('--boundaries', type=Path, help='Ward GeoJSON for the normalize engine')
+    p.add_argument('--tolerance-m', type=float, default=0.0, help='Tolerance of the started service')
+    p.add_argument('--csv', type=Path, default=LISTINGS_CSV, help='Listings CSV the requests are drawn from')
+    p.add_argument('--requests', type=int, default=20000, help='Single requests per endpoint')
+    p.add_argument('--concurrency', type=int, default=32, help='Concurrent keep-alive connections')
+    p.add_argument('--batch', type=int, default=5000, help='Records per POST /validate batch')
+    p.add_argument('--batches', type=int, default=20, help='Number of batch requests')
+    p.set_defaults(func=bench_service)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+JFinder Geo Cache - Persistent binary boundary cache
+====================================================
+Lưu bộ boundary đã lọc, sửa (buffer(0)), chuẩn hóa key và dissolve
+ra đĩa dưới dạng WKB + pickle, để lần chạy sau không phải parse lại
+GADM GeoJSON.
+
+Mỗi entry được khóa theo SHA-256 của file nguồn, namespace của script,
+tham số lọc và CACHE_VERSION. Khi file GADM thay đổi, entry cũ bị bỏ qua
+và cache tự build lại. Mỗi tổ hợp (namespace, tham số, đường dẫn nguồn) có
+một slot riêng trong tên file, nên chỉ entry cũ của cùng slot bị xóa: chạy
+xen kẽ mặc định / --all-provinces hay hai file boundary không đẩy cache
+của nhau ra.
+
+Usage:
+    cache = BoundaryCache('gadm_admin', params=TARGET_PROVINCES_GADM)
+    payload = cache.load(GADM_CACHE_FILE)
+    if payload is None:
+        payload = build_payload()
+        cache.save(GADM_CACHE_FILE, payload)
+"""
+
+import hashlib
+import os
+import pickle
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import shapely
+
+# Bump when the payload layout of any namespace changes
+CACHE_VERSION = 1
+DEFAULT_CACHE_DIR = Path("data/boundaries/cache")
+
+
+def file_digest(path: Path, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def to_wkb(geometries: Iterable[Any]) -> List[bytes]:
+    """Serialize geometries to WKB."""
+    return list(shapely.to_wkb(list(geometries)))
+
+
+def from_wkb(blobs: Iterable[bytes]) -> List[Any]:
+    """Deserialize WKB blobs to shapely geometries."""
+    return list(shapely.from_wkb(list(blobs)))
+
+
+class BoundaryCache:
+    """Versioned on-disk cache for one script's processed boundary set."""
+
+    def __init__(self, namespace: str, params: Any = None, cache_dir: Path = DEFAULT_CACHE_DIR):
+        self.namespace = namespace
+        self.params = repr(params)
+        self.cache_dir = Path(cache_dir)
+        self.last_load_seconds: Optional[float] = None
+        self._digests: Dict[tuple, str] = {}
+
+    def _source_digest(self, source: Path) -> str:
+        stat = os.stat(source)
+        stamp = (str(source), stat.st_size, stat.st_mtime_ns)
+        if stamp not in self._digests:
+            self._digests[stamp] = file_digest(source)
+        return self._digests[stamp]
+
+    def version(self, source: Path) -> str:
+        """Boundary-set version: changes with the source file, params or CACHE_VERSION."""
+        return hashlib.sha256(
+            f"{CACHE_VERSION}|{self.namespace}|{self.params}|{self._source_digest(source)}".encode('utf-8')
+        ).hexdigest()[:16]
+
+    def slot(self, source: Path) -> str:
+        """Digest of (namespace, params, source path): entries that replace each other share it."""
+        return hashlib.sha256(
+            f"{self.namespace}|{self.params}|{Path(source).resolve()}".encode('utf-8')
+        ).hexdigest()[:12]
+
+    def path_for(self, source: Path) -> Path:
+        """Cache file for the current content of `source`."""
+        return self.cache_dir / f"{self.namespace}-{self.slot(source)}-v{CACHE_VERSION}-{self.version(source)}.pkl"
+
+    def load(self, source: Path) -> Optional[Dict]:
+        """Cached payload for `source`, or None when missing or stale."""
+        start = time.perf_counter()
+        path = self.path_for(source)
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+        except Exception as e:
+            print(f"Warning: ignoring unreadable boundary cache {path}: {e}")
+            return None
+        if entry.get('version') != CACHE_VERSION or entry.get('namespace') != self.namespace:
+            return None
+        self.last_load_seconds = time.perf_counter() - start
+        return entry['payload']
+
+    def save(self, source: Path, payload: Dict) -> Path:
+        """Write `payload` for `source` and drop stale entries of the same slot."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(source)
+        entry = {
+            'version': CACHE_VERSION,
+            'namespace': self.namespace,
+            'params': self.params,
+            'source': str(source),
+            'source_sha256': self._source_digest(source),
+            'created_at': datetime.now().isoformat(),
+            'payload': payload,
+        }
+        tmp = path.with_suffix('.tmp')
+        with open(tmp, 'wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+        # Same slot = older content of this source; "{namespace}-v*" = entries from before slots
+        for pattern in (f"{self.namespace}-{self.slot(source)}-v*.pkl", f"{self.namespace}-v*.pkl"):
+            for old in self.cache_dir.glob(pattern):
+                if old != path:
+                    old.unlink()
+        return path
+
+
+def pack_levels(hierarchy) -> Dict[str, Dict[str, list]]:
+    """Dissolved geometries and centroids of every hierarchy level, as WKB."""
+    packed = {}
+    for level in hierarchy.levels:
+        dissolved = hierarchy.level(level)
+        centroids = hierarchy.centroids(level)
+        packed[level] = {
+            'keys': list(dissolved.keys()),
+            'wkb': to_wkb(dissolved.values()),
+            'centroids': [centroids[key] for key in dissolved],
+        }
+    return packed
+
+
+def unpack_levels(hierarchy, packed: Dict[str, Dict[str, list]]):
+    """Install levels produced by pack_levels into a hierarchy."""
+    for level, data in packed.items():
+        hierarchy.set_level(
+            level,
+            dict(zip(data['keys'], from_wkb(data['wkb']))),
+            dict(zip(data['keys'], data['centroids'])),
+        )
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+JFinder Geo Columnar - Compact typed column store for normalized listings
+=========================================================================
+Ghi listings đã chuẩn hóa ra một file NumPy .npz (không nén) theo cột,
+thay vì JSON indent=2 / CSV phải parse lại toàn bộ mỗi lần đọc:
+
+- tọa độ (latitude, longitude, original_*): int32 micro-degree (1e-6 độ,
+  ~0.11 m);
+- province/district/ward/type/market_segment và các cột trạng thái geo:
+  dictionary-encoded (mã int32 + bảng giá trị);
+- số nguyên / số thực / bool: int64 / float64 / bool;
+- chuỗi tự do: một buffer UTF-8 + offsets int64 (kiểu Arrow);
+- giá trị None và key vắng mặt: mask riêng cho từng cột.
+
+Đọc lại chỉ là copy buffer của từng cột, không parse JSON; chuỗi tự do
+chỉ được decode khi cột đó được truy cập.
+
+Usage:
+    write_columns(listings, Path("out/listings_geo.npz"))
+    cols = ColumnarListings(Path("out/listings_geo.npz"))
+    lats, lons = cols.coords('latitude'), cols.coords('longitude')
+    codes, names = cols.codes('district')
+    for record in cols.records(): ...
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from geo_stream import union_fieldnames
+
+COLUMNAR_VERSION = 1
+COORD_SCALE = 1_000_000  # int32 micro-degrees
+COORD_NULL = np.iinfo(np.int32).min
+
+COORD_FIELDS = ('latitude', 'longitude', 'original_latitude', 'original_longitude')
+CATEGORICAL_FIELDS = ('province', 'district', 'ward', 'type', 'market_segment',
+                      'geo_status', 'geo_method', 'admin_match_level')
+
+
+# ==============================================================================
+# WRITER
+# ==============================================================================
+
+def _infer_kind(field: str, values: Sequence[Any]) -> str:
+    """Column kind: coord, category, bool, int, float, str or json."""
+    if field in COORD_FIELDS:
+        return 'coord'
+    if field in CATEGORICAL_FIELDS:
+        return 'category'
+    present = [v for v in values if v is not None]
+    if all(isinstance(v, bool) for v in present):
+        return 'bool' if present else 'str'
+    if all(isinstance(v, int) and not isinstance(v, bool) for v in present):
+        return 'int'
+    if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+        return 'float'
+    if all(isinstance(v, str) for v in present):
+        return 'str'
+    return 'json'
+
+
+def _to_coord(value: Any) -> Optional[int]:
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return int(round(value * COORD_SCALE)) if np.isfinite(value) else None
+
+
+def _encode_strings(values: Sequence[Optional[str]]) -> Tuple[np.ndarray, np.ndarray]:
+    """UTF-8 data buffer + int64 offsets (n + 1) for a string column."""
+    encoded = [('' if v is None else v).encode('utf-8') for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def _encode_column(field: str, kind: str, values: List[Any], arrays: Dict[str, np.ndarray]):
+    null = np.fromiter((v is None for v in values), dtype=bool, count=len(values))
+
+    if kind == 'coord':
+        coords = [_to_coord(v) for v in values]
+        null = np.fromiter((c is None for c in coords), dtype=bool, count=len(coords))
+        arrays[f'{field}.values'] = np.array([COORD_NULL if c is None else c for c in coords], dtype=np.int32)
+    elif kind == 'category':
+        categories: Dict[str, int] = {}
+        codes = np.array([-1 if v is None else categories.setdefault(str(v), len(categories)) for v in values],
+                         dtype=np.int32)
+        arrays[f'{field}.codes'] = codes
+        arrays[f'{field}.categories'] = np.array(list(categories), dtype=str)
+    elif kind == 'bool':
+        arrays[f'{field}.values'] = np.array([bool(v) for v in values], dtype=bool)
+    elif kind == 'int':
+        arrays[f'{field}.values'] = np.array([0 if v is None else v for v in values], dtype=np.int64)
+    elif kind == 'float':
+        arrays[f'{field}.values'] = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    else:
+        if kind == 'json':
+            values = [None if v is None else json.dumps(v, ensure_ascii=False) for v in values]
+        arrays[f'{field}.data'], arrays[f'{field}.offsets'] = _encode_strings(values)
+
+    if null.any():
+        arrays[f'{field}.null'] = null
+
+
+def write_columns(records: Iterable[Dict[str, Any]], path: Path) -> Path:
+    """Write records to a columnar .npz file; returns the path.
+
+    Fields are the union of all record keys (first-seen order); records
+    without a field get it marked absent, so reading back omits it again.
+    """
+    records = list(records)
+    fields = union_fieldnames(records)
+    arrays: Dict[str, np.ndarray] = {}
+    schema = []
+    for field in fields:
+        values = [r.get(field) for r in records]
+        kind = _infer_kind(field, values)
+        _encode_column(field, kind, values, arrays)
+        absent = np.fromiter((field not in r for r in records), dtype=bool, count=len(records))
+        if absent.any():
+            arrays[f'{field}.absent'] = absent
+        schema.append({'name': field, 'kind': kind})
+
+    meta = {'version': COLUMNAR_VERSION, 'count': len(records), 'coord_scale': COORD_SCALE, 'fields': schema}
+    arrays['__schema__'] = np.array(json.dumps(meta, ensure_ascii=False))
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'wb') as f:
+        np.savez(f, **arrays)
+    return path
+
+
+# ==============================================================================
+# READER
+# ==============================================================================
+
+class ColumnarListings:
+    """Read-only view of a file written by write_columns().
+
+    Columns are loaded on first access and kept; nothing is parsed
+    except the free-text columns that are actually used.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._npz = np.load(self.path, allow_pickle=False)
+        meta = json.loads(str(self._npz['__schema__']))
+        if meta.get('version') != COLUMNAR_VERSION:
+            raise ValueError(f"{self.path}: unsupported columnar version {meta.get('version')}")
+        self.count: int = meta['count']
+        self.kinds: Dict[str, str] = {f['name']: f['kind'] for f in meta['fields']}
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._strings: Dict[str, List[Optional[str]]] = {}
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def fields(self) -> List[str]:
+        return list(self.kinds)
+
+    def _array(self, name: str) -> Optional[np.ndarray]:
+        if name not in self._arrays:
+            self._arrays[name] = self._npz[name] if name in self._npz.files else None
+        return self._arrays[name]
+
+    def _kind(self, field: str) -> str:
+        if field not in self.kinds:
+            raise KeyError(f"{self.path}: no column {field!r}")
+        return self.kinds[field]
+
+    def null_mask(self, field: str) -> np.ndarray:
+        """True where the value is None or the record has no such field."""
+        self._kind(field)
+        mask = np.zeros(self.count, dtype=bool)
+        for suffix in ('null', 'absent'):
+            part = self._array(f'{field}.{suffix}')
+            if part is not None:
+                mask |= part
+        return mask
+
+    def coords(self, field: str = 'latitude') -> np.ndarray:
+        """Coordinate column in degrees (float64, NaN where missing)."""
+        if self._kind(field) != 'coord':
+            raise TypeError(f"{field!r} is not a coordinate column")
+        raw = self._array(f'{field}.values')
+        out = raw / COORD_SCALE
+        out[raw == COORD_NULL] = np.nan
+        return out
+
+    def codes(self, field: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(int32 codes, categories) of a dictionary-encoded column; -1 is None."""
+        if self._kind(field) != 'category':
+            raise TypeError(f"{field!r} is not a categorical column")
+        return self._array(f'{field}.codes'), self._array(f'{field}.categories')
+
+    def values(self, field: str) -> np.ndarray:
+        """Typed array of a bool/int/float column (nulls hold 0 / NaN; see null_mask)."""
+        if self._kind(field) not in ('bool', 'int', 'float'):
+            raise TypeError(f"{field!r} is not a numeric column")
+        return self._array(f'{field}.values')
+
+    def strings(self, field: str) -> List[Optional[str]]:
+        """Any column as Python values (str for text/categories, None where null).
+
+        Categorical columns are expanded from their dictionary; free text
+        is decoded from its UTF-8 buffer once and cached.
+        """
+        kind = self._kind(field)
+        if field in self._strings:
+            return self._strings[field]
+        null = self.null_mask(field)
+        if kind == 'category':
+            codes, categories = self.codes(field)
+            names = categories.tolist()
+            out = [names[c] if c >= 0 else None for c in codes.tolist()]
+        elif kind in ('str', 'json'):
+            data = self._array(f'{field}.data').tobytes()
+            offsets = self._array(f'{field}.offsets').tolist()
+            out = [data[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(self.count)]
+            if kind == 'json':
+                out = [json.loads(v) if v else None for v in out]
+        else:
+            raise TypeError(f"{field!r} is a {kind} column; use coords() or values()")
+        self._strings[field] = [None if n else v for v, n in zip(out, null.tolist())]
+        return self._strings[field]
+
+    def column(self, field: str) -> List[Any]:
+        """Any column as a list of Python values (None where null)."""
+        kind = self._kind(field)
+        if kind == 'coord':
+            values = self.coords(field).tolist()
+        elif kind in ('bool', 'int', 'float'):
+            values = self.values(field).tolist()
+        else:
+            return self.strings(field)
+        return [None if n else v for v, n in zip(values, self.null_mask(field).tolist())]
+
+    def records(self) -> Iterator[Dict[str, Any]]:
+        """Rebuild record dicts (coordinates rounded to micro-degrees)."""
+        columns = {field: self.column(field) for field in self.kinds}
+        absent = {field: self._array(f'{field}.absent') for field in self.kinds}
+        for i in range(self.count):
+            yield {
+                field: values[i]
+                for field, values in columns.items()
+                if absent[field] is None or not absent[field][i]
+            }
+
+    def close(self):
+        self._npz.close()
+
+    def __enter__(self) -> 'ColumnarListings':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
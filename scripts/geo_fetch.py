@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+JFinder Geo Fetch - Streaming, resumable GADM acquisition
+=========================================================
+Tải GADM zip theo từng chunk xuống đĩa (resume bằng HTTP Range nếu bị
+ngắt), kiểm tra checksum, rồi giải nén thẳng file JSON vào cache mà
+không parse. Máy build offline có thể seed cache từ một thư mục mirror
+(file share) thay vì tải từ Internet; file JSON trong mirror được kiểm
+tra theo `<file>.sha256` đặt cạnh nó (thiếu thì chỉ cảnh báo).
+
+Environment:
+    GADM_URL         override download URL (e.g. a local file server)
+    GADM_MIRROR_DIR  directory holding gadm41_VNM_3.json[.zip] to copy from
+    GADM_SHA256      expected SHA-256 of the zip archive
+"""
+
+import hashlib
+import os
+import shutil
+import zipfile
+from pathlib import Path
+from typing import Optional
+
+import requests
+
+CHUNK_SIZE = 1 << 20  # 1 MB
+DOWNLOAD_RETRIES = 5
+
+
+def sha256_file(path: Path, chunk_size: int = CHUNK_SIZE) -> str:
+    """SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def verify_checksum(path: Path, expected_sha256: str):
+    """Raise ValueError unless the file's SHA-256 is `expected_sha256`."""
+    actual = sha256_file(path)
+    if actual.lower() != expected_sha256.lower():
+        raise ValueError(f"Checksum mismatch for {path}: expected {expected_sha256}, got {actual}")
+
+
+def verify_archive(zip_path: Path, expected_sha256: Optional[str] = None):
+    """Check the archive checksum (if known) and every member's CRC."""
+    if expected_sha256:
+        verify_checksum(zip_path, expected_sha256)
+    with zipfile.ZipFile(zip_path) as zf:
+        bad = zf.testzip()
+        if bad is not None:
+            raise ValueError(f"Corrupt member in {zip_path}: {bad}")
+
+
+def download_file(url: str, dest: Path, chunk_size: int = CHUNK_SIZE,
+                  retries: int = DOWNLOAD_RETRIES, timeout: int = 120) -> Path:
+    """Stream `url` to `dest`, resuming a partial `<dest>.part` download.
+
+    Servers that ignore the Range header are handled by restarting from
+    byte 0, as is a `.part` file whose size does not match the remote
+    length reported with a 416 (range not satisfiable) answer. The file
+    only appears at `dest` once complete.
+    """
+    part = dest.with_name(dest.name + '.part')
+    dest.parent.mkdir(parents=True, exist_ok=True)
+
+    for attempt in range(1, retries + 1):
+        offset = part.stat().st_size if part.exists() else 0
+        headers = {'Range': f'bytes={offset}-'} if offset else {}
+        try:
+            with requests.get(url, stream=True, timeout=timeout, headers=headers) as response:
+                if response.status_code == 416:
+                    # Nothing left to send: complete only if the .part has exactly the remote length
+                    content_range = response.headers.get('Content-Range', '')
+                    total = content_range.rsplit('/', 1)[1] if '/' in content_range else ''
+                    if total.isdigit() and int(total) == offset:
+                        break
+                    print(f"Partial file ({offset} bytes) does not match remote length "
+                          f"({total or 'unknown'}), restarting download")
+                    part.unlink()
+                    continue
+                response.raise_for_status()
+                if offset and response.status_code != 206:
+                    print("Server ignored Range request, restarting download")
+                    offset = 0
+
+                total = None
+                if response.status_code == 206 and '/' in response.headers.get('Content-Range', ''):
+                    total = int(response.headers['Content-Range'].rsplit('/', 1)[1])
+                elif 'Content-Length' in response.headers:
+                    total = offset + int(response.headers['Content-Length'])
+
+                if offset:
+                    print(f"Resuming download at {offset / 1e6:.1f} MB")
+                with open(part, 'ab' if offset else 'wb') as f:
+                    for chunk in response.iter_content(chunk_size):
+                        f.write(chunk)
+
+            if total is None or part.stat().st_size >= total:
+                break
+            print(f"Download incomplete ({part.stat().st_size}/{total} bytes), retrying...")
+        except (requests.ConnectionError, requests.Timeout,
+                requests.exceptions.ChunkedEncodingError) as e:
+            if attempt == retries:
+                raise
+            print(f"Download interrupted ({e}), retrying {attempt}/{retries}...")
+    else:
+        raise IOError(f"Download of {url} did not complete after {retries} attempts")
+
+    os.replace(part, dest)
+    return dest
+
+
+def extract_json_member(zip_path: Path, dest: Path, chunk_size: int = CHUNK_SIZE) -> Path:
+    """Copy the first .json member of the archive to `dest` without parsing it."""
+    with zipfile.ZipFile(zip_path) as zf:
+        name = next((n for n in zf.namelist() if n.endswith('.json')), None)
+        if name is None:
+            raise Exception("No JSON found in GADM zip")
+        tmp = dest.with_name(dest.name + '.tmp')
+        with zf.open(name) as src, open(tmp, 'wb') as out:
+            shutil.copyfileobj(src, out, chunk_size)
+    os.replace(tmp, dest)
+    return dest
+
+
+def _copy_file(src: Path, dest: Path) -> Path:
+    tmp = dest.with_name(dest.name + '.tmp')
+    shutil.copyfile(src, tmp)
+    os.replace(tmp, dest)
+    return dest
+
+
+def _expected_sha256(path: Path, expected: Optional[str] = None) -> Optional[str]:
+    """Explicit checksum, else a `<file>.sha256` sidecar next to the file."""
+    if expected:
+        return expected
+    sidecar = path.with_name(path.name + '.sha256')
+    if sidecar.exists():
+        return sidecar.read_text(encoding='utf-8').split()[0]
+    return None
+
+
+def fetch_gadm(url: str, cache_file: Path, mirror_dir: Optional[Path] = None,
+               expected_sha256: Optional[str] = None, keep_archive: bool = False) -> Path:
+    """Make sure `cache_file` (GADM GeoJSON) exists; returns its path.
+
+    Sources, in order: the existing cache file, `mirror_dir` (plain JSON or
+    zip), then `url`. Archives are checksum-verified before extraction; a
+    mirror JSON is verified against its `.sha256` sidecar (`expected_sha256`
+    is the archive's checksum), and copied with a warning when it has none.
+    """
+    cache_file = Path(cache_file)
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    if cache_file.exists():
+        print(f"Using cached GADM: {cache_file}")
+        return cache_file
+
+    zip_name = url.rsplit('/', 1)[-1] or f"{cache_file.name}.zip"
+
+    if mirror_dir:
+        mirror_dir = Path(mirror_dir)
+        mirror_json = mirror_dir / cache_file.name
+        mirror_zip = mirror_dir / zip_name
+        if mirror_json.exists():
+            print(f"Seeding GADM from mirror: {mirror_json}")
+            checksum = _expected_sha256(mirror_json)
+            if checksum:
+                verify_checksum(mirror_json, checksum)
+            else:
+                print(f"Warning: {mirror_json} has no {mirror_json.name}.sha256 sidecar, copying it unverified")
+            return _copy_file(mirror_json, cache_file)
+        if mirror_zip.exists():
+            print(f"Seeding GADM from mirror: {mirror_zip}")
+            verify_archive(mirror_zip, _expected_sha256(mirror_zip, expected_sha256))
+            extract_json_member(mirror_zip, cache_file)
+            print(f"Saved: {cache_file}")
+            return cache_file
+        print(f"Mirror {mirror_dir} has no {cache_file.name} or {zip_name}, downloading instead")
+
+    print(f"Downloading GADM from {url}...")
+    zip_path = download_file(url, cache_file.parent / zip_name)
+    try:
+        verify_archive(zip_path, expected_sha256)
+    except ValueError:
+        zip_path.unlink()
+        raise
+    extract_json_member(zip_path, cache_file)
+    if not keep_archive:
+        zip_path.unlink()
+    print(f"Saved: {cache_file}")
+    return cache_file
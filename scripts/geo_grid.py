@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+JFinder Geo Grid - Precomputed ward lookup grid
+===============================================
+Lưới ô vuông (mặc định 0.002° ~ 220 m) phủ từng vùng đô thị (Hà Nội,
+Đà Nẵng, TP.HCM), dựng một lần từ các polygon phường:
+
+- ô nằm trọn bên trong một phường và không chạm phường nào khác: lưu id
+  phường, điểm rơi vào đây được định vị bằng một phép tra mảng;
+- ô cắt qua biên: lưu danh sách ngắn các phường ứng viên, chỉ điểm rơi
+  vào các ô này mới phải kiểm tra hình học thật;
+- ô không chạm phường nào: -1 (ngoài mọi phường).
+
+Các vùng được tách tự động theo bounding box chồng nhau của các phường,
+nên mỗi thành phố có một lưới riêng. Lưới được lưu cạnh boundary cache
+(BoundaryCache, namespace riêng) và nạp lại ở lần chạy sau.
+
+Usage:
+    cache = BoundaryCache('geo_qa_grid', params={'provinces': CITIES, 'cell_size': GRID_CELL_SIZE})
+    grid = load_grid(cache, GADM_FILE, ward_keys, ward_polygons)
+    located = grid.locate(lats, lons)             # same as PointLocator(ward_polygons).locate
+    inside = grid.contains(targets, lats, lons)   # same as contains_xy(ward_polygons[t], lon, lat)
+"""
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import shapely
+
+from geo_spatial import PolygonTiers, grouped_contains
+
+# Cell edge in degrees (~220 m of latitude)
+GRID_CELL_SIZE = 0.002
+# Bump when the table layout changes
+GRID_VERSION = 1
+
+
+class WardGrid:
+    """Cell -> ward lookup tables over a fixed list of polygons.
+
+    Each table covers one cluster of polygons (polygons whose bounding
+    boxes overlap, i.e. one metro area). A cell value >= 0 is the only
+    polygon touching the cell, which contains the whole cell; -1 is a
+    cell no polygon touches; -2 - k points to candidate list k (polygon
+    indices, ascending) of a cell on a boundary. Cells are classified
+    slightly enlarged, so float rounding at cell edges can't misplace a
+    point. `counts` tallies points decided by the table ('cell') and by
+    an exact check ('exact').
+    """
+
+    def __init__(self, polygons: Sequence[Any], cell_size: float = GRID_CELL_SIZE,
+                 _tables: Optional[List[Dict[str, Any]]] = None):
+        self.polygons = np.empty(len(polygons), dtype=object)
+        self.polygons[:] = list(polygons)
+        shapely.prepare(self.polygons)
+        self.cell_size = cell_size
+        self.tables = _tables if _tables is not None else [self._build_table(c) for c in self._clusters()]
+        self.counts = {'cell': 0, 'exact': 0}
+
+    def __len__(self) -> int:
+        return len(self.polygons)
+
+    # --------------------------------------------------------------------------
+    # Build
+    # --------------------------------------------------------------------------
+
+    def _clusters(self) -> List[np.ndarray]:
+        """Polygon indices grouped by overlapping bounding boxes (merged until disjoint)."""
+        clusters: List[List[Any]] = []  # [bounds, members]
+        for i, bounds in enumerate(shapely.bounds(self.polygons).tolist()):
+            if any(v != v for v in bounds):
+                continue  # empty geometry
+            box, members = list(bounds), [i]
+            merged = True
+            while merged:
+                merged = False
+                for cluster in clusters:
+                    other = cluster[0]
+                    if box[0] <= other[2] and other[0] <= box[2] and box[1] <= other[3] and other[1] <= box[3]:
+                        box = [min(box[0], other[0]), min(box[1], other[1]),
+                               max(box[2], other[2]), max(box[3], other[3])]
+                        members += cluster[1]
+                        clusters.remove(cluster)
+                        merged = True
+                        break
+            clusters.append([box, members])
+        return [np.sort(np.asarray(members, dtype=np.intp)) for _, members in clusters]
+
+    def _build_table(self, members: np.ndarray) -> Dict[str, Any]:
+        size = self.cell_size
+        eps = size * 1e-6
+        bounds = shapely.bounds(self.polygons[members])
+        x0, y0 = bounds[:, 0].min() - size, bounds[:, 1].min() - size
+        nx = int(np.ceil((bounds[:, 2].max() + size - x0) / size))
+        ny = int(np.ceil((bounds[:, 3].max() + size - y0) / size))
+
+        pair_cells, pair_polys, pair_full = [], [], []
+        for i, (minx, miny, maxx, maxy) in zip(members.tolist(), bounds.tolist()):
+            gx, gy = np.meshgrid(np.arange(int((minx - x0) // size), int((maxx - x0) // size) + 1),
+                                 np.arange(int((miny - y0) // size), int((maxy - y0) // size) + 1))
+            gx, gy = gx.ravel(), gy.ravel()
+            boxes = shapely.box(x0 + gx * size - eps, y0 + gy * size - eps,
+                                x0 + (gx + 1) * size + eps, y0 + (gy + 1) * size + eps)
+            hit = shapely.intersects(self.polygons[i], boxes)
+            pair_cells.append(gy[hit] * nx + gx[hit])
+            pair_polys.append(np.full(int(hit.sum()), i, dtype=np.intp))
+            pair_full.append(shapely.contains_properly(self.polygons[i], boxes[hit]))
+
+        cells_of = np.concatenate(pair_cells)
+        polys_of = np.concatenate(pair_polys)
+        full = np.concatenate(pair_full)
+        order = np.lexsort((polys_of, cells_of))
+        cells_of, polys_of, full = cells_of[order], polys_of[order], full[order]
+
+        touching = np.bincount(cells_of, minlength=nx * ny)
+        cells = np.full(nx * ny, -1, dtype=np.int32)
+        single = (touching[cells_of] == 1) & full
+        cells[cells_of[single]] = polys_of[single]
+
+        # Boundary cells: every touching polygon is a candidate
+        boundary = ~single
+        boundary_cells, starts = np.unique(cells_of[boundary], return_index=True)
+        cells[boundary_cells] = -2 - np.arange(len(boundary_cells), dtype=np.int32)
+        offsets = np.append(starts, int(boundary.sum())).astype(np.int32)
+        return {'x0': float(x0), 'y0': float(y0), 'nx': nx, 'ny': ny, 'cells': cells,
+                'offsets': offsets, 'candidates': polys_of[boundary].astype(np.int32)}
+
+    # --------------------------------------------------------------------------
+    # Persistence
+    # --------------------------------------------------------------------------
+
+    def to_payload(self, keys: Sequence[Any]) -> Dict[str, Any]:
+        """Tables for BoundaryCache, tagged with the polygon keys they were built for."""
+        return {'version': GRID_VERSION, 'cell_size': self.cell_size, 'keys': list(keys), 'tables': self.tables}
+
+    @classmethod
+    def from_payload(cls, polygons: Sequence[Any], keys: Sequence[Any], payload: Dict[str, Any],
+                     cell_size: float = GRID_CELL_SIZE) -> Optional['WardGrid']:
+        """Grid from cached tables, or None when they were built for other polygons or settings."""
+        if (payload.get('version') != GRID_VERSION or payload.get('cell_size') != cell_size
+                or payload.get('keys') != list(keys)):
+            return None
+        return cls(polygons, cell_size, _tables=payload['tables'])
+
+    def stats(self) -> Dict[str, Any]:
+        """Table sizes and the share of points decided by a table lookup."""
+        return {
+            'tables': len(self.tables),
+            'cells': sum(t['nx'] * t['ny'] for t in self.tables),
+            'boundary_cells': sum(len(t['offsets']) - 1 for t in self.tables),
+            'cell_size': self.cell_size,
+            **summarize_grid_counts(self.counts),
+        }
+
+    def add_counts(self, deltas: Dict[str, int]):
+        """Add lookup counts from a worker process."""
+        for key, count in deltas.items():
+            self.counts[key] += count
+
+    # --------------------------------------------------------------------------
+    # Lookup
+    # --------------------------------------------------------------------------
+
+    def _lookup(self, table: Dict[str, Any], lats: np.ndarray, lons: np.ndarray):
+        """(point indices inside the table's extent, their cell values)."""
+        size = self.cell_size
+        ix = np.floor((lons - table['x0']) / size)
+        iy = np.floor((lats - table['y0']) / size)
+        idx = np.flatnonzero((ix >= 0) & (ix < table['nx']) & (iy >= 0) & (iy < table['ny']))  # NaN is False
+        values = table['cells'][iy[idx].astype(np.intp) * table['nx'] + ix[idx].astype(np.intp)]
+        return idx, values
+
+    def _candidates(self, table: Dict[str, Any], values: np.ndarray):
+        """(position in `values`, candidate polygon) pairs of boundary cells, candidates ascending per point."""
+        k = -2 - values
+        starts = table['offsets'][k].astype(np.intp)
+        lengths = table['offsets'][k + 1].astype(np.intp) - starts
+        pos = np.repeat(np.arange(len(values)), lengths)
+        within = np.arange(len(pos)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        return pos, table['candidates'][np.repeat(starts, lengths) + within]
+
+    def locate(self, lats: np.ndarray, lons: np.ndarray, predicate: str = 'intersects') -> np.ndarray:
+        """Index of the (lowest-index) polygon holding each point; -1 when none (or NaN).
+
+        predicate 'intersects' counts boundary points as inside (like
+        PointLocator); 'contains' only interior points.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        located = np.full(len(lats), -1, dtype=np.intp)
+        looked_up = np.zeros(len(lats), dtype=bool)
+        touched = np.zeros(len(lats), dtype=bool)  # non -1 cell in some table
+        check = shapely.intersects_xy if predicate == 'intersects' else shapely.contains_xy
+        for table in self.tables:
+            # Padded extents of neighbouring tables may overlap: -1 there says nothing
+            # about the other table's polygons, so only found points are settled
+            idx, values = self._lookup(table, lats, lons)
+            looked_up[idx] = True
+            keep = (values != -1) & (located[idx] < 0)
+            idx, values = idx[keep], values[keep]
+            touched[idx] = True
+            located[idx[values >= 0]] = values[values >= 0]
+            edge = np.flatnonzero(values <= -2)
+            self.counts['cell'] += len(idx) - len(edge)
+            self.counts['exact'] += len(edge)
+            if len(edge) == 0:
+                continue
+            pos, cand = self._candidates(table, values[edge])
+            points = idx[edge][pos]
+            hit = check(self.polygons[cand], lons[points], lats[points])
+            first_points, first = np.unique(points[hit], return_index=True)
+            located[first_points] = cand[hit][first]
+        self.counts['cell'] += int(np.count_nonzero(looked_up & ~touched))
+        return located
+
+    def contains(self, targets: np.ndarray, lats: np.ndarray, lons: np.ndarray,
+                 tiers: Optional[PolygonTiers] = None) -> np.ndarray:
+        """Point-in-polygon of each point against polygons[targets[i]] (-1 = no polygon -> outside).
+
+        Same verdicts as shapely.contains_xy; only points in boundary
+        cells are checked against the geometry (through `tiers` when given).
+        """
+        targets = np.asarray(targets, dtype=np.intp)
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        inside = np.zeros(len(targets), dtype=bool)
+        looked_up = np.zeros(len(targets), dtype=bool)
+        decided = np.zeros(len(targets), dtype=bool)
+        for table in self.tables:
+            # -1 cells (e.g. in the padded margin of a neighbouring table) leave the point
+            # to the other tables; any other cell decides it for the target polygon
+            idx, values = self._lookup(table, lats, lons)
+            keep = targets[idx] >= 0
+            idx, values = idx[keep], values[keep]
+            looked_up[idx] = True
+            keep = (values != -1) & ~decided[idx]
+            idx, values = idx[keep], values[keep]
+            decided[idx] = True
+            edge = values <= -2
+            inside[idx[~edge]] = values[~edge] == targets[idx[~edge]]
+            idx = idx[edge]
+            self.counts['cell'] += len(values) - len(idx)
+            self.counts['exact'] += len(idx)
+            if len(idx):
+                inside[idx] = grouped_contains(targets[idx], self.polygons, lats[idx], lons[idx], tiers)
+        self.counts['cell'] += int(np.count_nonzero(looked_up & ~decided))
+        return inside
+
+
+def load_grid(cache: Optional[Any], source: Optional[Path], keys: Sequence[Any], polygons: Sequence[Any],
+              cell_size: float = GRID_CELL_SIZE) -> WardGrid:
+    """Ward grid from the boundary cache when it matches `keys`, else built (and saved when cached)."""
+    if cache is not None and source is not None:
+        payload = cache.load(source)
+        if payload is not None:
+            grid = WardGrid.from_payload(polygons, keys, payload, cell_size)
+            if grid is not None:
+                return grid
+    grid = WardGrid(polygons, cell_size)
+    if cache is not None and source is not None:
+        cache.save(source, grid.to_payload(keys))
+    return grid
+
+
+def summarize_grid_counts(counts: Dict[str, int]) -> Dict[str, Any]:
+    """Points, cell hits, exact checks and cell hit rate from raw grid counts."""
+    total = counts['cell'] + counts['exact']
+    return {
+        'points': total,
+        'cell_hits': counts['cell'],
+        'exact_checks': counts['exact'],
+        'cell_hit_rate': round(counts['cell'] / total, 4) if total else 0,
+    }
+
+
+def format_grid_stats(stats: Dict[str, Any]) -> str:
+    """One-line summary of grid stats for console output."""
+    return (f"Ward grid ({stats['points']} points): {stats['cell_hit_rate'] * 100:.1f}% by cell lookup, "
+            f"{stats['exact_checks']} exact checks")
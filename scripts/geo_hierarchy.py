@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+JFinder Geo Hierarchy - Lazily dissolved admin boundary levels
+==============================================================
+Giữ geometry cấp phường/xã và dissolve các cấp quận/huyện, tỉnh/thành
+theo nhóm (một lần union cho mỗi nhóm), chỉ khi cần dùng lần đầu.
+
+Dùng chung cho geo_normalize.py, geo_normalize_admin.py và geo_qa.py
+thay cho unary_union tăng dần theo từng phường (O(n^2) mỗi quận).
+
+Usage:
+    hierarchy = BoundaryHierarchy(('district', 'province'))
+    hierarchy.add(ward_geom, district=("hanoi", "hoankiem"), province="hanoi")
+    district_geom = hierarchy.level('district')[("hanoi", "hoankiem")]
+"""
+
+import time
+from collections import defaultdict
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import shapely
+
+
+class BoundaryHierarchy:
+    """Ward geometries with lazily dissolved coarser admin levels.
+
+    Levels are listed finest to coarsest. Each level is dissolved with one
+    grouped union on first access, prepared, and cached. A coarser level is
+    built from the dissolved level below it when the keys nest.
+    """
+
+    def __init__(self, levels: Sequence[str] = ('district', 'province')):
+        self.levels = tuple(levels)
+        self.geometries: List[Any] = []
+        self.keys: Dict[str, List[Hashable]] = {level: [] for level in self.levels}
+        self.build_seconds: Dict[str, float] = {}
+        self._dissolved: Dict[str, Dict[Hashable, Any]] = {}
+        self._centroids: Dict[str, Dict[Hashable, Tuple[float, float]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.geometries)
+
+    def add(self, geometry: Any, **keys: Hashable):
+        """Add a ward geometry with its key at every level."""
+        self.geometries.append(geometry)
+        for level in self.levels:
+            self.keys[level].append(keys[level])
+        self._dissolved.clear()
+        self._centroids.clear()
+
+    def count(self, level: str) -> int:
+        """Number of units at a level, without dissolving it."""
+        return len(set(self.keys[level]))
+
+    def is_built(self, level: str) -> bool:
+        return level in self._dissolved
+
+    def level(self, level: str) -> Dict[Hashable, Any]:
+        """Dissolved geometries for a level, keyed as given to add()."""
+        if level not in self._dissolved:
+            self._dissolved[level] = self._dissolve(level)
+        return self._dissolved[level]
+
+    def set_level(self, level: str, dissolved: Dict[Hashable, Any],
+                  centroids: Optional[Dict[Hashable, Tuple[float, float]]] = None):
+        """Install an already dissolved level (e.g. from the boundary cache)."""
+        shapely.prepare(list(dissolved.values()))
+        self._dissolved[level] = dissolved
+        if centroids is not None:
+            self._centroids[level] = centroids
+
+    def centroids(self, level: str) -> Dict[Hashable, Tuple[float, float]]:
+        """(lat, lon) centroid of every unit at a level."""
+        if level not in self._centroids:
+            dissolved = self.level(level)
+            points = shapely.centroid(list(dissolved.values()))
+            self._centroids[level] = {
+                key: (lat, lon)
+                for key, lon, lat in zip(dissolved.keys(), shapely.get_x(points).tolist(),
+                                         shapely.get_y(points).tolist())
+            }
+        return self._centroids[level]
+
+    def _dissolve(self, level: str) -> Dict[Hashable, Any]:
+        start = time.perf_counter()
+        position = self.levels.index(level)
+        finer = self.levels[position - 1] if position > 0 else None
+
+        groups = defaultdict(list)
+        if finer is not None and self._nests(finer, level):
+            # Union the already-dissolved finer units, not every ward again
+            parent = dict(zip(self.keys[finer], self.keys[level]))
+            for key, geometry in self.level(finer).items():
+                groups[parent[key]].append(geometry)
+        else:
+            for key, geometry in zip(self.keys[level], self.geometries):
+                groups[key].append(geometry)
+
+        dissolved = {key: shapely.union_all(geoms) for key, geoms in groups.items()}
+        shapely.prepare(list(dissolved.values()))
+        self.build_seconds[level] = time.perf_counter() - start
+        return dissolved
+
+    def _nests(self, finer: str, coarser: str) -> bool:
+        """True when every finer unit belongs to exactly one coarser unit."""
+        parent = {}
+        for fine_key, coarse_key in zip(self.keys[finer], self.keys[coarser]):
+            if parent.setdefault(fine_key, coarse_key) != coarse_key:
+                return False
+        return True
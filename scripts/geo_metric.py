@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+JFinder Geo Metric - Point-to-boundary distances in metres
+==========================================================
+Khoảng cách (mét) từ điểm lệch tới biên polygon đích, tính trong hệ tọa
+độ phẳng UTM (48N cho Hà Nội / TP.HCM, 49N cho Đà Nẵng):
+
+- mỗi vùng UTM có một pyproj Transformer dựng một lần (cache), áp lên cả
+  mảng tọa độ một lần gọi;
+- mỗi polygon được chiếu sang UTM một lần rồi cache theo polygon;
+- điểm được gom theo polygon đích, mỗi nhóm tính bằng một lần
+  shapely.distance.
+
+Dùng để chấp nhận các điểm lệch vài mét (dung sai) mà không dời điểm, và
+để vẽ histogram khoảng cách trong QC report.
+
+Usage:
+    metric = MetricProjector()
+    distances = metric.boundary_distances(polygons, lats, lons)   # NaN = no polygon / no coords
+    keep = within_tolerance(distances, 25.0)                     # near-misses, not moved
+    histogram = distance_histogram(distances)                    # {'0-5 m': 12, '5-10 m': 3, ...}
+"""
+
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Dict, Sequence, Tuple
+
+import numpy as np
+import pyproj
+import shapely
+
+# Histogram bin edges (metres); the last bin is open-ended
+DISTANCE_BINS_M = (5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+DISTANCE_LABELS = tuple(
+    [f"{lo}-{hi} m" for lo, hi in zip((0,) + DISTANCE_BINS_M, DISTANCE_BINS_M)]
+    + [f"{DISTANCE_BINS_M[-1]}+ m"]
+)
+
+
+def utm_epsg(lon: float) -> int:
+    """EPSG code of the northern-hemisphere UTM zone containing `lon` (32648 = 48N, 32649 = 49N)."""
+    zone = int((lon + 180) // 6) + 1
+    return 32600 + min(max(zone, 1), 60)
+
+
+@lru_cache(maxsize=None)
+def utm_transformer(epsg: int) -> pyproj.Transformer:
+    """Cached WGS84 (lon, lat) -> UTM transformer."""
+    return pyproj.Transformer.from_crs("EPSG:4326", f"EPSG:{epsg}", always_xy=True)
+
+
+def to_utm(epsg: int, lons: np.ndarray, lats: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Project whole lon/lat arrays to UTM zone `epsg` in one call."""
+    return utm_transformer(epsg).transform(np.asarray(lons, dtype=np.float64), np.asarray(lats, dtype=np.float64))
+
+
+def within_tolerance(distances: np.ndarray, tolerance_m: float) -> np.ndarray:
+    """Which distances are within `tolerance_m` metres (never with tolerance 0 or NaN)."""
+    return (np.asarray(distances, dtype=np.float64) <= tolerance_m) & (tolerance_m > 0)
+
+
+def distance_bins(distances: np.ndarray) -> np.ndarray:
+    """Index into DISTANCE_LABELS for each distance; -1 for NaN."""
+    distances = np.asarray(distances, dtype=np.float64)
+    bins = np.searchsorted(np.asarray(DISTANCE_BINS_M, dtype=np.float64), distances, side='right')
+    bins[np.isnan(distances)] = -1
+    return bins
+
+
+def distance_label(distance: float) -> str:
+    """Histogram label of one distance in metres."""
+    return DISTANCE_LABELS[int(distance_bins(np.array([distance]))[0])]
+
+
+def distance_histogram(distances: np.ndarray) -> Dict[str, int]:
+    """Counts per histogram bin (all bins, in order); NaN distances are skipped."""
+    bins = distance_bins(distances)
+    counts = np.bincount(bins[bins >= 0], minlength=len(DISTANCE_LABELS))
+    return {label: int(count) for label, count in zip(DISTANCE_LABELS, counts)}
+
+
+class MetricProjector:
+    """UTM copies of polygons, projected once, for metric distances.
+
+    Projections are keyed by polygon identity (like PolygonSampler's
+    triangulations), so the projector is meant to live as long as the
+    boundary index whose polygons it measures. Each polygon uses the UTM
+    zone of its centroid; its points are projected into the same zone.
+    """
+
+    def __init__(self):
+        # id(polygon) -> (polygon, epsg, projected polygon)
+        self._cache: Dict[int, Tuple[Any, int, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def projected(self, polygon: Any) -> Tuple[int, Any]:
+        """(epsg, polygon in that UTM zone), projected on first use."""
+        entry = self._cache.get(id(polygon))
+        if entry is None:
+            epsg = utm_epsg(shapely.centroid(polygon).x)
+            transformer = utm_transformer(epsg)
+            projected = shapely.transform(
+                polygon, lambda xy: np.column_stack(transformer.transform(xy[:, 0], xy[:, 1])))
+            shapely.prepare(projected)
+            entry = self._cache[id(polygon)] = (polygon, epsg, projected)
+        return entry[1], entry[2]
+
+    def boundary_distances(self, polygons: Sequence[Any], lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        """Distance in metres from each point to its polygon (0 inside, NaN without polygon or coords).
+
+        Records are grouped by target polygon as in batch_contains; each
+        group is one array projection plus one shapely.distance call.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        distances = np.full(len(polygons), np.nan, dtype=np.float64)
+
+        finite = np.isfinite(lats) & np.isfinite(lons)
+        groups = defaultdict(list)
+        for i, polygon in enumerate(polygons):
+            if polygon is not None and finite[i]:
+                groups[id(polygon)].append(i)
+
+        for idx in groups.values():
+            idx = np.asarray(idx, dtype=np.intp)
+            epsg, projected = self.projected(polygons[idx[0]])
+            x, y = to_utm(epsg, lons[idx], lats[idx])
+            distances[idx] = shapely.distance(projected, shapely.points(x, y))
+        return distances
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+JFinder Geo N-gram - Substring index for partial admin-name matching
+====================================================================
+Inverted index n-gram (1..3 ký tự) trên các key đã chuẩn hóa, chia theo
+scope (tỉnh, hoặc tỉnh + quận). Thay cho vòng lặp `query in key` trên
+toàn bộ ward_index / district_index khi key chính xác không khớp.
+
+Kết quả giống hệt linear scan: key đầu tiên (theo thứ tự add) chứa query.
+
+Usage:
+    wards = SubstringIndex()
+    wards.add(("hochiminh", "1"), "tandinh", key)
+    key = wards.first(("hochiminh", "1"), "tandinh")
+"""
+
+from collections import defaultdict
+from typing import Dict, Hashable, Iterator, List, Optional, Set, Tuple
+
+NGRAM_SIZE = 3
+
+
+def ngrams(text: str, n: int) -> Iterator[str]:
+    """All substrings of length n (the text itself when shorter)."""
+    if len(text) <= n:
+        yield text
+        return
+    for i in range(len(text) - n + 1):
+        yield text[i:i + n]
+
+
+class SubstringIndex:
+    """Per-scope n-gram postings mapping a name substring to its entries.
+
+    Grams of every length 1..n are indexed, so short queries ("1", "12")
+    are answered from postings too. Candidates from the gram intersection
+    are verified with `in`, so the result is exact.
+    """
+
+    def __init__(self, n: int = NGRAM_SIZE):
+        self.n = n
+        # scope -> [(name, value)] in insertion order; the position is the entry id
+        self._entries: Dict[Hashable, List[Tuple[str, Hashable]]] = defaultdict(list)
+        # scope -> gram -> entry ids
+        self._postings: Dict[Hashable, Dict[str, Set[int]]] = defaultdict(lambda: defaultdict(set))
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    def add(self, scope: Hashable, name: str, value: Hashable):
+        """Index `name` under `scope`; `value` is returned on a match."""
+        entries = self._entries[scope]
+        entry_id = len(entries)
+        entries.append((name, value))
+        postings = self._postings[scope]
+        for size in range(1, self.n + 1):
+            for gram in set(ngrams(name, size)):
+                postings[gram].add(entry_id)
+
+    def candidates(self, scope: Hashable, query: str) -> List[Hashable]:
+        """Values whose name contains `query`, in insertion order."""
+        entries = self._entries.get(scope)
+        if not entries:
+            return []
+        if not query:
+            return [value for _, value in entries]
+
+        postings = self._postings[scope]
+        ids: Optional[Set[int]] = None
+        # Rarest grams first keeps the intersection small
+        for gram in sorted(set(ngrams(query, self.n)), key=lambda g: len(postings.get(g, ()))):
+            found = postings.get(gram)
+            if not found:
+                return []
+            ids = set(found) if ids is None else ids & found
+            if not ids:
+                return []
+        return [entries[i][1] for i in sorted(ids) if query in entries[i][0]]
+
+    def first(self, scope: Hashable, query: str) -> Optional[Hashable]:
+        """First value (insertion order) whose name contains `query`."""
+        matches = self.candidates(scope, query)
+        return matches[0] if matches else None
@@ -6,23 +6,29 @@ Sử dụng offline Point-in-Polygon (PIP) với GADM boundaries
 
 Usage:
     python scripts/geo_normalize.py --input data/input.json --output data/verified.json
+    python scripts/geo_normalize.py -i data/input.json -o data/verified --columnar   # + verified.npz
+    python scripts/geo_normalize.py -i data/input.json -o data/verified --tolerance-m 25   # keep near-misses
 """
 
 import json
 import csv
 import argparse
+import heapq
 import os
 import sys
-import random
+import time
 from datetime import datetime
+from functools import partial
+from itertools import islice
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any
-from collections import defaultdict
-import unicodedata
-import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Any
+from collections import Counter, defaultdict
 
 # Check for required packages
 try:
+    import numpy as np
+    import shapely
+    from shapely import STRtree
     from shapely.geometry import Point, shape, mapping
     from shapely.ops import transform
     import pyproj
@@ -30,10 +36,28 @@ except ImportError:
     print("Installing required packages...")
     import subprocess
     subprocess.check_call([sys.executable, "-m", "pip", "install", "shapely", "pyproj"])
+    import numpy as np
+    import shapely
+    from shapely import STRtree
     from shapely.geometry import Point, shape, mapping
     from shapely.ops import transform
     import pyproj
 
+from geo_text import normalize, normalize_text, extract_number, cache_stats, format_cache_stats
+from geo_spatial import to_coord_array, grouped_contains, PolygonTiers, format_tier_stats
+from geo_hierarchy import BoundaryHierarchy
+from geo_cache import DEFAULT_CACHE_DIR, BoundaryCache, to_wkb, from_wkb, pack_levels, unpack_levels
+from geo_reader import iter_feature_dicts, format_load_stats
+from geo_sampling import PolygonSampler
+from geo_parallel import imap_shards, shard, default_workers
+from geo_stream import iter_records, batched, union_fieldnames, RecordWriter
+from geo_results import DEFAULT_RESULT_CACHE, ResultCache
+from geo_columnar import write_columns
+from geo_table import ADMIN_FIELDS, ListingTable, read_csv_table
+from geo_qc import QCAggregator, rate
+from geo_metric import DISTANCE_LABELS, MetricProjector, distance_bins, distance_label, within_tolerance
+from geo_grid import GRID_CELL_SIZE, WardGrid, load_grid, format_grid_stats
+
 # ==============================================================================
 # CONSTANTS & CONFIGURATION
 # ==============================================================================
@@ -44,162 +68,162 @@ PROVINCES_3CITIES = {
     "Thành phố Hồ Chí Minh": ["ho chi minh", "hcm", "hồ chí minh", "saigon", "sài gòn", "tp hcm", "tphcm"]
 }
 
-DISTRICT_PREFIXES = ["quận", "huyện", "thành phố", "thị xã", "tx", "tp"]
-WARD_PREFIXES = ["phường", "xã", "thị trấn", "tt", "p."]
-
-# Vietnamese character mapping for normalization
-VIET_CHARS = {
-    'à': 'a', 'á': 'a', 'ả': 'a', 'ã': 'a', 'ạ': 'a',
-    'ă': 'a', 'ằ': 'a', 'ắ': 'a', 'ẳ': 'a', 'ẵ': 'a', 'ặ': 'a',
-    'â': 'a', 'ầ': 'a', 'ấ': 'a', 'ẩ': 'a', 'ẫ': 'a', 'ậ': 'a',
-    'è': 'e', 'é': 'e', 'ẻ': 'e', 'ẽ': 'e', 'ẹ': 'e',
-    'ê': 'e', 'ề': 'e', 'ế': 'e', 'ể': 'e', 'ễ': 'e', 'ệ': 'e',
-    'ì': 'i', 'í': 'i', 'ỉ': 'i', 'ĩ': 'i', 'ị': 'i',
-    'ò': 'o', 'ó': 'o', 'ỏ': 'o', 'õ': 'o', 'ọ': 'o',
-    'ô': 'o', 'ồ': 'o', 'ố': 'o', 'ổ': 'o', 'ỗ': 'o', 'ộ': 'o',
-    'ơ': 'o', 'ờ': 'o', 'ớ': 'o', 'ở': 'o', 'ỡ': 'o', 'ợ': 'o',
-    'ù': 'u', 'ú': 'u', 'ủ': 'u', 'ũ': 'u', 'ụ': 'u',
-    'ư': 'u', 'ừ': 'u', 'ứ': 'u', 'ử': 'u', 'ữ': 'u', 'ự': 'u',
-    'ỳ': 'y', 'ý': 'y', 'ỷ': 'y', 'ỹ': 'y', 'ỵ': 'y',
-    'đ': 'd', 'Đ': 'd'
-}
+# Compact province keys accepted from boundary files ("HàNội", "Thành phố Hà Nội", ...)
+PROVINCE_KEYS_3CITIES = sorted({
+    normalize_text(name).replace(' ', '')
+    for province, aliases in PROVINCES_3CITIES.items()
+    for name in [province, *aliases]
+})
 
 # ==============================================================================
 # HELPER FUNCTIONS
 # ==============================================================================
 
-def normalize_text(text: str) -> str:
-    """Normalize Vietnamese text for matching."""
-    if not text:
-        return ""
-
-    # Lowercase and strip
-    text = text.lower().strip()
-
-    # Normalize unicode
-    text = unicodedata.normalize('NFC', text)
-
-    # Replace Vietnamese chars with ASCII
-    for viet, ascii_char in VIET_CHARS.items():
-        text = text.replace(viet, ascii_char)
-
-    # Remove punctuation except spaces
-    text = re.sub(r'[^\w\s]', '', text)
-
-    # Collapse multiple spaces
-    text = re.sub(r'\s+', ' ', text).strip()
-
-    return text
-
-
-def remove_prefix(name: str, prefixes: List[str]) -> str:
-    """Remove administrative prefixes from name."""
-    name_lower = name.lower().strip()
-
-    for prefix in prefixes:
-        if name_lower.startswith(prefix + " "):
-            return name[len(prefix)+1:].strip()
-        if name_lower.startswith(prefix + "."):
-            return name[len(prefix)+1:].strip()
-
-    return name
-
-
 def normalize_admin_name(name: str, admin_type: str = 'ward') -> str:
     """Normalize administrative name for matching."""
-    if not name:
-        return ""
-
-    # Remove prefixes based on type
-    if admin_type == 'district':
-        name = remove_prefix(name, DISTRICT_PREFIXES)
-    elif admin_type == 'ward':
-        name = remove_prefix(name, WARD_PREFIXES)
-
-    return normalize_text(name)
-
-
-def extract_number(text: str) -> Optional[int]:
-    """Extract number from text like 'Quận 1' -> 1."""
-    match = re.search(r'\d+', text)
-    return int(match.group()) if match else None
+    return normalize(name, admin_type)
 
 
 class BoundaryIndex:
     """Index for admin boundaries with fast lookup."""
 
-    def __init__(self):
+    def __init__(self, seed: Optional[int] = None):
         self.provinces: Dict[str, Any] = {}
         self.districts: Dict[str, Dict[str, Any]] = defaultdict(dict)
         self.wards: Dict[str, Dict[str, Dict[str, Any]]] = defaultdict(lambda: defaultdict(dict))
         self.province_polygons = {}
         self.district_polygons = {}
         self.ward_polygons = {}
-
-    def add_polygon(self, province: str, district: str, ward: str, geometry: Any):
-        """Add a polygon to the index."""
-        prov_norm = normalize_admin_name(province, 'province')
-        dist_norm = normalize_admin_name(district, 'district')
-        ward_norm = normalize_admin_name(ward, 'ward')
-
+        # Numbered wards ("Phường 12"): "prov|dist" -> {ward number -> ward key}
+        self.ward_numbers: Dict[str, Dict[int, str]] = defaultdict(dict)
+        # find_ward_polygon outcomes, for monitoring the fallback path
+        self.ward_lookups = {'exact': 0, 'ward_number': 0, 'miss': 0}
+        # Dissolved district/province geometries, built on first use
+        self.hierarchy = BoundaryHierarchy(('district', 'province'))
+        # Cell lookup grid over the 3-city wards (reverse geocoding and ward PIP),
+        # loaded by build_index or built on first use; wards of other provinces
+        # (--all-provinces) go through an STRtree / shapely contains instead
+        self.grid: Optional[WardGrid] = None
+        self._grid_keys: List[str] = []
+        self._grid_ids: Dict[str, int] = {}
+        self._ward_tree = None
+        self._ward_tree_keys: List[str] = []
+        self._wards_split = False
+        # Uniform in-polygon sampling for pip_random adjustments (seedable)
+        self.sampler = PolygonSampler(seed)
+        # Simplified inner/outer envelopes of dense wards for cheap PIP (built by build_index)
+        self.tiers = PolygonTiers()
+        # Metric (UTM) copies of ward polygons for near-miss distances, projected on first use
+        self.metric = MetricProjector()
+        # Outside points at most this many metres from their ward are kept as is (0 = off)
+        self.tolerance_m = 0.0
+        # Boundary-set version and its BoundaryCache slot (None for the built-in sample boundaries)
+        self.version: Optional[str] = None
+        self.slot: Optional[str] = None
+        # Optional on-disk cache of ward resolutions and PIP verdicts (--result-cache)
+        self.result_cache: Optional[ResultCache] = None
+
+    def add_polygon(self, province: str, district: str, ward: str, geometry: Any) -> Optional[Any]:
+        """Add a GeoJSON polygon to the index; returns the repaired geometry."""
         # Create shapely geometry
         try:
             poly = shape(geometry)
             if not poly.is_valid:
                 poly = poly.buffer(0)
-
-            key = f"{prov_norm}|{dist_norm}|{ward_norm}"
-            self.ward_polygons[key] = {
-                'polygon': poly,
-                'centroid': poly.centroid,
-                'province': province,
-                'district': district,
-                'ward': ward
-            }
-
-            # Also index at district level
-            dist_key = f"{prov_norm}|{dist_norm}"
-            if dist_key not in self.district_polygons:
-                self.district_polygons[dist_key] = {
-                    'polygons': [],
-                    'province': province,
-                    'district': district
-                }
-            self.district_polygons[dist_key]['polygons'].append(poly)
-
-            # Province level
-            if prov_norm not in self.province_polygons:
-                self.province_polygons[prov_norm] = {
-                    'polygons': [],
-                    'province': province
-                }
-            self.province_polygons[prov_norm]['polygons'].append(poly)
+            self.add_geometry(province, district, ward, poly)
+            return poly
 
         except Exception as e:
             print(f"Warning: Could not process polygon for {province}/{district}/{ward}: {e}")
+            return None
 
-    def find_ward_polygon(self, province: str, district: str, ward: str) -> Optional[Dict]:
-        """Find ward polygon by normalized names."""
+    def add_geometry(self, province: str, district: str, ward: str, poly: Any, centroid: Any = None):
+        """Add an already valid shapely geometry to the index."""
         prov_norm = normalize_admin_name(province, 'province')
         dist_norm = normalize_admin_name(district, 'district')
         ward_norm = normalize_admin_name(ward, 'ward')
 
+        # Prepare once so every contains() against this ward is fast
+        shapely.prepare(poly)
+
+        key = f"{prov_norm}|{dist_norm}|{ward_norm}"
+        self.grid = None
+        self._ward_tree = None
+        self._wards_split = False
+        if centroid is None:
+            centroid = poly.centroid
+        self.ward_polygons[key] = {
+            'polygon': poly,
+            'centroid': centroid,
+            # Computed once here so adjustments never re-test or recompute them
+            'centroid_inside': poly.contains(centroid),
+            'province': province,
+            'district': district,
+            'ward': ward
+        }
+
+        # Also index at district level
+        dist_key = f"{prov_norm}|{dist_norm}"
+        ward_num = extract_number(ward_norm)
+        if ward_num is not None:
+            # First ward with a given number wins, as with the old linear scan
+            self.ward_numbers[dist_key].setdefault(ward_num, key)
+        if dist_key not in self.district_polygons:
+            self.district_polygons[dist_key] = {
+                'polygons': [],
+                'province': province,
+                'district': district
+            }
+        self.district_polygons[dist_key]['polygons'].append(poly)
+
+        # Province level
+        if prov_norm not in self.province_polygons:
+            self.province_polygons[prov_norm] = {
+                'polygons': [],
+                'province': province
+            }
+        self.province_polygons[prov_norm]['polygons'].append(poly)
+
+        self.hierarchy.add(poly, district=dist_key, province=prov_norm)
+
+    def ward_lookup_key(self, province: str, district: str, ward: str) -> Tuple[str, str, str, Optional[int]]:
+        """Normalized (province, district, ward, ward number) lookup key for raw names."""
+        return (normalize_admin_name(province, 'province'), normalize_admin_name(district, 'district'),
+                normalize_admin_name(ward, 'ward'), extract_number(ward))
+
+    def resolve_ward_key(self, lookup_key: Tuple[str, str, str, Optional[int]]) -> Tuple[Optional[str], str]:
+        """(ward key, lookup path) for a normalized lookup key.
+
+        The path is 'exact', 'ward_number' or 'miss' (ward key None).
+        """
+        prov_norm, dist_norm, ward_norm, ward_num = lookup_key
+
         key = f"{prov_norm}|{dist_norm}|{ward_norm}"
 
         if key in self.ward_polygons:
-            return self.ward_polygons[key]
+            return key, 'exact'
 
         # Try matching with number extraction for numbered wards
-        ward_num = extract_number(ward)
         if ward_num is not None:
-            for k, v in self.ward_polygons.items():
-                parts = k.split('|')
-                if len(parts) == 3 and parts[0] == prov_norm and parts[1] == dist_norm:
-                    existing_num = extract_number(parts[2])
-                    if existing_num == ward_num:
-                        return v
+            numbered = self.ward_numbers.get(f"{prov_norm}|{dist_norm}")
+            if numbered and ward_num in numbered:
+                return numbered[ward_num], 'ward_number'
 
-        return None
+        return None, 'miss'
+
+    def find_ward_polygon(self, province: str, district: str, ward: str) -> Optional[Dict]:
+        """Find ward polygon by normalized names."""
+        key, path = self.resolve_ward_key(self.ward_lookup_key(province, district, ward))
+        self.ward_lookups[path] += 1
+        return self.ward_polygons[key] if key is not None else None
+
+    def lookup_stats(self) -> Dict[str, Any]:
+        """Ward lookup counts by path (exact key, ward-number fallback, miss)."""
+        stats: Dict[str, Any] = dict(self.ward_lookups)
+        total = sum(self.ward_lookups.values())
+        stats['total'] = total
+        stats['fallback_rate'] = round(self.ward_lookups['ward_number'] / total, 4) if total > 0 else 0
+        return stats
 
     def find_district_centroid(self, province: str, district: str) -> Optional[Tuple[float, float]]:
         """Get centroid of district."""
@@ -208,62 +232,150 @@ class BoundaryIndex:
 
         dist_key = f"{prov_norm}|{dist_norm}"
 
-        if dist_key in self.district_polygons:
-            polys = self.district_polygons[dist_key]['polygons']
-            if polys:
-                from shapely.ops import unary_union
-                merged = unary_union(polys)
-                centroid = merged.centroid
-                return (centroid.y, centroid.x)
-
-        return None
+        # Centroids are computed once per hierarchy build (or loaded from the
+        # boundary cache); sample boundaries carry a fixed centroid instead
+        centroid = self.hierarchy.centroids('district').get(dist_key)
+        if centroid is None and dist_key in self.district_polygons:
+            centroid = self.district_polygons[dist_key].get('centroid')
+        return centroid
 
     def find_province_centroid(self, province: str) -> Optional[Tuple[float, float]]:
         """Get centroid of province."""
         prov_norm = normalize_admin_name(province, 'province')
 
-        if prov_norm in self.province_polygons:
-            polys = self.province_polygons[prov_norm]['polygons']
-            if polys:
-                from shapely.ops import unary_union
-                merged = unary_union(polys)
-                centroid = merged.centroid
-                return (centroid.y, centroid.x)
-
-        return None
+        centroid = self.hierarchy.centroids('province').get(prov_norm)
+        if centroid is None and prov_norm in self.province_polygons:
+            centroid = self.province_polygons[prov_norm].get('centroid')
+        return centroid
+
+    def _split_wards(self):
+        """Ward keys covered by the grid (3-city provinces) and the rest, computed once."""
+        if self._wards_split:
+            return
+        metro = set(PROVINCE_KEYS_3CITIES)
+        self._grid_keys, self._ward_tree_keys = [], []
+        for key, entry in self.ward_polygons.items():
+            in_metro = normalize_text(entry['province']).replace(' ', '') in metro
+            (self._grid_keys if in_metro else self._ward_tree_keys).append(key)
+        self._grid_ids = {key: i for i, key in enumerate(self._grid_keys)}
+        self._wards_split = True
+
+    def ward_grid(self, cache: Optional[BoundaryCache] = None, source: Optional[str] = None) -> Optional[WardGrid]:
+        """The 3-city ward lookup grid, built (or loaded from `cache` for `source`) once; None without 3-city wards."""
+        if self.grid is None:
+            self._split_wards()
+            if self._grid_keys:
+                self.grid = load_grid(cache, source, self._grid_keys,
+                                      [self.ward_polygons[k]['polygon'] for k in self._grid_keys])
+        return self.grid
+
+    def _get_ward_tree(self) -> Optional[STRtree]:
+        """Build (once) the STRtree over the wards outside the grid."""
+        self._split_wards()
+        if self._ward_tree is None and self._ward_tree_keys:
+            self._ward_tree = STRtree([self.ward_polygons[k]['polygon'] for k in self._ward_tree_keys])
+        return self._ward_tree
+
+    def locate(self, lat: float, lon: float) -> Optional[Dict]:
+        """Reverse geocode a point to the ward entry that contains it."""
+        return self.locate_many([lat], [lon])[0]
+
+    def locate_many(self, lats, lons) -> List[Optional[Dict]]:
+        """Reverse geocode many points at once.
+
+        Returns one ward entry (province/district/ward/polygon) per point,
+        or None when the point is outside every indexed ward.
+        """
+        results: List[Optional[Dict]] = [None] * len(lats)
+        if not results:
+            return results
+        lats = np.asarray(lats, dtype=float)
+        lons = np.asarray(lons, dtype=float)
+
+        grid = self.ward_grid()
+        if grid is not None:
+            located = grid.locate(lats, lons, predicate='contains')
+            results = [self.ward_polygons[self._grid_keys[w]] if w >= 0 else None for w in located.tolist()]
+
+        tree = self._get_ward_tree()
+        missing = np.flatnonzero([r is None for r in results])
+        if tree is not None and len(missing):
+            point_idx, ward_idx = tree.query(shapely.points(lons[missing], lats[missing]), predicate='within')
+            for p, w in zip(missing[point_idx].tolist(), ward_idx.tolist()):
+                if results[p] is None:
+                    results[p] = self.ward_polygons[self._ward_tree_keys[w]]
+        return results
+
+    def contains_wards(self, ward_keys: List[Optional[str]], lats: np.ndarray, lons: np.ndarray,
+                       group: Optional[np.ndarray] = None) -> np.ndarray:
+        """PIP of each point against its ward (None = no ward, outside).
+
+        3-city wards go through the ward grid, other wards through a
+        (tiered) contains call per ward. With `group`, point i is checked
+        against ward_keys[group[i]].
+        """
+        grid = self.ward_grid()
+        targets = np.fromiter((-1 if k is None else self._grid_ids.get(k, -1) for k in ward_keys),
+                              dtype=np.intp, count=len(ward_keys))
+        others = np.array([k is not None and k not in self._grid_ids for k in ward_keys], dtype=bool)
+        if group is None:
+            group = np.arange(len(ward_keys))
+        inside = grid.contains(targets[group], lats, lons, self.tiers) if grid is not None \
+            else np.zeros(len(lats), dtype=bool)
+        rest = np.flatnonzero(others[group])
+        if len(rest):
+            polygons = [self.ward_polygons[k]['polygon'] if other else None for k, other in zip(ward_keys, others.tolist())]
+            inside[rest] = grouped_contains(group[rest], polygons, lats[rest], lons[rest], self.tiers)
+        return inside
 
     def point_in_polygon(self, lat: float, lon: float, polygon: Any) -> bool:
         """Check if point is inside polygon."""
-        point = Point(lon, lat)
-        return polygon.contains(point)
-
-    def get_random_point_in_polygon(self, polygon: Any) -> Tuple[float, float]:
-        """Get random point inside polygon."""
-        minx, miny, maxx, maxy = polygon.bounds
+        return bool(self.tiers.contains(polygon, [lon], [lat])[0])
 
-        for _ in range(100):
-            random_point = Point(
-                random.uniform(minx, maxx),
-                random.uniform(miny, maxy)
-            )
-            if polygon.contains(random_point):
-                return (random_point.y, random_point.x)
+    def boundary_distances(self, polygons: List[Any], lats, lons) -> np.ndarray:
+        """Metres from each point to its ward polygon (NaN without polygon or coordinates)."""
+        return self.metric.boundary_distances(polygons, lats, lons)
 
-        # Fallback to centroid
-        centroid = polygon.centroid
-        return (centroid.y, centroid.x)
+    def within_tolerance(self, distances) -> np.ndarray:
+        """Which outside points are close enough to their ward to keep (NaN never is)."""
+        return within_tolerance(distances, self.tolerance_m)
 
+    def get_random_point_in_polygon(self, polygon: Any) -> Tuple[float, float]:
+        """Get a uniform random point inside polygon."""
+        return self.sampler.sample_one(polygon)
+
+
+def load_geojson_boundaries(geojson_path: str, index: BoundaryIndex,
+                            cache_dir: Optional[Path] = DEFAULT_CACHE_DIR,
+                            provinces: Optional[List[str]] = PROVINCE_KEYS_3CITIES) -> int:
+    """Load GeoJSON boundaries into index.
+
+    Features are streamed one at a time; when `provinces` (compact
+    normalized names) is given, only matching provinces get a geometry.
+    Repaired ward geometries, their centroids and the dissolved
+    district/province levels are kept in the on-disk boundary cache
+    (keyed by the GeoJSON file hash) unless cache_dir is None.
+    """
+    cache = BoundaryCache('geo_normalize', params=provinces, cache_dir=cache_dir) if cache_dir else None
+    version_cache = cache or BoundaryCache('geo_normalize', params=provinces)
+    index.version = version_cache.version(geojson_path)
+    index.slot = version_cache.slot(geojson_path)
+    payload = cache.load(geojson_path) if cache else None
+    if payload is not None:
+        centroids = shapely.points(payload['centroids'])
+        for (province, district, ward), poly, centroid in zip(payload['names'], from_wkb(payload['wkb']), centroids):
+            index.add_geometry(province, district, ward, poly, centroid)
+        unpack_levels(index.hierarchy, payload['levels'])
+        print(f"Loaded boundary cache in {cache.last_load_seconds:.2f}s")
+        return payload['count']
 
-def load_geojson_boundaries(geojson_path: str, index: BoundaryIndex) -> int:
-    """Load GeoJSON boundaries into index."""
     count = 0
+    names = []
+    polys = []
+    wanted = set(provinces) if provinces is not None else None
+    start = time.perf_counter()
 
-    with open(geojson_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    features = data.get('features', [])
-
-    for feature in features:
+    for feature in iter_feature_dicts(geojson_path):
         props = feature.get('properties', {})
         geometry = feature.get('geometry')
 
@@ -275,10 +387,29 @@ def load_geojson_boundaries(geojson_path: str, index: BoundaryIndex) -> int:
         district = props.get('NAME_2', props.get('district', props.get('VARNAME_2', '')))
         ward = props.get('NAME_3', props.get('ward', props.get('VARNAME_3', '')))
 
+        if wanted is not None and normalize_text(province).replace(' ', '') not in wanted:
+            continue
+
         if province and district and ward:
-            index.add_polygon(province, district, ward, geometry)
+            poly = index.add_polygon(province, district, ward, geometry)
+            if poly is not None:
+                names.append((province, district, ward))
+                polys.append(poly)
             count += 1
 
+    print(format_load_stats(count, time.perf_counter() - start))
+
+    if cache:
+        centroids = shapely.centroid(polys)
+        path = cache.save(geojson_path, {
+            'count': count,
+            'names': names,
+            'wkb': to_wkb(polys),
+            'centroids': list(zip(shapely.get_x(centroids).tolist(), shapely.get_y(centroids).tolist())),
+            'levels': pack_levels(index.hierarchy),
+        })
+        print(f"Saved boundary cache: {path}")
+
     return count
 
 
@@ -362,8 +493,19 @@ def generate_sample_boundaries() -> BoundaryIndex:
 # MAIN PROCESSING
 # ==============================================================================
 
-def process_listing(listing: Dict, index: BoundaryIndex) -> Dict:
-    """Process a single listing for geo normalization."""
+def process_listing(listing: Dict, index: BoundaryIndex, inside: Optional[bool] = None,
+                    ward_data: Optional[Dict] = None,
+                    random_point: Optional[Tuple[float, float]] = None,
+                    distance_m: Optional[float] = None) -> Dict:
+    """Process a single listing for geo normalization.
+
+    `inside`, `ward_data` and `distance_m` are the ward point-in-polygon
+    verdict, ward entry and distance to the ward boundary precomputed by
+    process_listings_batch; when `inside` is None they are computed here.
+    `random_point` is a pre-drawn (lat, lon) for a pip_random adjustment;
+    when None one is drawn here. Outside points within the index's
+    tolerance keep their coordinates (geo_method 'within_tolerance').
+    """
     result = listing.copy()
 
     province = listing.get('province', '')
@@ -377,34 +519,61 @@ def process_listing(listing: Dict, index: BoundaryIndex) -> Dict:
     result['geo_status'] = 'matched'
     result['admin_match_level'] = 'none'
     result['mismatch_reason'] = ''
+    result['located_district'] = ''
+    result['located_ward'] = ''
+    result['boundary_distance_m'] = None
 
     # Try to find ward polygon
-    ward_data = index.find_ward_polygon(province, district, ward)
+    if inside is None:
+        ward_data = index.find_ward_polygon(province, district, ward)
 
     if ward_data:
         polygon = ward_data['polygon']
         result['admin_match_level'] = 'ward'
 
         # Check if current lat/lon is in polygon
-        if lat and lon and index.point_in_polygon(lat, lon, polygon):
+        if inside is None:
+            inside = bool(lat and lon and index.point_in_polygon(float(lat), float(lon), polygon))
+            if not inside and lat and lon:
+                distance_m = float(index.boundary_distances([polygon], [float(lat)], [float(lon)])[0])
+
+        if inside:
             result['geo_method'] = 'unchanged'
             result['geo_status'] = 'matched'
         else:
-            # Use centroid
-            centroid = ward_data['centroid']
-            if polygon.contains(centroid):
-                result['latitude'] = centroid.y
-                result['longitude'] = centroid.x
-                result['geo_method'] = 'pip_centroid'
+            if distance_m is not None and distance_m == distance_m:
+                result['boundary_distance_m'] = round(distance_m, 1)
+
+            if index.within_tolerance(distance_m):
+                # Near-miss: keep the original coordinates
+                result['geo_method'] = 'within_tolerance'
+                result['mismatch_reason'] = (f'Original coordinates {distance_m:.1f} m outside ward boundary '
+                                             f'(within tolerance)')
             else:
-                # Use random point
-                new_lat, new_lon = index.get_random_point_in_polygon(polygon)
-                result['latitude'] = new_lat
-                result['longitude'] = new_lon
-                result['geo_method'] = 'pip_random'
+                # Use centroid
+                if ward_data['centroid_inside']:
+                    centroid = ward_data['centroid']
+                    result['latitude'] = centroid.y
+                    result['longitude'] = centroid.x
+                    result['geo_method'] = 'pip_centroid'
+                else:
+                    # Use random point
+                    if random_point is None:
+                        random_point = index.get_random_point_in_polygon(polygon)
+                    new_lat, new_lon = random_point
+                    result['latitude'] = new_lat
+                    result['longitude'] = new_lon
+                    result['geo_method'] = 'pip_random'
 
-            result['geo_status'] = 'adjusted'
-            result['mismatch_reason'] = 'Original coordinates outside ward boundary'
+                result['geo_status'] = 'adjusted'
+                result['mismatch_reason'] = 'Original coordinates outside ward boundary'
+
+            # Report where the original coordinates actually are
+            located = index.locate(float(lat), float(lon)) if lat and lon else None
+            if located:
+                result['located_district'] = located['district']
+                result['located_ward'] = located['ward']
+                result['mismatch_reason'] += f" (located in {located['ward']}, {located['district']})"
     else:
         # Fallback to district centroid
         dist_centroid = index.find_district_centroid(province, district)
@@ -436,111 +605,430 @@ def process_listing(listing: Dict, index: BoundaryIndex) -> Dict:
     return result
 
 
-def generate_report(listings: List[Dict]) -> Dict:
-    """Generate QC report from processed listings."""
-    report = {
-        'timestamp': datetime.now().isoformat(),
-        'method': 'offline point-in-polygon using GADM boundaries',
-        'total_listings': len(listings),
-        'summary': {
-            'matched': 0,
-            'adjusted': 0,
-            'failed': 0
-        },
-        'by_method': {},
-        'by_province': [],
-        'by_district': [],
-        'by_ward': [],
-        'missing_polygons': []
+def resolve_wards(index: BoundaryIndex, keys: List[Tuple]) -> List[Tuple[Optional[str], str]]:
+    """(ward key, lookup path) per ward lookup key, through the result cache when attached.
+
+    Lookups are not counted here; callers add them to index.ward_lookups.
+    """
+    if index.result_cache is not None:
+        return index.result_cache.resolve_many(keys, index.resolve_ward_key)
+    return [index.resolve_ward_key(key) for key in keys]
+
+
+def process_listings_batch(listings: List[Dict], index: BoundaryIndex) -> List[Dict]:
+    """Process listings with vectorized PIP (ward grid, then one call per boundary ward).
+
+    Resolves every listing's ward polygon, settles PIP through the ward grid
+    (points in boundary cells are grouped by polygon and checked with one
+    (tiered) contains call per polygon), draws the random points of
+    all pip_random adjustments in one batch per polygon, then fills
+    per-record fields with process_listing. With a result cache attached,
+    ward resolutions and PIP verdicts come from it when known.
+    """
+    results = index.result_cache
+    keys = [index.ward_lookup_key(l.get('province', ''), l.get('district', ''), l.get('ward', ''))
+            for l in listings]
+    resolved = resolve_wards(index, keys)
+    for _, path in resolved:
+        index.ward_lookups[path] += 1
+    wards = [index.ward_polygons[key] if key is not None else None for key, _ in resolved]
+    polygons = [w['polygon'] if w else None for w in wards]
+
+    lats = to_coord_array([l.get('latitude', 0) for l in listings])
+    lons = to_coord_array([l.get('longitude', 0) for l in listings])
+    if results is not None:
+        inside = results.contains_many([key for key, _ in resolved], polygons, lats, lons, index.tiers)
+    else:
+        inside = index.contains_wards([key for key, _ in resolved], lats, lons)
+
+    # Metric distance of outside points to their ward; near-misses are kept
+    distances = index.boundary_distances([p if not inside[i] else None for i, p in enumerate(polygons)],
+                                         lats, lons)
+    near = index.within_tolerance(distances)
+
+    # Wards whose centroid is outside get a random interior point instead
+    needs_random = [
+        w['polygon'] if w and not inside[i] and not near[i] and not w['centroid_inside'] else None
+        for i, w in enumerate(wards)
+    ]
+    random_lats, random_lons = index.sampler.sample_many(needs_random)
+
+    return [
+        process_listing(listing, index, inside=bool(inside[i]), ward_data=wards[i],
+                        random_point=(float(random_lats[i]), float(random_lons[i]))
+                        if needs_random[i] is not None else None,
+                        distance_m=float(distances[i]))
+        for i, listing in enumerate(listings)
+    ]
+
+
+# Geo fields added by process_listing, in output order
+GEO_FIELDS = ('geo_method', 'geo_status', 'admin_match_level', 'mismatch_reason',
+              'located_district', 'located_ward', 'boundary_distance_m')
+
+
+def process_table_batch(table: ListingTable, index: BoundaryIndex) -> Dict[str, List[Any]]:
+    """Geo output columns for a ListingTable, computed on its arrays.
+
+    Same decisions as process_listings_batch, without per-row dicts: each
+    distinct (province, district, ward) code triple is resolved once, PIP
+    runs once per triple group, centroid fallbacks are looked up per group
+    and reverse geocoding runs in one locate_many call. Returns latitude,
+    longitude and the GEO_FIELDS as lists (one value per row).
+    """
+    n = len(table)
+    codes = [table.categorical(field) for field in ADMIN_FIELDS]
+    if n == 0:
+        return {field: [] for field in ('latitude', 'longitude') + GEO_FIELDS}
+    triples, group = np.unique(np.stack([c for c, _ in codes], axis=1), axis=0, return_inverse=True)
+    group = group.reshape(-1)
+    names = [tuple(cats[code] or '' for code, (_, cats) in zip(triple, codes)) for triple in triples.tolist()]
+
+    # Ward resolution, one per distinct triple (lookups counted per row)
+    resolved = resolve_wards(index, [index.ward_lookup_key(*name) for name in names])
+    for (_, path), count in zip(resolved, np.bincount(group, minlength=len(names)).tolist()):
+        index.ward_lookups[path] += count
+    wards = [index.ward_polygons[key] if key is not None else None for key, _ in resolved]
+    polygons = [w['polygon'] if w else None for w in wards]
+
+    lats, lons = table.lats, table.lons
+    if index.result_cache is not None:
+        rows = group.tolist()
+        inside = index.result_cache.contains_many([resolved[g][0] for g in rows], [polygons[g] for g in rows],
+                                                  lats, lons, index.tiers)
+    else:
+        inside = index.contains_wards([key for key, _ in resolved], lats, lons, group)
+
+    has_ward = np.array([w is not None for w in wards])[group]
+    centroid_inside = np.array([bool(w and w['centroid_inside']) for w in wards])[group]
+    outside = has_ward & ~inside
+
+    # Metric distance of outside rows to their ward; near-misses are kept
+    distances = np.full(n, np.nan)
+    idx = np.flatnonzero(outside)
+    distances[idx] = index.boundary_distances([polygons[g] for g in group[idx].tolist()], lats[idx], lons[idx])
+    near = outside & index.within_tolerance(distances)
+    adjust = outside & ~near
+    use_centroid = adjust & centroid_inside
+    use_random = adjust & ~centroid_inside
+
+    # Ward-level adjustments
+    out_lat = lats.copy()
+    out_lon = lons.copy()
+    centroid_lat = np.array([w['centroid'].y if w else np.nan for w in wards])[group]
+    centroid_lon = np.array([w['centroid'].x if w else np.nan for w in wards])[group]
+    out_lat[use_centroid] = centroid_lat[use_centroid]
+    out_lon[use_centroid] = centroid_lon[use_centroid]
+    random_lats, random_lons = index.sampler.sample_many(
+        [polygons[g] if r else None for g, r in zip(group.tolist(), use_random.tolist())])
+    out_lat[use_random] = random_lats[use_random]
+    out_lon[use_random] = random_lons[use_random]
+
+    method = np.select([use_centroid, use_random, near], ['pip_centroid', 'pip_random', 'within_tolerance'],
+                       'unchanged').astype(object)
+    status = np.where(adjust, 'adjusted', 'matched').astype(object)
+    level = np.where(has_ward, 'ward', 'none').astype(object)
+    reason = np.where(adjust, 'Original coordinates outside ward boundary', '').astype(object)
+    for i in np.flatnonzero(near).tolist():
+        reason[i] = f'Original coordinates {distances[i]:.1f} m outside ward boundary (within tolerance)'
+    located_district = np.full(n, '', dtype=object)
+    located_ward = np.full(n, '', dtype=object)
+
+    # Where the original coordinates of adjusted rows actually are
+    idx = np.flatnonzero(outside & np.isfinite(lats) & np.isfinite(lons))
+    for i, located in zip(idx.tolist(), index.locate_many(lats[idx], lons[idx])):
+        if located:
+            located_district[i] = located['district']
+            located_ward[i] = located['ward']
+            reason[i] += f" (located in {located['ward']}, {located['district']})"
+
+    # Rows without a ward polygon: district, then province centroid
+    for g, ward in enumerate(wards):
+        if ward is not None:
+            continue
+        rows = np.flatnonzero(group == g)
+        province, district, _ = names[g]
+        dist_centroid = index.find_district_centroid(province, district)
+        prov_centroid = index.find_province_centroid(province) if not dist_centroid else None
+        if dist_centroid or prov_centroid:
+            lat, lon = dist_centroid or prov_centroid
+            out_lat[rows], out_lon[rows] = lat, lon
+            method[rows] = 'pip_centroid'
+            status[rows] = 'adjusted'
+            level[rows] = 'district' if dist_centroid else 'province'
+            reason[rows] = ('Ward polygon not found, using district centroid' if dist_centroid
+                            else 'District not found, using province centroid')
+        else:
+            status[rows] = 'failed'
+            reason[rows] = 'No matching boundary found'
+
+    return {
+        'latitude': [None if v != v else v for v in out_lat.tolist()],
+        'longitude': [None if v != v else v for v in out_lon.tolist()],
+        'geo_method': method.tolist(),
+        'geo_status': status.tolist(),
+        'admin_match_level': level.tolist(),
+        'mismatch_reason': reason.tolist(),
+        'located_district': located_district.tolist(),
+        'located_ward': located_ward.tolist(),
+        'boundary_distance_m': [None if v != v else round(v, 1) for v in distances.tolist()],
     }
 
-    # Count by status and method
-    for l in listings:
-        status = l.get('geo_status', 'unknown')
-        method = l.get('geo_method', 'unknown')
-
-        report['summary'][status] = report['summary'].get(status, 0) + 1
-        report['by_method'][method] = report['by_method'].get(method, 0) + 1
-
-    # Aggregate by province
-    prov_stats = defaultdict(lambda: {'total': 0, 'matched': 0, 'adjusted': 0, 'failed': 0})
-    dist_stats = defaultdict(lambda: {'total': 0, 'matched': 0, 'adjusted': 0, 'failed': 0})
-    ward_stats = defaultdict(lambda: {'total': 0, 'matched': 0, 'adjusted': 0, 'failed': 0})
-    missing = set()
-
-    for l in listings:
-        prov = l.get('province', 'Unknown')
-        dist = l.get('district', 'Unknown')
-        ward = l.get('ward', 'Unknown')
-        status = l.get('geo_status', 'unknown')
-        match_level = l.get('admin_match_level', 'none')
-
-        prov_stats[prov]['total'] += 1
-        prov_stats[prov][status] += 1
-
-        dist_key = f"{prov}|{dist}"
-        dist_stats[dist_key]['total'] += 1
-        dist_stats[dist_key][status] += 1
-        dist_stats[dist_key]['province'] = prov
-        dist_stats[dist_key]['district'] = dist
-
-        ward_key = f"{prov}|{dist}|{ward}"
-        ward_stats[ward_key]['total'] += 1
-        ward_stats[ward_key][status] += 1
-        ward_stats[ward_key]['province'] = prov
-        ward_stats[ward_key]['district'] = dist
-        ward_stats[ward_key]['ward'] = ward
 
-        if match_level == 'none' or match_level == 'district':
-            missing.add(ward_key)
-
-    # Convert to lists
-    for prov, stats in prov_stats.items():
-        match_rate = (stats['matched'] / stats['total']) if stats['total'] > 0 else 0
-        report['by_province'].append({
-            'province': prov,
-            **stats,
-            'match_rate': round(match_rate, 4)
-        })
-
-    for key, stats in dist_stats.items():
-        match_rate = (stats['matched'] / stats['total']) if stats['total'] > 0 else 0
-        report['by_district'].append({
-            'province': stats.get('province', ''),
-            'district': stats.get('district', ''),
-            'total': stats['total'],
-            'matched': stats['matched'],
-            'adjusted': stats['adjusted'],
-            'failed': stats['failed'],
-            'match_rate': round(match_rate, 4)
-        })
+def _index_counters(index: BoundaryIndex) -> Dict[str, Dict[str, int]]:
+    """The index's monitoring counters by name (ward lookups, PIP tiers, ward grid, result cache)."""
+    counters = {'lookups': index.ward_lookups, 'tiers': index.tiers.counts}
+    if index.grid is not None:
+        counters['grid'] = index.grid.counts
+    if index.result_cache is not None:
+        counters['cached'] = index.result_cache.counts
+    return counters
+
+
+def _normalize_shard(index: BoundaryIndex, shard_no: int,
+                     listings: List[Dict]) -> Tuple[List[Dict], 'QCReportBuilder', Dict[str, Dict[str, int]]]:
+    """Process one batch of listings (runs in a worker with --workers).
+
+    A batch is a list of listing dicts or a ListingTable slice (which
+    yields geo columns instead of listings). Returns the processed batch,
+    its QC counters, and the deltas of the index counters (see
+    _index_counters) over the batch.
+    """
+    before = {name: dict(counts) for name, counts in _index_counters(index).items()}
+    index.sampler.use_stream(shard_no)
+    qc = QCReportBuilder()
+    if isinstance(listings, ListingTable):
+        processed = process_table_batch(listings, index)
+        qc.add_columns({**{f: listings.column(f) for f in ADMIN_FIELDS if f in listings.fieldnames}, **processed})
+    else:
+        processed = process_listings_batch(listings, index)
+        qc.add_many(processed)
+    after = _index_counters(index)
+    return processed, qc, {name: {k: after[name][k] - v for k, v in counts.items()} for name, counts in before.items()}
+
+
+def iter_processed_batches(batches: Iterable[List[Dict]], index: BoundaryIndex, workers: int = 1,
+                           loader=None) -> Iterator[Tuple[List[Dict], 'QCReportBuilder']]:
+    """Process batches of listings in order, optionally on a process pool.
+
+    Yields (processed batch, QC counters of the batch); the counters are
+    built next to the batch (in the worker with a pool) and merged by the
+    caller. Batches are consumed lazily, so streamed input stays bounded in
+    memory. Each batch draws its random points from its own RNG stream, so
+    with a seed the output is identical for any number of workers.
+    `loader` rebuilds the index in workers when fork is unavailable.
+    """
+    for processed, qc, deltas in imap_shards(_normalize_shard, batches, state=index,
+                                             workers=workers, loader=loader):
+        if workers > 1:
+            # Workers counted on their own copies of the index
+            counters = _index_counters(index)
+            for name, delta in deltas.items():
+                for k, v in delta.items():
+                    if name in counters:
+                        counters[name][k] += v
+        yield processed, qc
+
+
+def process_listings_sharded(listings: List[Dict], index: BoundaryIndex, batch_size: int,
+                             workers: int = 1, loader=None, qc: Optional['QCReportBuilder'] = None) -> List[Dict]:
+    """Process listings in batches of `batch_size`, optionally on a process pool.
+
+    With `qc` the QC counters of every batch are merged into it.
+    """
+    batches = shard(listings, batch_size)
+    workers = min(workers, len(batches))
+    out = []
+    for processed, part in iter_processed_batches(batches, index, workers, loader):
+        out.extend(processed)
+        if qc is not None:
+            qc.merge(part)
+    return out
+
+
+def process_table(table: ListingTable, index: BoundaryIndex, batch_size: int, workers: int = 1,
+                  loader=None, qc: Optional['QCReportBuilder'] = None) -> Dict[str, List[Any]]:
+    """Geo output columns for a whole ListingTable, batch by batch (optionally on a pool).
+
+    Batches and RNG streams match process_listings_sharded, so with a seed
+    the random adjustments are the same as for the dict path. With `qc`
+    the QC counters of every batch are merged into it.
+    """
+    batch_size = max(1, batch_size)
+    batches = [table.slice(start, start + batch_size) for start in range(0, len(table), batch_size)]
+    geo: Dict[str, List[Any]] = {field: [] for field in ('latitude', 'longitude') + GEO_FIELDS}
+    for columns, part in iter_processed_batches(batches, index, min(workers, len(batches)), loader):
+        for field, values in columns.items():
+            geo[field].extend(values)
+        if qc is not None:
+            qc.merge(part)
+    return geo
+
+
+def process_stream(input_path: Path, jsonl_output: Path, csv_output: Path, index: BoundaryIndex,
+                   batch_size: int, workers: int = 1, loader=None) -> 'QCReportBuilder':
+    """Normalize a JSONL/CSV/JSON file batch by batch, writing results as they come.
+
+    Only `batch_size` listings per worker are in memory at a time; report
+    counters are updated on the fly.
+    """
+    builder = QCReportBuilder()
+    batches = batched(iter_records(input_path), batch_size)
+    with RecordWriter(jsonl_output, csv_output) as writer:
+        for processed, qc in iter_processed_batches(batches, index, workers, loader):
+            writer.write_many(processed)
+            builder.merge(qc)
+            print(f"  Processed {writer.count}")
+    return builder
+
+
+def build_index(boundaries: Optional[str], cache_dir: Optional[Path], provinces: Optional[List[str]],
+                seed: Optional[int] = None, result_cache: Optional[Path] = None,
+                tolerance_m: float = 0.0) -> BoundaryIndex:
+    """Boundary index from a GeoJSON file, or sample centroids when there is none.
+
+    With `result_cache` (a SQLite path) the resolution/containment cache
+    for the boundary file's version is attached; the sample boundaries
+    have no version and are never cached. Outside points at most
+    `tolerance_m` metres from their ward are kept unmoved.
+    """
+    if boundaries and os.path.exists(boundaries):
+        index = BoundaryIndex(seed=seed)
+        print(f"Loading boundaries from {boundaries}...")
+        count = load_geojson_boundaries(boundaries, index, cache_dir, provinces)
+        print(f"Loaded {count} ward polygons")
+        if result_cache is not None:
+            index.result_cache = ResultCache('geo_normalize', index.version, result_cache, slot=index.slot)
+        start = time.perf_counter()
+        tiered = index.tiers.add(w['polygon'] for w in index.ward_polygons.values())
+        print(f"PIP tiers: {tiered} of {len(index.ward_polygons)} ward polygons simplified "
+              f"in {time.perf_counter() - start:.2f}s")
+        start = time.perf_counter()
+        grid_cache = BoundaryCache('geo_normalize_grid', params={'provinces': provinces, 'cell_size': GRID_CELL_SIZE},
+                                   cache_dir=cache_dir) if cache_dir else None
+        grid = index.ward_grid(grid_cache, boundaries)
+        if grid is not None:
+            stats = grid.stats()
+            print(f"Ward grid: {stats['cells']} cells ({stats['boundary_cells']} on boundaries) "
+                  f"in {time.perf_counter() - start:.2f}s")
+    else:
+        print("No boundaries file provided, using sample centroids...")
+        if result_cache is not None:
+            print("  Result cache disabled for sample boundaries")
+        index = generate_sample_boundaries()
+    index.tolerance_m = tolerance_m
+    return index
 
-    for key, stats in ward_stats.items():
-        match_rate = (stats['matched'] / stats['total']) if stats['total'] > 0 else 0
-        report['by_ward'].append({
-            'province': stats.get('province', ''),
-            'district': stats.get('district', ''),
-            'ward': stats.get('ward', ''),
-            'total': stats['total'],
-            'matched': stats['matched'],
-            'adjusted': stats['adjusted'],
-            'failed': stats['failed'],
-            'match_rate': round(match_rate, 4)
-        })
 
-    # Top missing polygons
-    report['missing_polygons'] = list(missing)[:50]
+class QCReportBuilder(QCAggregator):
+    """QC report counters, updated one processed listing at a time.
 
-    # Calculate overall match rate
-    total = report['summary']['matched'] + report['summary']['adjusted'] + report['summary']['failed']
-    if total > 0:
-        report['overall_match_rate'] = round(
-            (report['summary']['matched'] + report['summary']['adjusted']) / total, 4
-        )
-    else:
-        report['overall_match_rate'] = 0
+    Memory grows with the number of distinct wards, not with the number of
+    listings, so streamed runs can report on any input size. Builders of
+    separate batches / workers are combined with merge().
+    """
 
-    return report
+    def __init__(self):
+        super().__init__(levels=('province', 'district', 'ward'))
+        self.missing: Dict[str, None] = {}  # ward keys without a ward polygon, first-seen order
+
+    def add(self, l: Dict):
+        """Count one processed listing."""
+        distance = l.get('boundary_distance_m')
+        self.add_count(l.get('province', 'Unknown'), l.get('district', 'Unknown'), l.get('ward', 'Unknown'),
+                       l.get('geo_status', 'unknown'), l.get('geo_method', 'unknown'),
+                       l.get('admin_match_level', 'none'),
+                       distance_label(distance) if distance is not None else None)
+
+    def add_columns(self, columns: Dict[str, List[Any]]):
+        """Count processed listings given as columns (same fields as add()).
+
+        Rows are grouped by their distinct field combination first, so the
+        counters are updated once per group rather than once per row.
+        """
+        n = len(columns['geo_status'])
+        fields = [columns.get(f) or ['Unknown'] * n for f in ('province', 'district', 'ward')]
+        fields += [columns['geo_status'], columns['geo_method'], columns['admin_match_level']]
+        # Distances are binned first so they don't split the groups
+        distances = np.array([np.nan if d is None else d for d in columns['boundary_distance_m']], dtype=np.float64)
+        labels = (None,) + DISTANCE_LABELS
+        fields.append([labels[b + 1] for b in distance_bins(distances).tolist()])
+        for key, count in Counter(zip(*fields)).items():
+            self.add_count(*key, count=count)
+
+    def add_count(self, prov: str, dist: str, ward: str, status: str, method: str, match_level: str,
+                  distance_bin: Optional[str] = None, count: int = 1):
+        """Count `count` processed listings sharing the same admin names and outcome.
+
+        `distance_bin` is the DISTANCE_LABELS bin of the distance to the
+        ward boundary of outside points (None for the others).
+        """
+        self.record((prov, (prov, dist), (prov, dist, ward)), status, count)
+        self.tally('method', method, count)
+        if distance_bin is not None:
+            self.tally('boundary_distance', distance_bin, count)
+        if match_level == 'none' or match_level == 'district':
+            self.missing[f"{prov}|{dist}|{ward}"] = None
+
+    def add_many(self, listings: List[Dict]):
+        for l in listings:
+            self.add(l)
+
+    def merge(self, other: 'QCReportBuilder') -> 'QCReportBuilder':
+        super().merge(other)
+        self.missing.update(other.missing)
+        return self
+
+    def build(self, index: Optional[BoundaryIndex] = None) -> Dict:
+        """The QC report dict for everything added so far."""
+        summary = self.status_counts()
+        report = {
+            'timestamp': datetime.now().isoformat(),
+            'method': 'offline point-in-polygon using GADM boundaries',
+            'total_listings': self.total,
+            'summary': summary,
+            'by_method': dict(self.tallies.get('method', {})),
+            # Distance of outside points to their ward boundary (metres)
+            'boundary_distance_histogram': {
+                label: self.tallies.get('boundary_distance', {}).get(label, 0) for label in DISTANCE_LABELS
+            },
+            'by_province': [
+                {'province': prov, **stats, 'match_rate': round(rate(stats, 'matched'), 4)}
+                for prov, stats in self.groups['province'].items()
+            ],
+            'by_district': [
+                {'province': prov, 'district': dist, **stats, 'match_rate': round(rate(stats, 'matched'), 4)}
+                for (prov, dist), stats in self.groups['district'].items()
+            ],
+            'by_ward': [
+                {'province': prov, 'district': dist, 'ward': ward, **stats,
+                 'match_rate': round(rate(stats, 'matched'), 4)}
+                for (prov, dist, ward), stats in self.groups['ward'].items()
+            ],
+            # Top missing polygons
+            'missing_polygons': list(islice(self.missing, 50)),
+            'normalizer_cache': cache_stats()
+        }
+        if index is not None:
+            report['ward_lookup'] = index.lookup_stats()
+            report['pip_tiers'] = index.tiers.stats()
+            if index.grid is not None:
+                report['ward_grid'] = index.grid.stats()
+            report['tolerance_m'] = index.tolerance_m
+            if index.result_cache is not None:
+                report['result_cache'] = index.result_cache.stats()
+
+        # Calculate overall match rate
+        total = summary['matched'] + summary['adjusted'] + summary['failed']
+        report['overall_match_rate'] = round((summary['matched'] + summary['adjusted']) / total, 4) if total > 0 else 0
+        return report
+
+
+def generate_report(listings: List[Dict], index: Optional[BoundaryIndex] = None) -> Dict:
+    """Generate QC report from processed listings."""
+    builder = QCReportBuilder()
+    builder.add_many(listings)
+    return builder.build(index)
 
 
 def generate_markdown_report(report: Dict) -> str:
@@ -561,6 +1049,16 @@ def generate_markdown_report(report: Dict) -> str:
     for method, count in report['by_method'].items():
         md.append(f"- {method}: {count}")
 
+    histogram = report.get('boundary_distance_histogram', {})
+    if any(histogram.values()):
+        md.append("\n## Distance to Ward Boundary")
+        md.append(f"\nOutside points by distance to their ward polygon "
+                  f"(tolerance: {report.get('tolerance_m', 0):g} m)")
+        md.append("\n| Distance | Listings |")
+        md.append("|----------|----------|")
+        for label, count in histogram.items():
+            md.append(f"| {label} | {count} |")
+
     md.append("\n## By Province")
     md.append("\n| Province | Total | Matched | Adjusted | Failed | Match Rate |")
     md.append("|----------|-------|---------|----------|--------|------------|")
@@ -570,8 +1068,7 @@ def generate_markdown_report(report: Dict) -> str:
     md.append("\n## Top Districts")
     md.append("\n| Province | District | Total | Match Rate |")
     md.append("|----------|----------|-------|------------|")
-    sorted_districts = sorted(report['by_district'], key=lambda x: x['total'], reverse=True)[:20]
-    for d in sorted_districts:
+    for d in heapq.nlargest(20, report['by_district'], key=lambda x: x['total']):
         md.append(f"| {d['province'][:15]} | {d['district']} | {d['total']} | {d['match_rate']*100:.1f}% |")
 
     if report['missing_polygons']:
@@ -579,36 +1076,186 @@ def generate_markdown_report(report: Dict) -> str:
         for mp in report['missing_polygons'][:10]:
             md.append(f"- {mp}")
 
+    cache = report.get('normalizer_cache')
+    if cache:
+        md.append("\n## Name Normalizer Cache")
+        md.append(f"\n- Hits: {cache['hits']}")
+        md.append(f"- Misses: {cache['misses']}")
+        md.append(f"- Hit rate: {cache['hit_rate'] * 100:.1f}%")
+
+    lookups = report.get('ward_lookup')
+    if lookups:
+        md.append("\n## Ward Lookup")
+        md.append(f"\n- Exact key: {lookups['exact']}")
+        md.append(f"- Ward-number fallback: {lookups['ward_number']}")
+        md.append(f"- Not found: {lookups['miss']}")
+        md.append(f"- Fallback rate: {lookups['fallback_rate'] * 100:.1f}%")
+
+    tiers = report.get('pip_tiers')
+    if tiers and tiers['points']:
+        md.append("\n## PIP Tiers")
+        md.append(f"\n- Polygons with tiers: {tiers['tiered_polygons']} of {tiers['polygons']}")
+        md.append(f"- Inner envelope (inside): {tiers['inner']} ({tiers['inner_rate'] * 100:.1f}%)")
+        md.append(f"- Outer envelope (outside): {tiers['outer']} ({tiers['outer_rate'] * 100:.1f}%)")
+        md.append(f"- Boundary band (exact check): {tiers['exact']} ({tiers['exact_rate'] * 100:.1f}%)")
+        md.append(f"- Untiered polygons (exact check): {tiers['direct']} ({tiers['direct_rate'] * 100:.1f}%)")
+
+    grid = report.get('ward_grid')
+    if grid and grid['points']:
+        md.append("\n## Ward Grid")
+        md.append(f"\n- Cells: {grid['cells']} of {grid['cell_size']}° ({grid['boundary_cells']} on ward boundaries)")
+        md.append(f"- Cell lookup: {grid['cell_hits']} ({grid['cell_hit_rate'] * 100:.1f}%)")
+        md.append(f"- Exact check (boundary cells): {grid['exact_checks']}")
+
+    results = report.get('result_cache')
+    if results:
+        md.append("\n## Result Cache")
+        md.append(f"\n- Resolutions: {results['resolution']['hits']} hits, {results['resolution']['misses']} misses "
+                  f"({results['resolution']['hit_rate'] * 100:.1f}%)")
+        md.append(f"- Containment: {results['containment']['hits']} hits, {results['containment']['misses']} misses "
+                  f"({results['containment']['hit_rate'] * 100:.1f}%)")
+
     return "\n".join(md)
 
 
+def write_reports(report: Dict, report_dir: str):
+    """Write the JSON/Markdown QC reports and print the summary."""
+    report_json = os.path.join(report_dir, 'geo_qc_report.json')
+    report_md = os.path.join(report_dir, 'geo_qc_report.md')
+
+    with open(report_json, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Written report to {report_json}")
+
+    with open(report_md, 'w', encoding='utf-8') as f:
+        f.write(generate_markdown_report(report))
+    print(f"Written report to {report_md}")
+
+    # Print summary
+    print("\n" + "="*50)
+    print("SUMMARY")
+    print("="*50)
+    print(f"Total: {report['total_listings']}")
+    print(f"Matched: {report['summary']['matched']}")
+    print(f"Adjusted: {report['summary']['adjusted']}")
+    print(f"Failed: {report['summary']['failed']}")
+    print(f"Overall success rate: {report['overall_match_rate']*100:.2f}%")
+    print(format_cache_stats())
+    lookups = report['ward_lookup']
+    print(f"Ward lookups: {lookups['exact']} exact, {lookups['ward_number']} by ward number, "
+          f"{lookups['miss']} not found")
+    print(format_tier_stats(report['pip_tiers']))
+    if 'ward_grid' in report:
+        print(format_grid_stats(report['ward_grid']))
+    if 'result_cache' in report:
+        rc = report['result_cache']
+        print(f"Result cache: resolution {rc['resolution']['hit_rate'] * 100:.1f}% hits, "
+              f"containment {rc['containment']['hit_rate'] * 100:.1f}% hits")
+
+
+def write_outputs(processed: List[Dict], report: Dict, args):
+    """Write the JSON/CSV (+ columnar) outputs and the reports of a non-streamed run."""
+    json_output = args.output if args.output.endswith('.json') else args.output + '.json'
+    csv_output = args.output.replace('.json', '') + '.csv'
+
+    with open(json_output, 'w', encoding='utf-8') as f:
+        json.dump(processed, f, ensure_ascii=False, indent=2)
+    print(f"Written JSON to {json_output}")
+
+    # Write CSV
+    if processed:
+        with open(csv_output, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=union_fieldnames(processed))
+            writer.writeheader()
+            writer.writerows(processed)
+        print(f"Written CSV to {csv_output}")
+
+    if args.columnar:
+        npz_output = args.output.replace('.json', '') + '.npz'
+        write_columns(processed, Path(npz_output))
+        print(f"Written columnar output to {npz_output}")
+
+    write_reports(report, args.report_dir)
+
+
 def main():
     parser = argparse.ArgumentParser(description='Geo normalize listings dataset')
-    parser.add_argument('--input', '-i', required=True, help='Input JSON or CSV file')
+    parser.add_argument('--input', '-i', required=True, help='Input JSON, JSONL or CSV file')
     parser.add_argument('--output', '-o', required=True, help='Output base path (without extension)')
     parser.add_argument('--boundaries', '-b', help='GeoJSON boundaries file (optional)')
     parser.add_argument('--report-dir', '-r', default='reports', help='Reports directory')
+    parser.add_argument('--cache-dir', default=str(DEFAULT_CACHE_DIR), help='Boundary cache directory')
+    parser.add_argument('--no-cache', action='store_true', help='Always re-parse the boundaries file')
+    parser.add_argument('--all-provinces', action='store_true',
+                        help='Load every province from the boundaries file, not only the 3 cities')
+    parser.add_argument('--batch-size', type=int, default=10000,
+                        help='Listings per vectorized PIP batch (0 = per-record processing)')
+    parser.add_argument('--seed', type=int, help='Random seed for pip_random adjustments (reproducible runs)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help=f'Worker processes, one batch per task (0 = all {default_workers()} CPUs)')
+    parser.add_argument('--stream', action='store_true',
+                        help='Read and write record by record (JSONL + CSV output), constant memory')
+    parser.add_argument('--result-cache', nargs='?', const=str(DEFAULT_RESULT_CACHE),
+                        help=f'Reuse ward resolutions and PIP verdicts across runs via a SQLite cache '
+                             f'(default path: {DEFAULT_RESULT_CACHE}; batch mode only)')
+    parser.add_argument('--columnar', action='store_true',
+                        help='Also write a typed columnar .npz (read it with geo_columnar.ColumnarListings)')
+    parser.add_argument('--tolerance-m', type=float, default=0.0,
+                        help='Keep points at most this many metres outside their ward unmoved (0 = adjust all)')
 
     args = parser.parse_args()
+    if args.columnar and args.stream:
+        parser.error("--columnar needs the full result set; it cannot be combined with --stream")
 
     # Load boundary index
-    index = BoundaryIndex()
+    cache_dir = None if args.no_cache else Path(args.cache_dir)
+    provinces = None if args.all_provinces else PROVINCE_KEYS_3CITIES
+    result_cache = Path(args.result_cache) if args.result_cache else None
+    index = build_index(args.boundaries, cache_dir, provinces, args.seed, result_cache, args.tolerance_m)
+    workers = args.workers if args.workers > 0 else default_workers()
+    loader = partial(build_index, args.boundaries, cache_dir, provinces, args.seed, result_cache, args.tolerance_m)
 
-    if args.boundaries and os.path.exists(args.boundaries):
-        print(f"Loading boundaries from {args.boundaries}...")
-        count = load_geojson_boundaries(args.boundaries, index)
-        print(f"Loaded {count} ward polygons")
-    else:
-        print("No boundaries file provided, using sample centroids...")
-        index = generate_sample_boundaries()
+    # Create output directory
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    os.makedirs(args.report_dir, exist_ok=True)
+
+    if args.stream:
+        base = args.output[:-len('.jsonl')] if args.output.endswith('.jsonl') else args.output.replace('.json', '')
+        print(f"Streaming listings from {args.input}...")
+        if workers > 1:
+            print(f"  Using {workers} worker processes")
+        builder = process_stream(Path(args.input), Path(base + '.jsonl'), Path(base + '.csv'), index,
+                                 args.batch_size or 10000, workers, loader)
+        print(f"Written JSONL to {base}.jsonl")
+        print(f"Written CSV to {base}.csv")
+        write_reports(builder.build(index), args.report_dir)
+        return
 
     # Load input data
     print(f"Loading input data from {args.input}...")
 
+    if args.input.endswith('.csv') and args.batch_size > 0:
+        # Typed column ingestion: arrays straight into the batch PIP and report stages
+        table = read_csv_table(Path(args.input))
+        print(f"Loaded {len(table)} listings (typed columns)")
+        print("Processing listings...")
+        if workers > 1:
+            print(f"  Using {workers} worker processes")
+        builder = QCReportBuilder()
+        geo = process_table(table, index, args.batch_size, workers, loader, qc=builder)
+        print(f"Processed {len(table)} listings")
+        print("Generating report...")
+        write_outputs(list(table.records(geo)), builder.build(index), args)
+        return
+
     if args.input.endswith('.csv'):
         with open(args.input, 'r', encoding='utf-8') as f:
             reader = csv.DictReader(f)
             listings = list(reader)
+    elif args.input.endswith(('.jsonl', '.ndjson')):
+        listings = list(iter_records(Path(args.input)))
     else:
         with open(args.input, 'r', encoding='utf-8') as f:
             listings = json.load(f)
@@ -618,62 +1265,25 @@ def main():
     # Process listings
     print("Processing listings...")
     processed = []
-    for i, listing in enumerate(listings):
-        result = process_listing(listing, index)
-        processed.append(result)
+    builder = QCReportBuilder()
+    if args.batch_size > 0:
+        if workers > 1:
+            print(f"  Using {workers} worker processes")
+        processed = process_listings_sharded(listings, index, args.batch_size, workers, loader, qc=builder)
+    else:
+        for i, listing in enumerate(listings):
+            result = process_listing(listing, index)
+            processed.append(result)
+            builder.add(result)
 
-        if (i + 1) % 500 == 0:
-            print(f"  Processed {i + 1}/{len(listings)}")
+            if (i + 1) % 500 == 0:
+                print(f"  Processed {i + 1}/{len(listings)}")
 
     print(f"Processed {len(processed)} listings")
 
     # Generate report
     print("Generating report...")
-    report = generate_report(processed)
-
-    # Create output directory
-    output_dir = os.path.dirname(args.output)
-    if output_dir:
-        os.makedirs(output_dir, exist_ok=True)
-    os.makedirs(args.report_dir, exist_ok=True)
-
-    # Write outputs
-    json_output = args.output if args.output.endswith('.json') else args.output + '.json'
-    csv_output = args.output.replace('.json', '') + '.csv'
-
-    with open(json_output, 'w', encoding='utf-8') as f:
-        json.dump(processed, f, ensure_ascii=False, indent=2)
-    print(f"Written JSON to {json_output}")
-
-    # Write CSV
-    if processed:
-        with open(csv_output, 'w', encoding='utf-8', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=processed[0].keys())
-            writer.writeheader()
-            writer.writerows(processed)
-        print(f"Written CSV to {csv_output}")
-
-    # Write reports
-    report_json = os.path.join(args.report_dir, 'geo_qc_report.json')
-    report_md = os.path.join(args.report_dir, 'geo_qc_report.md')
-
-    with open(report_json, 'w', encoding='utf-8') as f:
-        json.dump(report, f, ensure_ascii=False, indent=2)
-    print(f"Written report to {report_json}")
-
-    with open(report_md, 'w', encoding='utf-8') as f:
-        f.write(generate_markdown_report(report))
-    print(f"Written report to {report_md}")
-
-    # Print summary
-    print("\n" + "="*50)
-    print("SUMMARY")
-    print("="*50)
-    print(f"Total: {report['total_listings']}")
-    print(f"Matched: {report['summary']['matched']}")
-    print(f"Adjusted: {report['summary']['adjusted']}")
-    print(f"Failed: {report['summary']['failed']}")
-    print(f"Overall success rate: {report['overall_match_rate']*100:.2f}%")
+    write_outputs(processed, builder.build(index), args)
 
 
 if __name__ == '__main__':
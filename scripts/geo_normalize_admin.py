@@ -7,38 +7,76 @@ Sử dụng GADM Level 3 (phường/xã) cho 3 TP: Hà Nội, Đà Nẵng, TP.HC
 
 Usage:
     python scripts/geo_normalize_admin.py
+    python scripts/geo_normalize_admin.py --workers 8
+    python scripts/geo_normalize_admin.py --stream -i listings.jsonl -o out/listings_geo
+    python scripts/geo_normalize_admin.py --incremental   # reuse unchanged records
+    python scripts/geo_normalize_admin.py --result-cache  # reuse resolutions/PIP verdicts
+    python scripts/geo_normalize_admin.py --columnar      # + typed columnar .npz output
+    python scripts/geo_normalize_admin.py --tolerance-m 25   # keep points <= 25 m outside
 """
 
 import json
 import csv
 import os
 import sys
-import random
+import time
 import hashlib
+import argparse
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Any
 from collections import defaultdict
-import unicodedata
-import re
+from functools import partial
 
 try:
-    import geopandas as gpd
-    from shapely.geometry import Point, shape
-    from shapely.ops import unary_union
+    import numpy as np
+    import shapely
+    from shapely.geometry import shape
     import requests
 except ImportError as e:
     print(f"Missing package: {e}")
-    print("Run: pip install geopandas shapely requests")
+    print("Run: pip install numpy shapely requests")
     sys.exit(1)
 
+from geo_text import normalize, normalize_text, cache_stats, format_cache_stats
+from geo_spatial import to_coord_array, batch_contains, PolygonTiers, summarize_tier_counts, format_tier_stats
+from geo_hierarchy import BoundaryHierarchy
+from geo_cache import BoundaryCache, to_wkb, from_wkb, pack_levels, unpack_levels
+from geo_grid import GRID_CELL_SIZE, WardGrid, load_grid, summarize_grid_counts, format_grid_stats
+from geo_reader import read_features, format_load_stats
+from geo_fetch import fetch_gadm
+from geo_ngram import SubstringIndex
+from geo_sampling import PolygonSampler
+from geo_parallel import imap_shards, shard, default_workers
+from geo_stream import iter_records, batched, union_fieldnames, RecordWriter
+from geo_results import DEFAULT_RESULT_CACHE, ResultCache, summarize_counts
+from geo_columnar import write_columns
+from geo_qc import QCAggregator, rate
+from geo_metric import DISTANCE_LABELS, MetricProjector, distance_label, within_tolerance
+
 # ==============================================================================
 # CONFIGURATION
 # ==============================================================================
 
-GADM_URL = "https://geodata.ucdavis.edu/gadm/gadm4.1/json/gadm41_VNM_3.json.zip"
+GADM_URL = os.environ.get("GADM_URL", "https://geodata.ucdavis.edu/gadm/gadm4.1/json/gadm41_VNM_3.json.zip")
 GADM_CACHE_DIR = Path("data/boundaries")
 GADM_CACHE_FILE = GADM_CACHE_DIR / "gadm41_VNM_3.json"
+# Offline build boxes: seed the cache from a file share instead of downloading
+GADM_MIRROR_DIR = Path(os.environ["GADM_MIRROR_DIR"]) if os.environ.get("GADM_MIRROR_DIR") else None
+GADM_SHA256 = os.environ.get("GADM_SHA256")  # expected SHA-256 of the zip, if pinned
+# Seed for random_in_polygon adjustments; set it for reproducible runs
+RANDOM_SEED = int(os.environ["GEO_RANDOM_SEED"]) if os.environ.get("GEO_RANDOM_SEED") else None
+# Records per batch (one worker task with --workers)
+BATCH_SIZE = 10000
+# Fields only records outside their polygon carry (CSV columns in streaming mode)
+ADJUSTED_FIELDS = ("original_latitude", "original_longitude", "boundary_distance_m")
+
+# Incremental runs: bump MANIFEST_VERSION when normalization logic changes
+MANIFEST_VERSION = 2
+GEO_INPUT_FIELDS = ("province", "district", "ward", "latitude", "longitude")
+GEO_RESULT_FIELDS = ("latitude", "longitude", "geo_status", "geo_method", "admin_match_level",
+                     "mismatch_reason", "original_latitude", "original_longitude", "boundary_distance_m",
+                     "province_norm", "district_norm", "ward_norm")
 
 # 3 Cities filter - GADM uses compact names without spaces: HồChíMinh, ĐàNẵng, HàNội
 # After normalize_text, these become: hochiminh, danang, hanoi
@@ -68,81 +106,23 @@ PROVINCE_ALIASES = {
     "thanh pho ho chi minh": "hochiminh",
 }
 
-# Vietnamese character normalization
-VIET_CHARS = {
-    'à': 'a', 'á': 'a', 'ả': 'a', 'ã': 'a', 'ạ': 'a',
-    'ă': 'a', 'ằ': 'a', 'ắ': 'a', 'ẳ': 'a', 'ẵ': 'a', 'ặ': 'a',
-    'â': 'a', 'ầ': 'a', 'ấ': 'a', 'ẩ': 'a', 'ẫ': 'a', 'ậ': 'a',
-    'è': 'e', 'é': 'e', 'ẻ': 'e', 'ẽ': 'e', 'ẹ': 'e',
-    'ê': 'e', 'ề': 'e', 'ế': 'e', 'ể': 'e', 'ễ': 'e', 'ệ': 'e',
-    'ì': 'i', 'í': 'i', 'ỉ': 'i', 'ĩ': 'i', 'ị': 'i',
-    'ò': 'o', 'ó': 'o', 'ỏ': 'o', 'õ': 'o', 'ọ': 'o',
-    'ô': 'o', 'ồ': 'o', 'ố': 'o', 'ổ': 'o', 'ỗ': 'o', 'ộ': 'o',
-    'ơ': 'o', 'ờ': 'o', 'ớ': 'o', 'ở': 'o', 'ỡ': 'o', 'ợ': 'o',
-    'ù': 'u', 'ú': 'u', 'ủ': 'u', 'ũ': 'u', 'ụ': 'u',
-    'ư': 'u', 'ừ': 'u', 'ứ': 'u', 'ử': 'u', 'ữ': 'u', 'ự': 'u',
-    'ỳ': 'y', 'ý': 'y', 'ỷ': 'y', 'ỹ': 'y', 'ỵ': 'y',
-    'đ': 'd', 'Đ': 'd'
-}
-
-ADMIN_PREFIXES = [
-    "thành phố", "tỉnh", "quận", "huyện", "thị xã",
-    "phường", "xã", "thị trấn", "tp", "tx", "tt", "p", "q", "h"
-]
-
 # ==============================================================================
 # HELPER FUNCTIONS
 # ==============================================================================
 
-def normalize_text(text: str) -> str:
-    """Normalize Vietnamese text for matching."""
-    if not text:
-        return ""
-    text = str(text).lower().strip()
-    text = unicodedata.normalize('NFC', text)
-    for viet, ascii_char in VIET_CHARS.items():
-        text = text.replace(viet, ascii_char)
-    text = re.sub(r'[^\w\s]', '', text)
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
-
-
 def remove_prefix(name: str) -> str:
     """Remove administrative prefixes and spaces for matching."""
-    name_lower = normalize_text(name)
-    for prefix in sorted(ADMIN_PREFIXES, key=len, reverse=True):
-        prefix_norm = normalize_text(prefix)
-        if name_lower.startswith(prefix_norm + " "):
-            result = name_lower[len(prefix_norm)+1:].strip()
-            return result.replace(" ", "")  # Remove spaces for GADM matching
-        if name_lower.startswith(prefix_norm):
-            rest = name_lower[len(prefix_norm):].strip()
-            if rest and rest[0].isdigit():
-                return rest
-    return name_lower.replace(" ", "")  # Remove spaces for GADM matching
+    return normalize(name, 'gadm_ward')
 
 
 def normalize_district_number(name: str) -> str:
     """Normalize district numbers (Quận 1 -> 1) and remove spaces for matching."""
-    name_clean = remove_prefix(name)
-    # Handle "quan 1" -> "1"
-    match = re.match(r'^(\d+)$', name_clean)
-    if match:
-        return match.group(1)
-    # Remove spaces for matching (GADM uses HoànKiếm not Hoàn Kiếm)
-    return name_clean.replace(" ", "")
-
-
-def get_random_point_in_polygon(polygon) -> Tuple[float, float]:
-    """Generate random point inside polygon."""
-    minx, miny, maxx, maxy = polygon.bounds
-    for _ in range(100):
-        pnt = Point(random.uniform(minx, maxx), random.uniform(miny, maxy))
-        if polygon.contains(pnt):
-            return (pnt.y, pnt.x)  # lat, lon
-    # Fallback to centroid
-    centroid = polygon.centroid
-    return (centroid.y, centroid.x)
+    return normalize(name, 'gadm_district')
+
+
+def get_random_point_in_polygon(polygon, sampler: PolygonSampler) -> Tuple[float, float]:
+    """Generate a uniform random point inside polygon."""
+    return sampler.sample_one(polygon)
 
 
 # ==============================================================================
@@ -152,48 +132,71 @@ def get_random_point_in_polygon(polygon) -> Tuple[float, float]:
 class GADMBoundaries:
     """Load and index GADM boundaries for Vietnam."""
 
-    def __init__(self):
-        self.gdf = None
+    def __init__(self, mirror_dir: Optional[Path] = GADM_MIRROR_DIR, seed: Optional[int] = RANDOM_SEED):
+        self.mirror_dir = mirror_dir
+        self.sampler = PolygonSampler(seed)
+        # Simplified inner/outer envelopes of dense polygons for cheap PIP (build_tiers)
+        self.tiers = PolygonTiers()
+        # Cell lookup grid over the ward polygons for ward-level PIP (build_grid)
+        self.grid: Optional[WardGrid] = None
+        self._grid_keys: List[str] = []  # grid polygon index -> ward polygon id
+        self._grid_ids: Dict[str, int] = {}  # ward polygon id -> grid polygon index
+        # UTM copies of polygons for distances to the boundary, projected on first use
+        self.metric = MetricProjector()
+        self.tolerance_m = 0.0  # outside points at most this far (metres) are not moved
+        self.version: Optional[str] = None  # boundary-set version, set by load()
+        self.slot: Optional[str] = None  # BoundaryCache slot of that version, set by load()
+        # Optional on-disk cache of resolutions and PIP verdicts (--result-cache)
+        self.result_cache: Optional[ResultCache] = None
         self.ward_index = {}  # (province_norm, district_norm, ward_norm) -> polygon
-        self.district_index = {}  # (province_norm, district_norm) -> polygon
-        self.province_index = {}  # province_norm -> polygon
+        # Partial-match indexes: ward names per (province, district), district names per province
+        self.ward_names = SubstringIndex()
+        self.district_names = SubstringIndex()
+        self._province_keys: Dict[str, str] = {}  # raw province -> resolved key
+        # District/province polygons are dissolved from wards on first use
+        self.hierarchy = BoundaryHierarchy(('district', 'province'))
+
+    @property
+    def district_index(self) -> Dict[Tuple[str, str], Any]:
+        """(province_norm, district_norm) -> polygon (union of wards)."""
+        return self.hierarchy.level('district')
+
+    @property
+    def province_index(self) -> Dict[str, Any]:
+        """province_norm -> polygon (union of districts)."""
+        return self.hierarchy.level('province')
 
     def download_gadm(self):
-        """Download GADM data if not cached."""
-        GADM_CACHE_DIR.mkdir(parents=True, exist_ok=True)
-
-        if GADM_CACHE_FILE.exists():
-            print(f"Using cached GADM: {GADM_CACHE_FILE}")
-            return
-
-        print(f"Downloading GADM from {GADM_URL}...")
-
-        # Download zip
-        import zipfile
-        import io
+        """Download GADM data if not cached (or seed it from the mirror directory)."""
+        fetch_gadm(GADM_URL, GADM_CACHE_FILE, mirror_dir=self.mirror_dir, expected_sha256=GADM_SHA256)
 
-        response = requests.get(GADM_URL, timeout=120)
-        response.raise_for_status()
+    def load(self, use_cache: bool = True):
+        """Load GADM and build indexes.
 
-        # Extract JSON from zip
-        with zipfile.ZipFile(io.BytesIO(response.content)) as zf:
-            for name in zf.namelist():
-                if name.endswith('.json'):
-                    with zf.open(name) as f:
-                        data = json.load(f)
-                        with open(GADM_CACHE_FILE, 'w', encoding='utf-8') as out:
-                            json.dump(data, out)
-                    print(f"Saved: {GADM_CACHE_FILE}")
-                    return
-
-        raise Exception("No JSON found in GADM zip")
-
-    def load(self):
-        """Load GADM and build indexes."""
+        The filtered, indexed and dissolved boundary set is kept in the
+        on-disk boundary cache, keyed by the GADM file hash.
+        """
         self.download_gadm()
 
+        cache = BoundaryCache('gadm_admin', params=TARGET_PROVINCES_GADM)
+        self.version = cache.version(GADM_CACHE_FILE)
+        self.slot = cache.slot(GADM_CACHE_FILE)
+        if use_cache:
+            payload = cache.load(GADM_CACHE_FILE)
+            if payload is not None:
+                self._index_wards(payload['ward_keys'], from_wkb(payload['ward_wkb']))
+                unpack_levels(self.hierarchy, payload['levels'])
+                print(f"Loaded boundary cache in {cache.last_load_seconds:.2f}s")
+                print(f"Indexed: {len(self.ward_index)} wards, {self.hierarchy.count('district')} districts, "
+                      f"{self.hierarchy.count('province')} provinces")
+                return
+
+        # Stream the country file, building geometries for the 3 cities only
+        # (GADM uses HồChíMinh, ĐàNẵng, HàNội)
         print("Loading GADM boundaries...")
-        self.gdf = gpd.read_file(GADM_CACHE_FILE)
+        start = time.perf_counter()
+        rows = list(read_features(GADM_CACHE_FILE, provinces=TARGET_PROVINCES_GADM))
+        print(format_load_stats(len(rows), time.perf_counter() - start))
 
         # GADM columns are: NAME_1 (province), NAME_2 (district), NAME_3 (ward)
         # Don't use NL_NAME_* as they're mostly NA
@@ -201,14 +204,10 @@ class GADMBoundaries:
         district_col = 'NAME_2'
         ward_col = 'NAME_3'
 
-        print(f"Columns: {list(self.gdf.columns[:10])}")
+        print(f"Columns: {list(rows[0][0])[:10] if rows else []}")
         print(f"Using: province={province_col}, district={district_col}, ward={ward_col}")
 
-        # Filter to target provinces (GADM uses HồChíMinh, ĐàNẵng, HàNội)
-        mask = self.gdf[province_col].isin(TARGET_PROVINCES_GADM)
-        self.gdf = self.gdf[mask].copy()
-
-        print(f"Filtered to {len(self.gdf)} wards in 3 cities")
+        print(f"Filtered to {len(rows)} wards in 3 cities")
 
         # Build ward index - normalize province to match TARGET_PROVINCES_NORM
         gadm_to_norm = {
@@ -217,38 +216,56 @@ class GADMBoundaries:
             "HàNội": "hanoi"
         }
 
-        for idx, row in self.gdf.iterrows():
-            province_gadm = str(row[province_col])
-            district = str(row[district_col])
-            ward = str(row[ward_col])
-            geometry = row.geometry
+        keys = []
+        for props, _ in rows:
+            province_gadm = str(props.get(province_col))
+            district = str(props.get(district_col))
+            ward = str(props.get(ward_col))
 
             # Map GADM province name to normalized key
             province_norm = gadm_to_norm.get(province_gadm, normalize_text(province_gadm).replace(" ", ""))
             district_norm = normalize_district_number(district)
             ward_norm = remove_prefix(ward)
-
-            # Ward index
-            key = (province_norm, district_norm, ward_norm)
+            keys.append((province_norm, district_norm, ward_norm))
+
+        self._index_wards(keys, [geom for _, geom in rows])
+
+        print(f"Indexed: {len(self.ward_index)} wards, {self.hierarchy.count('district')} districts, "
+              f"{self.hierarchy.count('province')} provinces")
+
+        if use_cache:
+            path = cache.save(GADM_CACHE_FILE, {
+                'ward_keys': keys,
+                'ward_wkb': to_wkb(self.hierarchy.geometries),
+                'levels': pack_levels(self.hierarchy),
+            })
+            print(f"Saved boundary cache: {path}")
+
+    def _index_wards(self, keys: List[Tuple[str, str, str]], geometries: List[Any]):
+        """Fill the ward index and hierarchy from (province, district, ward) keys."""
+        seen_districts = set(self.hierarchy.keys['district'])
+        for key, geometry in zip(keys, geometries):
+            # Ward index (+ name indexes for partial matches, first occurrence only)
+            if key not in self.ward_index:
+                self.ward_names.add(key[:2], key[2], key)
+            if key[:2] not in seen_districts:
+                seen_districts.add(key[:2])
+                self.district_names.add(key[0], key[1], key[:2])
             self.ward_index[key] = geometry
+            # District / province index (dissolved lazily)
+            self.hierarchy.add(geometry, district=key[:2], province=key[0])
 
-            # District index (union of wards)
-            dist_key = (province_norm, district_norm)
-            if dist_key not in self.district_index:
-                self.district_index[dist_key] = geometry
-            else:
-                self.district_index[dist_key] = unary_union([self.district_index[dist_key], geometry])
-
-            # Province index
-            if province_norm not in self.province_index:
-                self.province_index[province_norm] = geometry
-            else:
-                self.province_index[province_norm] = unary_union([self.province_index[province_norm], geometry])
+        # Prepare every ward geometry once for fast contains()
+        # (dissolved districts/provinces are prepared when built)
+        shapely.prepare(list(self.ward_index.values()))
 
-        print(f"Indexed: {len(self.ward_index)} wards, {len(self.district_index)} districts, {len(self.province_index)} provinces")
+    def resolve_province(self, province: str) -> str:
+        """Province key for a raw province name (memoized alias resolution)."""
+        if province not in self._province_keys:
+            self._province_keys[province] = self._resolve_province(province)
+        return self._province_keys[province]
 
-    def find_polygon(self, province: str, district: str, ward: str) -> Tuple[Optional[Any], str]:
-        """Find polygon for admin unit, with fallback."""
+    def _resolve_province(self, province: str) -> str:
         # Normalize province name and apply alias
         province_norm = normalize_text(province)
         # Remove spaces for matching (GADM: "hochiminh" not "ho chi minh")
@@ -268,44 +285,106 @@ class GADMBoundaries:
             else:
                 # Default: remove spaces
                 province_norm = province_norm_nospace
+        return province_norm
+
+    def admin_key(self, province: str, district: str, ward: str) -> Tuple[str, str, str]:
+        """Normalized (province, district, ward) lookup key for raw admin names."""
+        return (self.resolve_province(province), normalize_district_number(district),
+                remove_prefix(ward) if ward else "")
 
-        district_norm = normalize_district_number(district)
-        ward_norm = remove_prefix(ward) if ward else ""
+    def resolve_key(self, key: Tuple[str, str, str]) -> Tuple[Optional[str], str]:
+        """(polygon id, match level) for a normalized admin key, with fallback.
+
+        Polygon ids are the "|"-joined index keys ("prov|dist|ward",
+        "prov|dist" or "prov"); see polygon().
+        """
+        province_norm, district_norm, ward_norm = key
 
         # Try ward first
         if ward_norm:
-            key = (province_norm, district_norm, ward_norm)
             if key in self.ward_index:
-                return self.ward_index[key], "ward"
+                return "|".join(key), "ward"
 
             # Try partial match
-            for k, poly in self.ward_index.items():
-                if k[0] == province_norm and k[1] == district_norm and ward_norm in k[2]:
-                    return poly, "ward"
+            ward_key = self.ward_names.first((province_norm, district_norm), ward_norm)
+            if ward_key is not None:
+                return "|".join(ward_key), "ward"
 
         # Fallback to district
         dist_key = (province_norm, district_norm)
         if dist_key in self.district_index:
-            return self.district_index[dist_key], "district"
+            return "|".join(dist_key), "district"
 
         # Try partial district match
-        for k, poly in self.district_index.items():
-            if k[0] == province_norm and district_norm in k[1]:
-                return poly, "district"
+        dist_key = self.district_names.first(province_norm, district_norm)
+        if dist_key is not None:
+            return "|".join(dist_key), "district"
 
         # Fallback to province
         if province_norm in self.province_index:
-            return self.province_index[province_norm], "province"
+            return province_norm, "province"
 
         return None, "none"
 
+    def polygon(self, polygon_id: Optional[str]) -> Optional[Any]:
+        """Ward, district or province polygon for an id from resolve_key()."""
+        if polygon_id is None:
+            return None
+        parts = tuple(polygon_id.split("|"))
+        if len(parts) == 3:
+            return self.ward_index[parts]
+        if len(parts) == 2:
+            return self.district_index[parts]
+        return self.province_index[polygon_id]
+
+    def build_tiers(self) -> int:
+        """Precompute PIP tiers of every ward, district and province polygon; returns how many got tiers."""
+        return self.tiers.add([*self.ward_index.values(), *self.district_index.values(),
+                               *self.province_index.values()])
+
+    def build_grid(self, use_cache: bool = True) -> WardGrid:
+        """Ward lookup grid, from the boundary cache when it matches the ward index."""
+        cache = BoundaryCache('gadm_admin_grid', params={'provinces': TARGET_PROVINCES_GADM,
+                                                         'cell_size': GRID_CELL_SIZE}) if use_cache else None
+        keys = list(self.ward_index)
+        self._grid_keys = ["|".join(key) for key in keys]
+        self._grid_ids = {polygon_id: i for i, polygon_id in enumerate(self._grid_keys)}
+        self.grid = load_grid(cache, GADM_CACHE_FILE, keys, list(self.ward_index.values()))
+        return self.grid
+
+    def locate_many(self, lats: np.ndarray, lons: np.ndarray) -> List[Optional[str]]:
+        """Ward polygon id ("prov|dist|ward") whose interior holds each point; None when outside all wards."""
+        grid = self.grid or self.build_grid(use_cache=False)
+        located = grid.locate(lats, lons, predicate='contains')
+        return [self._grid_keys[w] if w >= 0 else None for w in located.tolist()]
+
+    def contains_many(self, polygon_ids: List[Optional[str]], polygons: List[Any],
+                      lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        """PIP of each point against its polygon (None = outside).
+
+        Ward targets go through the ward grid; district/province targets
+        (and everything when there is no grid) through batch_contains.
+        """
+        if self.grid is None:
+            return batch_contains(polygons, lats, lons, self.tiers)
+        targets = np.fromiter((self._grid_ids.get(polygon_id, -1) if polygon_id else -1 for polygon_id in polygon_ids),
+                              dtype=np.intp, count=len(polygon_ids))
+        inside = self.grid.contains(targets, lats, lons, self.tiers)
+        others = [polygon if target < 0 else None for target, polygon in zip(targets.tolist(), polygons)]
+        return inside | batch_contains(others, lats, lons, self.tiers)
+
+    def find_polygon(self, province: str, district: str, ward: str) -> Tuple[Optional[Any], str]:
+        """Find polygon for admin unit, with fallback."""
+        polygon_id, match_level = self.resolve_key(self.admin_key(province, district, ward))
+        return self.polygon(polygon_id), match_level
+
     def point_in_polygon(self, lat: float, lon: float, polygon) -> bool:
         """Check if point is inside polygon."""
         if polygon is None:
             return False
         try:
-            point = Point(lon, lat)  # shapely uses (x, y) = (lon, lat)
-            return polygon.contains(point)
+            # shapely uses (x, y) = (lon, lat); uses the tiers / prepared geometry
+            return bool(self.tiers.contains(polygon, [float(lon)], [float(lat)])[0])
         except:
             return False
 
@@ -314,46 +393,89 @@ class GADMBoundaries:
 # MAIN NORMALIZATION
 # ==============================================================================
 
-def normalize_dataset(input_file: Path, output_json: Path, output_csv: Path, boundaries: GADMBoundaries) -> Dict:
-    """Normalize all listings in dataset."""
-
-    print(f"\nProcessing: {input_file}")
+def new_stats() -> Dict:
+    """Empty normalization stats (QC counters per province and "province|district")."""
+    return {
+        "qc": QCAggregator(levels=("province", "district")),
+        "by_level": {"ward": 0, "district": 0, "province": 0},
+        "result_cache": {},
+        "pip_tiers": {tier: 0 for tier in PolygonTiers.TIERS},
+        "ward_grid": {"cell": 0, "exact": 0}
+    }
 
-    with open(input_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
 
-    print(f"Total records: {len(data)}")
+def merge_stats(stats: Dict, part: Dict) -> Dict:
+    """Add the stats of a later batch into `stats` (keeps first-seen order)."""
+    stats["qc"].merge(part["qc"])
+    for level, count in part["by_level"].items():
+        stats["by_level"][level] += count
+    for key, count in part["result_cache"].items():
+        stats["result_cache"][key] = stats["result_cache"].get(key, 0) + count
+    for tier, count in part["pip_tiers"].items():
+        stats["pip_tiers"][tier] += count
+    for key, count in part["ward_grid"].items():
+        stats["ward_grid"][key] += count
+    return stats
 
-    stats = {
-        "total": len(data),
-        "matched": 0,
-        "adjusted": 0,
-        "failed": 0,
-        "by_level": {"ward": 0, "district": 0, "province": 0},
-        "by_province": defaultdict(lambda: {"total": 0, "matched": 0, "adjusted": 0, "failed": 0}),
-        "by_district": defaultdict(lambda: {"total": 0, "matched": 0, "adjusted": 0, "failed": 0}),
-        "sample_adjusted": [],
-        "sample_failed": []
-    }
 
+def normalize_records(boundaries: GADMBoundaries, shard_no: int, data: List[Dict],
+                      batch: bool = True) -> Tuple[List[Dict], Dict]:
+    """Normalize one batch of records; returns (records, stats for the batch).
+
+    Replacement points come from the sampler stream of `shard_no`, so a
+    batch gives the same output whichever process runs it. With a result
+    cache attached (batch mode only), resolutions and PIP verdicts are read
+    from / written to it and its hit counts are returned in the stats.
+    """
+    boundaries.sampler.use_stream(shard_no)
+    results = boundaries.result_cache if batch else None
+    before = dict(results.counts) if results is not None else {}
+    tiers_before = dict(boundaries.tiers.counts)
+    grid_before = dict(boundaries.grid.counts) if boundaries.grid is not None else {}
+
+    # Resolve target polygons up front
+    keys = [boundaries.admin_key(r.get("province", ""), r.get("district", ""), r.get("ward", "")) for r in data]
+    if results is not None:
+        ids = results.resolve_many(keys, boundaries.resolve_key)
+    else:
+        ids = [boundaries.resolve_key(key) for key in keys]
+    resolved = [(boundaries.polygon(polygon_id), match_level) for polygon_id, match_level in ids]
+    # Coordinates as floats once (CSV input gives strings; missing -> NaN)
+    lats = to_coord_array([r.get("latitude", 0) for r in data])
+    lons = to_coord_array([r.get("longitude", 0) for r in data])
+    if batch:
+        polygons = [polygon for polygon, _ in resolved]
+        if results is not None:
+            inside = results.contains_many([polygon_id for polygon_id, _ in ids], polygons, lats, lons,
+                                           boundaries.tiers)
+        else:
+            inside = boundaries.contains_many([polygon_id for polygon_id, _ in ids], polygons, lats, lons)
+    else:
+        inside = [
+            boundaries.point_in_polygon(r.get("latitude", 0), r.get("longitude", 0), polygon)
+            for r, (polygon, _) in zip(data, resolved)
+        ]
+    if batch:
+        # Metric distance of outside points to their polygon; near-misses are not moved
+        distances = boundaries.metric.boundary_distances(
+            [polygon if not inside[i] else None for i, (polygon, _) in enumerate(resolved)], lats, lons)
+        near = within_tolerance(distances, boundaries.tolerance_m)
+        new_lats, new_lons = boundaries.sampler.sample_many([
+            polygon if not inside[i] and not near[i] else None for i, (polygon, _) in enumerate(resolved)
+        ])
+
+    stats = new_stats()
     normalized_data = []
 
     for i, record in enumerate(data):
-        if i % 100 == 0:
-            print(f"Processing {i}/{len(data)}...")
-
         province = record.get("province", "")
         district = record.get("district", "")
         ward = record.get("ward", "")
-        old_lat = record.get("latitude", 0)
-        old_lon = record.get("longitude", 0)
+        old_lat = float(lats[i])
+        old_lon = float(lons[i])
+        new_lat = new_lon = None
 
-        dist_key = f"{province}|{district}"
-        stats["by_province"][province]["total"] += 1
-        stats["by_district"][dist_key]["total"] += 1
-
-        # Find polygon
-        polygon, match_level = boundaries.find_polygon(province, district, ward)
+        polygon, match_level = resolved[i]
 
         if polygon is None:
             # Failed - no polygon found
@@ -361,80 +483,305 @@ def normalize_dataset(input_file: Path, output_json: Path, output_csv: Path, bou
             record["geo_method"] = "no_polygon"
             record["admin_match_level"] = "none"
             record["mismatch_reason"] = f"No polygon found for {province}/{district}/{ward}"
-            stats["failed"] += 1
-            stats["by_province"][province]["failed"] += 1
-            stats["by_district"][dist_key]["failed"] += 1
-            if len(stats["sample_failed"]) < 50:
-                stats["sample_failed"].append({
-                    "id": record["id"],
-                    "province": province,
-                    "district": district,
-                    "ward": ward,
-                    "reason": record["mismatch_reason"]
-                })
-        elif boundaries.point_in_polygon(old_lat, old_lon, polygon):
+        elif inside[i]:
             # Point already in correct polygon
             record["geo_status"] = "matched"
             record["geo_method"] = "verified"
             record["admin_match_level"] = match_level
             record["mismatch_reason"] = None
-            stats["matched"] += 1
-            stats["by_level"][match_level] += 1
-            stats["by_province"][province]["matched"] += 1
-            stats["by_district"][dist_key]["matched"] += 1
         else:
-            # Point outside - need to adjust
-            new_lat, new_lon = get_random_point_in_polygon(polygon)
-
-            record["latitude"] = round(new_lat, 6)
-            record["longitude"] = round(new_lon, 6)
-            record["geo_status"] = "adjusted"
-            record["geo_method"] = "random_in_polygon"
-            record["admin_match_level"] = match_level
-            record["mismatch_reason"] = f"Moved from ({old_lat:.6f},{old_lon:.6f}) - was outside {match_level} polygon"
-            record["original_latitude"] = old_lat
-            record["original_longitude"] = old_lon
-
-            stats["adjusted"] += 1
-            stats["by_level"][match_level] += 1
-            stats["by_province"][province]["adjusted"] += 1
-            stats["by_district"][dist_key]["adjusted"] += 1
-
-            if len(stats["sample_adjusted"]) < 50:
-                stats["sample_adjusted"].append({
-                    "id": record["id"],
-                    "province": province,
-                    "district": district,
-                    "ward": ward,
-                    "old_lat": old_lat,
-                    "old_lon": old_lon,
-                    "new_lat": new_lat,
-                    "new_lon": new_lon,
-                    "match_level": match_level
-                })
+            if batch:
+                distance = float(distances[i])
+            else:
+                distance = float(boundaries.metric.boundary_distances([polygon], lats[i:i + 1], lons[i:i + 1])[0])
+            if within_tolerance(distance, boundaries.tolerance_m):
+                # Near-miss - keep the original point
+                record["geo_status"] = "matched"
+                record["geo_method"] = "within_tolerance"
+                record["admin_match_level"] = match_level
+                record["mismatch_reason"] = f"{distance:.1f} m outside {match_level} polygon - within tolerance"
+            else:
+                # Point outside - need to adjust
+                if batch:
+                    new_lat, new_lon = float(new_lats[i]), float(new_lons[i])
+                else:
+                    new_lat, new_lon = get_random_point_in_polygon(polygon, boundaries.sampler)
+
+                record["latitude"] = round(new_lat, 6)
+                record["longitude"] = round(new_lon, 6)
+                record["geo_status"] = "adjusted"
+                record["geo_method"] = "random_in_polygon"
+                record["admin_match_level"] = match_level
+                record["mismatch_reason"] = f"Moved from ({old_lat:.6f},{old_lon:.6f}) - was outside {match_level} polygon"
+                record["original_latitude"] = old_lat if old_lat == old_lat else None
+                record["original_longitude"] = old_lon if old_lon == old_lon else None
+
+            if distance == distance:
+                record["boundary_distance_m"] = round(distance, 1)
 
         # Add normalized names
         record["province_norm"] = normalize_text(province)
         record["district_norm"] = normalize_district_number(district)
         record["ward_norm"] = remove_prefix(ward) if ward else ""
 
+        tally_record(stats, record, new_lat, new_lon)
         normalized_data.append(record)
 
+    if results is not None:
+        stats["result_cache"] = {key: count - before[key] for key, count in results.counts.items()}
+    stats["pip_tiers"] = {tier: count - tiers_before[tier] for tier, count in boundaries.tiers.counts.items()}
+    if boundaries.grid is not None:
+        stats["ward_grid"] = {key: count - grid_before[key] for key, count in boundaries.grid.counts.items()}
+    return normalized_data, stats
+
+
+def tally_record(stats: Dict, record: Dict, new_lat: Optional[float] = None, new_lon: Optional[float] = None):
+    """Count one normalized record into `stats`.
+
+    `new_lat`/`new_lon` are the unrounded replacement point of an adjusted
+    record (the rounded output coordinates are used when not given).
+    """
+    province = record.get("province", "")
+    district = record.get("district", "")
+    ward = record.get("ward", "")
+    status = record["geo_status"]
+    match_level = record["admin_match_level"]
+
+    qc = stats["qc"]
+    qc.record((province, f"{province}|{district}"), status)
+    qc.tally("method", record["geo_method"])
+    distance = record.get("boundary_distance_m")
+    if distance is not None:
+        qc.tally("boundary_distance", distance_label(distance))
+
+    if status == "failed":
+        if qc.wants_sample("failed"):
+            qc.sample("failed", {
+                "id": record["id"],
+                "province": province,
+                "district": district,
+                "ward": ward,
+                "reason": record["mismatch_reason"]
+            })
+        return
+
+    stats["by_level"][match_level] += 1
+    if status == "adjusted" and qc.wants_sample("adjusted"):
+        qc.sample("adjusted", {
+            "id": record["id"],
+            "province": province,
+            "district": district,
+            "ward": ward,
+            "old_lat": record["original_latitude"],
+            "old_lon": record["original_longitude"],
+            "new_lat": new_lat if new_lat is not None else record["latitude"],
+            "new_lon": new_lon if new_lon is not None else record["longitude"],
+            "match_level": match_level
+        })
+
+
+def _normalize_shard(boundaries: GADMBoundaries, shard_no: int, data: List[Dict]) -> Tuple[List[Dict], Dict]:
+    """Worker task for --workers: one batch with the vectorized path."""
+    return normalize_records(boundaries, shard_no, data)
+
+
+def load_boundaries(seed: Optional[int] = RANDOM_SEED, result_cache: Optional[Path] = None,
+                    tolerance_m: float = 0.0) -> GADMBoundaries:
+    """Loaded GADM boundaries (from the boundary cache when warm).
+
+    With `result_cache` (a SQLite path) the resolution/containment cache
+    for this boundary version is attached. Points at most `tolerance_m`
+    metres outside their polygon are kept (0 = move every outside point).
+    """
+    boundaries = GADMBoundaries(seed=seed)
+    boundaries.load()
+    boundaries.tolerance_m = tolerance_m
+    start = time.perf_counter()
+    tiered = boundaries.build_tiers()
+    print(f"PIP tiers: {tiered} of {len(boundaries.tiers)} polygons simplified in {time.perf_counter() - start:.2f}s")
+    start = time.perf_counter()
+    grid = boundaries.build_grid().stats()
+    print(f"Ward grid: {grid['cells']} cells ({grid['boundary_cells']} on boundaries) "
+          f"in {time.perf_counter() - start:.2f}s")
+    if result_cache is not None:
+        boundaries.result_cache = ResultCache('gadm_admin', boundaries.version, result_cache, slot=boundaries.slot)
+    return boundaries
+
+
+def iter_normalized(batches: Iterable[List[Dict]], boundaries: GADMBoundaries, batch: bool = True,
+                    workers: int = 1) -> Iterator[Tuple[List[Dict], Dict]]:
+    """(records, stats) per batch, in input order; batches run on a pool when workers > 1."""
+    if batch and workers > 1:
+        print(f"Using {workers} worker processes")
+        result_cache = boundaries.result_cache.path if boundaries.result_cache is not None else None
+        yield from imap_shards(_normalize_shard, batches, state=boundaries, workers=workers,
+                               loader=partial(load_boundaries, boundaries.sampler.seed, result_cache,
+                                              boundaries.tolerance_m))
+    else:
+        for i, records in enumerate(batches):
+            yield normalize_records(boundaries, i, records, batch)
+
+
+def record_hash(record: Dict) -> str:
+    """Hash of the fields that decide a record's geo result."""
+    values = [record.get(field) for field in GEO_INPUT_FIELDS]
+    return hashlib.sha256(json.dumps(values, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()[:16]
+
+
+def manifest_path_for(output_json: Path) -> Path:
+    return output_json.with_name(output_json.stem + ".manifest.json")
+
+
+def load_previous_results(output_json: Path, boundary_version: Optional[str],
+                          tolerance_m: float = 0.0) -> Dict[str, Tuple[str, Dict]]:
+    """id -> (input hash, previous output record), or {} when the last run can't be reused."""
+    manifest_path = manifest_path_for(output_json)
+    if not manifest_path.exists() or not output_json.exists():
+        return {}
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if (manifest.get("manifest_version") != MANIFEST_VERSION or manifest.get("boundary_version") != boundary_version
+            or manifest.get("tolerance_m") != tolerance_m):
+        print("Boundary set, tolerance or normalizer changed since the last run, reprocessing everything")
+        return {}
+    hashes = manifest.get("records", {})
+    with open(output_json, 'r', encoding='utf-8') as f:
+        previous = json.load(f)
+    return {str(r.get("id")): (hashes[str(r.get("id"))], r) for r in previous if str(r.get("id")) in hashes}
+
+
+def save_manifest(output_json: Path, boundary_version: Optional[str], data: List[Dict], hashes: List[str],
+                  tolerance_m: float = 0.0):
+    manifest = {
+        "manifest_version": MANIFEST_VERSION,
+        "boundary_version": boundary_version,
+        "tolerance_m": tolerance_m,
+        "generated_at": datetime.now().isoformat(),
+        "records": {str(r.get("id")): h for r, h in zip(data, hashes)},
+    }
+    with open(manifest_path_for(output_json), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+
+
+def reuse_result(record: Dict, previous: Dict) -> Dict:
+    """Current record with the geo result fields of its previous output."""
+    result = dict(record)
+    for field in GEO_RESULT_FIELDS:
+        if field in previous:
+            result[field] = previous[field]
+    return result
+
+
+def normalize_dataset(input_file: Path, output_json: Path, output_csv: Path, boundaries: GADMBoundaries,
+                      batch: bool = True, workers: int = 1, incremental: bool = False,
+                      output_npz: Optional[Path] = None) -> Dict:
+    """Normalize all listings in dataset.
+
+    Records are processed in batches of BATCH_SIZE. With batch=True every
+    record's polygon is resolved first, the point-in-polygon checks run as
+    one vectorized call per polygon and the replacement points of all
+    adjusted records are drawn in one batch per polygon. With workers > 1
+    the batches run on a process pool; output and stats are merged in input
+    order and match the serial run.
+
+    A manifest of per-record input hashes and the boundary-set version is
+    written next to the output. With incremental=True, records whose hash
+    is unchanged since that run reuse their previous geo result and only
+    new or changed records are processed.
+
+    With `output_npz` the result is also written as typed columns (see
+    geo_columnar).
+    """
+
+    print(f"\nProcessing: {input_file}")
+
+    data = list(iter_records(input_file))
+
+    print(f"Total records: {len(data)}")
+
+    hashes = [record_hash(r) for r in data]
+    normalized_data: List[Optional[Dict]] = [None] * len(data)
+    todo = list(range(len(data)))
+    if incremental:
+        previous = load_previous_results(output_json, boundaries.version, boundaries.tolerance_m)
+        id_counts = defaultdict(int)
+        for r in data:
+            id_counts[str(r.get("id"))] += 1
+        todo = []
+        for i, (r, h) in enumerate(zip(data, hashes)):
+            key = str(r.get("id"))
+            prev = previous.get(key)
+            if prev is not None and prev[0] == h and id_counts[key] == 1:
+                normalized_data[i] = reuse_result(r, prev[1])
+            else:
+                todo.append(i)
+        print(f"Incremental: {len(todo)} new or changed, {len(data) - len(todo)} reused")
+
+    shards = shard([data[i] for i in todo], BATCH_SIZE)
+    stats = new_stats()
+    done = 0
+    for records, part in iter_normalized(shards, boundaries, batch, min(workers, len(shards))):
+        for record in records:
+            normalized_data[todo[done]] = record
+            done += 1
+        merge_stats(stats, part)
+        print(f"Processed {done}/{len(todo)}...")
+
+    if len(todo) < len(data):
+        # Recount in input order, reused records included
+        result_cache, pip_tiers, ward_grid = stats["result_cache"], stats["pip_tiers"], stats["ward_grid"]
+        stats = new_stats()
+        stats["result_cache"], stats["pip_tiers"], stats["ward_grid"] = result_cache, pip_tiers, ward_grid
+        for record in normalized_data:
+            tally_record(stats, record)
+    stats["reprocessed"] = len(todo)
+    stats["reused"] = len(data) - len(todo)
+
     # Save JSON
     print(f"\nSaving: {output_json}")
     with open(output_json, 'w', encoding='utf-8') as f:
         json.dump(normalized_data, f, ensure_ascii=False, indent=2)
 
-    # Save CSV
+    # Save CSV (adjusted records carry extra original_* columns)
     print(f"Saving: {output_csv}")
     if normalized_data:
-        keys = normalized_data[0].keys()
+        keys = union_fieldnames(normalized_data)
         with open(output_csv, 'w', encoding='utf-8', newline='') as f:
             writer = csv.DictWriter(f, fieldnames=keys)
             writer.writeheader()
             writer.writerows(normalized_data)
 
-    # Calculate rates
+    if output_npz is not None:
+        print(f"Saving: {output_npz}")
+        write_columns(normalized_data, output_npz)
+
+    save_manifest(output_json, boundaries.version, data, hashes, boundaries.tolerance_m)
+    return finish_stats(stats)
+
+
+def normalize_stream(input_file: Path, output_jsonl: Path, output_csv: Path, boundaries: GADMBoundaries,
+                     workers: int = 1) -> Dict:
+    """Normalize a JSON/JSONL/CSV file batch by batch, writing JSONL + CSV as it goes.
+
+    Memory stays at about BATCH_SIZE records per worker whatever the input
+    size; stats are merged batch by batch.
+    """
+    print(f"\nStreaming: {input_file}")
+    stats = new_stats()
+    batches = batched(iter_records(input_file), BATCH_SIZE)
+    with RecordWriter(output_jsonl, output_csv, extra_fields=ADJUSTED_FIELDS) as writer:
+        for records, part in iter_normalized(batches, boundaries, workers=workers):
+            writer.write_many(records)
+            merge_stats(stats, part)
+            print(f"Processed {writer.count}...")
+    print(f"Saved: {output_jsonl}, {output_csv}")
+    return finish_stats(stats)
+
+
+def finish_stats(stats: Dict) -> Dict:
+    """Add totals and match/adjust/fail/success rates to merged stats."""
+    stats["total"] = stats["qc"].total
+    stats.update(stats["qc"].status_counts())
     stats["match_rate"] = round(stats["matched"] / stats["total"] * 100, 2) if stats["total"] > 0 else 0
     stats["adjust_rate"] = round(stats["adjusted"] / stats["total"] * 100, 2) if stats["total"] > 0 else 0
     stats["fail_rate"] = round(stats["failed"] / stats["total"] * 100, 2) if stats["total"] > 0 else 0
@@ -443,8 +790,11 @@ def normalize_dataset(input_file: Path, output_json: Path, output_csv: Path, bou
     return stats
 
 
-def generate_report(stats: Dict, output_md: Path, output_json: Path):
-    """Generate QC reports."""
+def generate_report(stats: Dict, output_md: Path, output_json: Path, tolerance_m: float = 0.0):
+    """Generate QC reports (one pass over the merged counters)."""
+    qc = stats["qc"]
+    by_province = qc.groups["province"]
+    distances = qc.tallies.get("boundary_distance", {})
 
     # JSON report
     report = {
@@ -461,99 +811,181 @@ def generate_report(stats: Dict, output_md: Path, output_json: Path):
             "success_rate_percent": stats["success_rate"]
         },
         "by_match_level": stats["by_level"],
-        "by_province": dict(stats["by_province"]),
-        "by_district": dict(stats["by_district"]),
-        "sample_adjusted": stats["sample_adjusted"][:20],
-        "sample_failed": stats["sample_failed"][:20]
+        "by_method": qc.tallies.get("method", {}),
+        # Distance of outside points to their target polygon (metres)
+        "boundary_distance": {
+            "tolerance_m": tolerance_m,
+            "histogram": {label: distances.get(label, 0) for label in DISTANCE_LABELS},
+        },
+        "by_province": by_province,
+        "by_district": qc.groups["district"],
+        "sample_adjusted": qc.samples.get("adjusted", [])[:20],
+        "sample_failed": qc.samples.get("failed", [])[:20],
+        "normalizer_cache": cache_stats()
     }
+    if "reused" in stats:
+        report["incremental"] = {"reprocessed": stats["reprocessed"], "reused": stats["reused"]}
+    if stats["result_cache"]:
+        report["result_cache"] = summarize_counts(stats["result_cache"])
+    report["pip_tiers"] = summarize_tier_counts(stats["pip_tiers"])
+    report["ward_grid"] = summarize_grid_counts(stats["ward_grid"])
 
     with open(output_json, 'w', encoding='utf-8') as f:
         json.dump(report, f, ensure_ascii=False, indent=2)
 
     # Markdown report
-    md = f"""# Geo QC Report - Admin Level Verification
-
-**Generated:** {report['generated_at']}
-**Method:** {report['method']}
-
-## Summary
-
-| Metric | Value |
-|--------|-------|
-| Total Records | {stats['total']} |
-| Matched (point in correct polygon) | {stats['matched']} ({stats['match_rate']}%) |
-| Adjusted (moved to correct polygon) | {stats['adjusted']} ({stats['adjust_rate']}%) |
-| Failed (no polygon found) | {stats['failed']} ({stats['fail_rate']}%) |
-| **Success Rate** | **{stats['success_rate']}%** |
-
-## By Match Level
-
-| Level | Count |
-|-------|-------|
-| Ward | {stats['by_level'].get('ward', 0)} |
-| District | {stats['by_level'].get('district', 0)} |
-| Province | {stats['by_level'].get('province', 0)} |
-
-## By Province
-
-| Province | Total | Matched | Adjusted | Failed | Success Rate |
-|----------|-------|---------|----------|--------|--------------|
-"""
-
-    for prov, pstats in sorted(stats['by_province'].items()):
-        success = pstats['matched'] + pstats['adjusted']
-        rate = round(success / pstats['total'] * 100, 1) if pstats['total'] > 0 else 0
-        md += f"| {prov} | {pstats['total']} | {pstats['matched']} | {pstats['adjusted']} | {pstats['failed']} | {rate}% |\n"
+    md = [
+        "# Geo QC Report - Admin Level Verification",
+        "",
+        f"**Generated:** {report['generated_at']}",
+        f"**Method:** {report['method']}",
+        "",
+        "## Summary",
+        "",
+        "| Metric | Value |",
+        "|--------|-------|",
+        f"| Total Records | {stats['total']} |",
+        f"| Matched (point in correct polygon) | {stats['matched']} ({stats['match_rate']}%) |",
+        f"| Adjusted (moved to correct polygon) | {stats['adjusted']} ({stats['adjust_rate']}%) |",
+        f"| Failed (no polygon found) | {stats['failed']} ({stats['fail_rate']}%) |",
+        f"| **Success Rate** | **{stats['success_rate']}%** |",
+        "",
+        "## By Match Level",
+        "",
+        "| Level | Count |",
+        "|-------|-------|",
+        f"| Ward | {stats['by_level'].get('ward', 0)} |",
+        f"| District | {stats['by_level'].get('district', 0)} |",
+        f"| Province | {stats['by_level'].get('province', 0)} |",
+        "",
+        "## Distance to Target Polygon",
+        "",
+        f"Records outside their polygon, by distance to its boundary "
+        f"(tolerance: {tolerance_m:g} m, kept: {qc.tallies.get('method', {}).get('within_tolerance', 0)})",
+        "",
+        "| Distance | Records |",
+        "|----------|---------|",
+    ]
+    md += [f"| {label} | {count} |" for label, count in report["boundary_distance"]["histogram"].items()]
+    md += [
+        "",
+        "## By Province",
+        "",
+        "| Province | Total | Matched | Adjusted | Failed | Success Rate |",
+        "|----------|-------|---------|----------|--------|--------------|",
+    ]
+    for prov, pstats in sorted(by_province.items()):
+        success = round(rate(pstats, 'matched', 'adjusted') * 100, 1)
+        md.append(f"| {prov} | {pstats['total']} | {pstats['matched']} | {pstats['adjusted']} | {pstats['failed']} | {success}% |")
 
     # Top problem districts
-    problem_districts = sorted(
-        [(k, v) for k, v in stats['by_district'].items() if v['adjusted'] + v['failed'] > 0],
-        key=lambda x: x[1]['adjusted'] + x[1]['failed'],
-        reverse=True
-    )[:15]
-
-    md += """
-## Top Districts with Adjustments
-
-| District | Total | Matched | Adjusted | Failed |
-|----------|-------|---------|----------|--------|
-"""
+    problem_districts = qc.top("district", 15, lambda c: c['adjusted'] + c['failed'],
+                               where=lambda c: c['adjusted'] + c['failed'] > 0)
+    md += [
+        "",
+        "## Top Districts with Adjustments",
+        "",
+        "| District | Total | Matched | Adjusted | Failed |",
+        "|----------|-------|---------|----------|--------|",
+    ]
     for k, dstats in problem_districts:
         province, district = k.split('|')
-        md += f"| {district} ({province[:10]}...) | {dstats['total']} | {dstats['matched']} | {dstats['adjusted']} | {dstats['failed']} |\n"
+        md.append(f"| {district} ({province[:10]}...) | {dstats['total']} | {dstats['matched']} | {dstats['adjusted']} | {dstats['failed']} |")
 
     # Sample adjusted
-    md += """
-## Sample Adjusted Records
-
-| ID | District | Ward | Old Lat/Lon | New Lat/Lon | Level |
-|----|----------|------|-------------|-------------|-------|
-"""
-    for s in stats['sample_adjusted'][:20]:
-        md += f"| {s['id']} | {s['district']} | {s.get('ward','')} | ({s['old_lat']:.4f}, {s['old_lon']:.4f}) | ({s['new_lat']:.4f}, {s['new_lon']:.4f}) | {s['match_level']} |\n"
-
-    if stats['sample_failed']:
-        md += """
-## Sample Failed Records
-
-| ID | Province | District | Ward | Reason |
-|----|----------|----------|------|--------|
-"""
-        for s in stats['sample_failed'][:20]:
-            md += f"| {s['id']} | {s['province']} | {s['district']} | {s.get('ward','')} | {s['reason'][:50]}... |\n"
-
-    md += """
-## Verification Target
+    md += [
+        "",
+        "## Sample Adjusted Records",
+        "",
+        "| ID | District | Ward | Old Lat/Lon | New Lat/Lon | Level |",
+        "|----|----------|------|-------------|-------------|-------|",
+    ]
+    for s in report['sample_adjusted']:
+        old = f"({s['old_lat']:.4f}, {s['old_lon']:.4f})" if s['old_lat'] is not None and s['old_lon'] is not None else "(none)"
+        md.append(f"| {s['id']} | {s['district']} | {s.get('ward','')} | {old} | ({s['new_lat']:.4f}, {s['new_lon']:.4f}) | {s['match_level']} |")
+
+    if report['sample_failed']:
+        md += [
+            "",
+            "## Sample Failed Records",
+            "",
+            "| ID | Province | District | Ward | Reason |",
+            "|----|----------|----------|------|--------|",
+        ]
+        for s in report['sample_failed']:
+            md.append(f"| {s['id']} | {s['province']} | {s['district']} | {s.get('ward','')} | {s['reason'][:50]}... |")
 
-| Target | Required | Actual | Status |
-|--------|----------|--------|--------|
-"""
     district_success = stats['success_rate']
-    md += f"| District Match | >= 99% | {district_success}% | {'✅' if district_success >= 99 else '⚠️'} |\n"
-    md += f"| Failed Records | <= 1% | {stats['fail_rate']}% | {'✅' if stats['fail_rate'] <= 1 else '⚠️'} |\n"
+    md += [
+        "",
+        "## Verification Target",
+        "",
+        "| Target | Required | Actual | Status |",
+        "|--------|----------|--------|--------|",
+        f"| District Match | >= 99% | {district_success}% | {'✅' if district_success >= 99 else '⚠️'} |",
+        f"| Failed Records | <= 1% | {stats['fail_rate']}% | {'✅' if stats['fail_rate'] <= 1 else '⚠️'} |",
+    ]
+
+    cache = report["normalizer_cache"]
+    md += [
+        "",
+        "## Name Normalizer Cache",
+        "",
+        "| Hits | Misses | Hit Rate |",
+        "|------|--------|----------|",
+        f"| {cache['hits']} | {cache['misses']} | {cache['hit_rate'] * 100:.1f}% |",
+    ]
+
+    if "incremental" in report:
+        md += [
+            "",
+            "## Incremental Run",
+            "",
+            "| Reprocessed (new/changed) | Reused from last run |",
+            "|---------------------------|----------------------|",
+            f"| {stats['reprocessed']} | {stats['reused']} |",
+        ]
+
+    if "result_cache" in report:
+        rc = report["result_cache"]
+        md += [
+            "",
+            "## Result Cache",
+            "",
+            "| Table | Hits | Misses | Hit Rate |",
+            "|-------|------|--------|----------|",
+            f"| Resolutions | {rc['resolution']['hits']} | {rc['resolution']['misses']} | {rc['resolution']['hit_rate'] * 100:.1f}% |",
+            f"| Containment | {rc['containment']['hits']} | {rc['containment']['misses']} | {rc['containment']['hit_rate'] * 100:.1f}% |",
+        ]
+
+    tiers = report["pip_tiers"]
+    if tiers["points"]:
+        md += [
+            "",
+            "## PIP Tiers",
+            "",
+            "| Tier | Points | Hit Rate |",
+            "|------|--------|----------|",
+            f"| Inner envelope (inside) | {tiers['inner']} | {tiers['inner_rate'] * 100:.1f}% |",
+            f"| Outer envelope (outside) | {tiers['outer']} | {tiers['outer_rate'] * 100:.1f}% |",
+            f"| Boundary band (exact check) | {tiers['exact']} | {tiers['exact_rate'] * 100:.1f}% |",
+            f"| Untiered polygons (exact check) | {tiers['direct']} | {tiers['direct_rate'] * 100:.1f}% |",
+        ]
+
+    grid = report["ward_grid"]
+    if grid["points"]:
+        md += [
+            "",
+            "## Ward Grid",
+            "",
+            "| Lookup | Points | Share |",
+            "|--------|--------|-------|",
+            f"| Cell lookup | {grid['cell_hits']} | {grid['cell_hit_rate'] * 100:.1f}% |",
+            f"| Exact check (boundary cells) | {grid['exact_checks']} | {(1 - grid['cell_hit_rate']) * 100:.1f}% |",
+        ]
 
     with open(output_md, 'w', encoding='utf-8') as f:
-        f.write(md)
+        f.write("\n".join(md) + "\n")
 
     print(f"Reports saved: {output_md}, {output_json}")
 
@@ -563,15 +995,41 @@ def generate_report(stats: Dict, output_md: Path, output_json: Path):
 # ==============================================================================
 
 def main():
+    parser = argparse.ArgumentParser(description='Admin-level PIP normalization (GADM level 3)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help=f'Worker processes, one {BATCH_SIZE}-record batch per task '
+                             f'(0 = all {default_workers()} CPUs)')
+    parser.add_argument('--input', '-i', type=Path, help='Input JSON, JSONL or CSV (default: archived 3-city dataset)')
+    parser.add_argument('--output', '-o', type=Path, help='Output base path without extension')
+    parser.add_argument('--stream', action='store_true',
+                        help='Read and write record by record (JSONL + CSV output), constant memory')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only reprocess records whose geo fields changed since the last run')
+    parser.add_argument('--result-cache', type=Path, nargs='?', const=DEFAULT_RESULT_CACHE,
+                        help=f'Reuse admin resolutions and PIP verdicts across runs via a SQLite cache '
+                             f'(default path: {DEFAULT_RESULT_CACHE})')
+    parser.add_argument('--columnar', action='store_true',
+                        help='Also write a typed columnar .npz (read it with geo_columnar.ColumnarListings)')
+    parser.add_argument('--tolerance-m', type=float, default=0.0,
+                        help='Keep points at most this many metres outside their polygon unmoved (0 = move all)')
+    args = parser.parse_args()
+    if args.incremental and args.stream:
+        parser.error("--incremental needs the previous JSON output; it cannot be combined with --stream")
+    if args.columnar and args.stream:
+        parser.error("--columnar needs the full result set; it cannot be combined with --stream")
+    workers = args.workers if args.workers > 0 else default_workers()
+
     script_dir = Path(__file__).parent
     project_root = script_dir.parent
 
     # ARCHIVED: This script was used to normalize old dataset
     # Current dataset: app/data/listings_vn_postmerge.json (already normalized)
     # Input/output paths (for reference only)
-    input_file = project_root / "app" / "data" / "vn_rental_3cities_verified.json"
-    output_json = project_root / "app" / "data" / "vn_rental_3cities_geo_verified.json"
-    output_csv = project_root / "app" / "data" / "vn_rental_3cities_geo_verified.csv"
+    input_file = args.input or project_root / "app" / "data" / "vn_rental_3cities_verified.json"
+    output_base = args.output or project_root / "app" / "data" / "vn_rental_3cities_geo_verified"
+    output_json = output_base.with_name(output_base.name + (".jsonl" if args.stream else ".json"))
+    output_csv = output_base.with_name(output_base.name + ".csv")
+    output_npz = output_base.with_name(output_base.name + ".npz") if args.columnar else None
     report_md = project_root / "reports" / "geo_qc_report_admin.md"
     report_json = project_root / "reports" / "geo_qc_report_admin.json"
 
@@ -580,14 +1038,17 @@ def main():
     (project_root / "reports").mkdir(parents=True, exist_ok=True)
 
     # Load boundaries
-    boundaries = GADMBoundaries()
-    boundaries.load()
+    boundaries = load_boundaries(result_cache=args.result_cache, tolerance_m=args.tolerance_m)
 
     # Normalize dataset
-    stats = normalize_dataset(input_file, output_json, output_csv, boundaries)
+    if args.stream:
+        stats = normalize_stream(input_file, output_json, output_csv, boundaries, workers=workers)
+    else:
+        stats = normalize_dataset(input_file, output_json, output_csv, boundaries, workers=workers,
+                                  incremental=args.incremental, output_npz=output_npz)
 
     # Generate reports
-    generate_report(stats, report_md, report_json)
+    generate_report(stats, report_md, report_json, boundaries.tolerance_m)
 
     # Print summary
     print("\n" + "="*60)
@@ -598,6 +1059,15 @@ def main():
     print(f"Adjusted: {stats['adjusted']} ({stats['adjust_rate']}%)")
     print(f"Failed: {stats['failed']} ({stats['fail_rate']}%)")
     print(f"Success Rate: {stats['success_rate']}%")
+    if "reused" in stats:
+        print(f"Reprocessed: {stats['reprocessed']}, reused from last run: {stats['reused']}")
+    if stats["result_cache"]:
+        rc = summarize_counts(stats["result_cache"])
+        print(f"Result cache: resolution {rc['resolution']['hit_rate'] * 100:.1f}% hits, "
+              f"containment {rc['containment']['hit_rate'] * 100:.1f}% hits")
+    print(format_tier_stats(summarize_tier_counts(stats["pip_tiers"])))
+    print(format_grid_stats(summarize_grid_counts(stats["ward_grid"])))
+    print(format_cache_stats())
     print(f"\nOutput: {output_json}")
     print(f"Report: {report_md}")
 
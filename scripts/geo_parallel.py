@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+JFinder Geo Parallel - Process-pool sharding for the normalizers
+================================================================
+Chia listings thành shard và chạy trên process pool. Boundary index được
+chia sẻ cho worker theo một trong hai cách:
+
+- fork (Linux): worker kế thừa index của process cha (copy-on-write),
+  không phải serialize hay load lại;
+- spawn (macOS/Windows): mỗi worker gọi `loader()` một lần, thường là
+  load lại index từ boundary cache trên đĩa.
+
+Kết quả trả về đúng thứ tự shard đầu vào. Thống kê memo cache của
+geo_text trong worker được cộng dồn vào process cha.
+
+Usage:
+    results = map_shards(process_shard, shards, state=index, workers=8,
+                         loader=partial(load_index, boundaries_path))
+    for result in imap_shards(process_shard, batched(records, 10000), state=index, workers=8):
+        ...  # streaming: only a few shards are in flight at a time
+
+    def process_shard(index, shard_no, records): ...
+"""
+
+import multiprocessing as mp
+import os
+from collections import deque
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence
+
+from geo_text import add_worker_stats, cache_stats
+
+# Worker-side shared state: inherited via fork or built by the pool initializer
+_STATE: Any = None
+
+
+def default_workers() -> int:
+    """Usable CPU count."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def shard(items: Sequence[Any], size: int) -> List[Sequence[Any]]:
+    """Consecutive slices of at most `size` items."""
+    size = max(1, size)
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+def _init_worker(loader: Optional[Callable[[], Any]]):
+    global _STATE
+    if loader is not None:
+        _STATE = loader()
+
+
+def _run_shard(task):
+    fn, shard_no, items = task
+    before = cache_stats()
+    result = fn(_STATE, shard_no, items)
+    after = cache_stats()
+    return result, after['hits'] - before['hits'], after['misses'] - before['misses']
+
+
+def map_shards(fn: Callable[[Any, int, Any], Any], shards: Iterable[Any], state: Any = None,
+               workers: int = 1, loader: Optional[Callable[[], Any]] = None) -> List[Any]:
+    """Apply `fn(state, shard_no, shard)` to every shard; results in input order.
+
+    `fn` and `loader` must be module-level functions (picklable). With
+    workers <= 1 the shards run in this process.
+    """
+    shards = list(shards)
+    return list(imap_shards(fn, shards, state, min(workers, len(shards)), loader))
+
+
+def imap_shards(fn: Callable[[Any, int, Any], Any], shards: Iterable[Any], state: Any = None,
+                workers: int = 1, loader: Optional[Callable[[], Any]] = None) -> Iterator[Any]:
+    """Lazy map_shards: yields results in input order as they complete.
+
+    `shards` is consumed lazily; at most two shards per worker are in
+    flight, so memory stays bounded for streamed input.
+    """
+    if workers <= 1:
+        for i, items in enumerate(shards):
+            yield fn(state, i, items)
+        return
+
+    global _STATE
+    if 'fork' in mp.get_all_start_methods():
+        ctx, initargs = mp.get_context('fork'), (None,)
+        _STATE = state  # inherited copy-on-write by the forked workers
+    else:
+        if loader is None:
+            raise ValueError("imap_shards needs a loader when the fork start method is unavailable")
+        ctx, initargs = mp.get_context('spawn'), (loader,)
+
+    try:
+        with ctx.Pool(workers, initializer=_init_worker, initargs=initargs) as pool:
+            pending = deque()
+            for i, items in enumerate(shards):
+                pending.append(pool.apply_async(_run_shard, ((fn, i, items),)))
+                if len(pending) >= 2 * workers:
+                    yield _collect(pending.popleft())
+            while pending:
+                yield _collect(pending.popleft())
+    finally:
+        _STATE = None
+
+
+def _collect(async_result) -> Any:
+    result, hits, misses = async_result.get()
+    add_worker_stats(hits, misses)
+    return result
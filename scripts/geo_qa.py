@@ -2,28 +2,46 @@
 """
 JFinder Geo QA - Admin Level Point-in-Polygon Verification
 ==========================================================
-Validates that each listing's lat/lon is within the correct district polygon.
+Validates that each listing's lat/lon is within the correct district polygon,
+and spatially joins all points against the GADM wards (one bulk indexed query)
+to report ward-level agreement and where misplaced listings actually landed.
+Failing points are measured (in metres, UTM) to their listed district to tell
+near-misses from gross errors.
 Uses GADM Level 3 boundaries for Vietnam.
 
 Usage:
     python scripts/geo_qa.py
+    python scripts/geo_qa.py --result-cache   # reuse PIP verdicts across runs
+    python scripts/geo_qa.py --input out/listings_geo.npz   # columnar output of the normalizers
 """
 
+import argparse
+import heapq
 import json
-import unicodedata
-import re
+import time
 from pathlib import Path
 from datetime import datetime
-from collections import defaultdict
+from collections import Counter
+from itertools import islice
 
 try:
-    import geopandas as gpd
-    from shapely.geometry import Point
-    from shapely.ops import unary_union
+    import numpy as np
+    import shapely
 except ImportError:
-    print("pip install geopandas shapely")
+    print("pip install shapely")
     exit(1)
 
+from geo_text import normalize, cache_stats, format_cache_stats
+from geo_hierarchy import BoundaryHierarchy
+from geo_cache import BoundaryCache, pack_levels, unpack_levels
+from geo_reader import read_features, format_load_stats
+from geo_spatial import to_coord_array, batch_contains, PolygonTiers, format_tier_stats
+from geo_grid import GRID_CELL_SIZE, load_grid, format_grid_stats
+from geo_results import DEFAULT_RESULT_CACHE, ResultCache
+from geo_columnar import ColumnarListings
+from geo_qc import QCAggregator
+from geo_metric import MetricProjector, distance_histogram
+
 # Paths
 DATA_FILE = Path("app/data/listings_vn_postmerge.json")
 GADM_FILE = Path("data/boundaries/gadm41_VNM_3.json")
@@ -32,184 +50,336 @@ REPORT_JSON = Path("reports/geo_qc_report.json")
 BAD_SAMPLES_CSV = Path("reports/geo_bad_samples.csv")
 
 CITIES = ["HồChíMinh", "ĐàNẵng", "HàNội"]
-
-# Vietnamese character normalization
-VIET_CHARS = {
-    'à': 'a', 'á': 'a', 'ả': 'a', 'ã': 'a', 'ạ': 'a',
-    'ă': 'a', 'ằ': 'a', 'ắ': 'a', 'ẳ': 'a', 'ẵ': 'a', 'ặ': 'a',
-    'â': 'a', 'ầ': 'a', 'ấ': 'a', 'ẩ': 'a', 'ẫ': 'a', 'ậ': 'a',
-    'è': 'e', 'é': 'e', 'ẻ': 'e', 'ẽ': 'e', 'ẹ': 'e',
-    'ê': 'e', 'ề': 'e', 'ế': 'e', 'ể': 'e', 'ễ': 'e', 'ệ': 'e',
-    'ì': 'i', 'í': 'i', 'ỉ': 'i', 'ĩ': 'i', 'ị': 'i',
-    'ò': 'o', 'ó': 'o', 'ỏ': 'o', 'õ': 'o', 'ọ': 'o',
-    'ô': 'o', 'ồ': 'o', 'ố': 'o', 'ổ': 'o', 'ỗ': 'o', 'ộ': 'o',
-    'ơ': 'o', 'ờ': 'o', 'ớ': 'o', 'ở': 'o', 'ỡ': 'o', 'ợ': 'o',
-    'ù': 'u', 'ú': 'u', 'ủ': 'u', 'ũ': 'u', 'ụ': 'u',
-    'ư': 'u', 'ừ': 'u', 'ứ': 'u', 'ử': 'u', 'ữ': 'u', 'ự': 'u',
-    'ỳ': 'y', 'ý': 'y', 'ỷ': 'y', 'ỹ': 'y', 'ỵ': 'y',
-    'đ': 'd', 'Đ': 'd'
-}
+# Listing fields used by the QA (besides coordinates)
+QA_FIELDS = ("id", "province", "district", "ward", "geo_status")
+# Boundary levels kept in the cache: wards for the spatial join, dissolved districts for the PIP check
+LEVELS = ('ward', 'district')
+# Rows in the misplacement tables
+TOP_MISPLACED = 20
 
 
 def normalize_name(name: str) -> str:
     """Normalize Vietnamese admin name for matching."""
-    if not name:
-        return ""
-    name = str(name).lower().strip()
-    name = unicodedata.normalize('NFC', name)
-    for viet, ascii_char in VIET_CHARS.items():
-        name = name.replace(viet, ascii_char)
-    name = re.sub(r'[^\w\s]', '', name)
-    name = re.sub(r'\s+', ' ', name).strip()
-    # Remove prefixes - handle both "quan 1" and "quan1" formats
-    for prefix in ['quan', 'huyen', 'thi xa', 'phuong', 'xa', 'thi tran', 'thanh pho']:
-        if name.startswith(prefix + ' '):
-            name = name[len(prefix)+1:].strip()
-        elif name.startswith(prefix) and len(name) > len(prefix) and name[len(prefix)].isdigit():
-            # Handle "quan1" format (no space before number)
-            name = name[len(prefix):].strip()
-    return name.replace(' ', '')
+    return normalize(name, 'compact')
+
+
+def load_listings(path: Path):
+    """QA columns of a listings file: ({field: values}, raw latitudes, raw longitudes).
+
+    JSON is parsed record by record; a columnar .npz (geo_columnar) is read
+    column by column without building per-record dicts.
+    """
+    if path.suffix == '.npz':
+        with ColumnarListings(path) as listings:
+            columns = {
+                field: listings.column(field) if field in listings.kinds else [None] * len(listings)
+                for field in QA_FIELDS
+            }
+            lats = [0 if v is None else v for v in listings.column('latitude')]
+            lons = [0 if v is None else v for v in listings.column('longitude')]
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        columns = {field: [r.get(field) for r in data] for field in QA_FIELDS}
+        lats = [r.get('latitude', 0) for r in data]
+        lons = [r.get('longitude', 0) for r in data]
+    for field in ("province", "district", "ward"):
+        columns[field] = ['' if v is None else v for v in columns[field]]
+    return columns, lats, lons
 
 
 def main():
+    parser = argparse.ArgumentParser(description='District-level point-in-polygon QA')
+    parser.add_argument('--input', '-i', type=Path, default=DATA_FILE,
+                        help=f'Listings JSON or columnar .npz (default: {DATA_FILE})')
+    parser.add_argument('--result-cache', type=Path, nargs='?', const=DEFAULT_RESULT_CACHE,
+                        help=f'Reuse PIP verdicts across runs via a SQLite cache (default path: {DEFAULT_RESULT_CACHE})')
+    args = parser.parse_args()
+
     print("=" * 60)
-    print("GEO QA - District-Level Point-in-Polygon Verification")
+    print("GEO QA - District/Ward-Level Point-in-Polygon Verification")
     print("=" * 60)
 
     # Load data
-    print(f"\nLoading data from {DATA_FILE}...")
-    with open(DATA_FILE, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    print(f"Loaded {len(data)} records")
-
-    # Load GADM
-    print(f"Loading GADM from {GADM_FILE}...")
-    gdf = gpd.read_file(GADM_FILE)
-    gdf = gdf[gdf['NAME_1'].isin(CITIES)]
-    print(f"Filtered to {len(gdf)} wards in 3 cities")
-
-    # Build district polygons - include all polygons regardless of district name
-    district_polys = {}
-    all_polys = []  # For checking if point is within any polygon
-    for idx, row in gdf.iterrows():
-        k = normalize_name(row['NAME_2'])
-        all_polys.append(row.geometry)
-        if k not in district_polys:
-            district_polys[k] = row.geometry
-        else:
-            district_polys[k] = unary_union([district_polys[k], row.geometry])
+    print(f"\nLoading data from {args.input}...")
+    columns, raw_lats, raw_lons = load_listings(args.input)
+    total = len(raw_lats)
+    print(f"Loaded {total} records")
+
+    # Load GADM (ward and district polygons come from the boundary cache when warm)
+    hierarchy = BoundaryHierarchy(LEVELS)
+    cache = BoundaryCache('geo_qa', params={'provinces': CITIES, 'levels': LEVELS})
+    payload = cache.load(GADM_FILE)
+    if payload is not None:
+        unpack_levels(hierarchy, payload['levels'])
+        print(f"Loaded boundary cache in {cache.last_load_seconds:.2f}s")
+    else:
+        print(f"Loading GADM from {GADM_FILE}...")
+        start = time.perf_counter()
+        wards = list(read_features(GADM_FILE, provinces=CITIES))
+        print(format_load_stats(len(wards), time.perf_counter() - start))
+        print(f"Filtered to {len(wards)} wards in 3 cities")
+
+        # Build ward and district polygons - include all polygons regardless of district name
+        for props, geometry in wards:
+            district = normalize_name(props['NAME_2'])
+            hierarchy.add(geometry, ward=(district, normalize_name(props['NAME_3'])), district=district)
+        print(f"Saved boundary cache: {cache.save(GADM_FILE, {'levels': pack_levels(hierarchy)})}")
+
+    district_polys = hierarchy.level('district')
     print(f"Built {len(district_polys)} district polygons")
-    all_city_boundary = unary_union(all_polys)
+    tiers = PolygonTiers()
+    print(f"PIP tiers: {tiers.add(district_polys.values())} of {len(district_polys)} district polygons simplified")
+
+    # Point-in-polygon for every record at once (district key -> polygon)
+    keys = [normalize_name(district) for district in columns['district']]
+    lats = to_coord_array(raw_lats)
+    lons = to_coord_array(raw_lons)
+    results = (ResultCache('geo_qa', cache.version(GADM_FILE), args.result_cache, slot=cache.slot(GADM_FILE))
+               if args.result_cache else None)
+    if results is not None:
+        resolved = results.resolve_many(
+            [(k,) for k in keys],
+            lambda key: (key[0], 'district') if key[0] in district_polys else (None, 'none'))
+        polygon_ids = [polygon_id for polygon_id, _ in resolved]
+        inside = results.contains_many(polygon_ids, [district_polys.get(k) if k else None for k in polygon_ids],
+                                       lats, lons, tiers)
+    else:
+        inside = batch_contains([district_polys.get(k) for k in keys], lats, lons, tiers)
+
+    # Spatial join: the GADM ward each point actually lies in, for all points at once,
+    # through the ward grid (kept next to the boundary cache)
+    ward_polys = hierarchy.level('ward')
+    ward_keys = list(ward_polys)
+    start = time.perf_counter()
+    grid = load_grid(BoundaryCache('geo_qa_grid', params={'provinces': CITIES, 'cell_size': GRID_CELL_SIZE}),
+                     GADM_FILE, ward_keys, list(ward_polys.values()))
+    grid_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    located = grid.locate(lats, lons)
+    join_seconds = time.perf_counter() - start
+    grid_stats = grid.stats()
+    print(f"Ward grid: {grid_stats['cells']} cells ({grid_stats['boundary_cells']} on boundaries) "
+          f"in {grid_seconds:.2f}s")
+    print(f"Spatial join: {total} points x {len(ward_keys)} wards in {join_seconds:.2f}s")
+
+    # Claimed ward (listing district + ward) as an index into ward_keys; -1 = not a GADM ward
+    ward_ids = {key: i for i, key in enumerate(ward_keys)}
+    claimed = np.fromiter((ward_ids.get((d, normalize_name(w)), -1) for d, w in zip(keys, columns['ward'])),
+                          dtype=np.intp, count=total)
+    checked = claimed >= 0
+    ward_ok = checked & (located == claimed)
 
     # Verify records - NEW LOGIC:
     # 1. geo_status=matched → point should be in district polygon
     # 2. geo_status=adjusted → trust metadata (already normalized)
     # 3. Check if ALL points are within city boundaries
     print("\nVerifying records...")
-    match = 0
-    fail = 0
-    bad_samples = []
-    by_province = defaultdict(lambda: {"total": 0, "ok": 0})
-    by_district = defaultdict(lambda: {"total": 0, "ok": 0})
-
-    for r in data:
-        lat = r.get('latitude', 0)
-        lon = r.get('longitude', 0)
-        province = r.get('province', '')
-        district = r.get('district', '')
-
-        point = Point(lon, lat)
-        k = normalize_name(district)
-
-        by_province[province]["total"] += 1
-        by_district[district]["total"] += 1
-
-        if k in district_polys and district_polys[k].contains(point):
-            match += 1
-            by_province[province]["ok"] += 1
-            by_district[district]["ok"] += 1
-        else:
-            fail += 1
-            if len(bad_samples) < 100:
-                bad_samples.append({
-                    "id": r.get("id"),
-                    "province": province,
-                    "district": district,
-                    "ward": r.get("ward", ""),
-                    "latitude": lat,
-                    "longitude": lon,
-                    "geo_status": r.get("geo_status"),
-                })
+    qc = QCAggregator(levels=('province', 'district'), statuses=('ok',), sample_limit=100)
+    groups = Counter(zip(columns['province'], columns['district'], inside.tolist()))
+    for (province, district, ok), count in groups.items():
+        qc.record((province, district), 'ok' if ok else 'fail', count)
+    for i in islice((i for i in range(total) if not inside[i]), qc.sample_limit):
+        landed = ward_keys[located[i]] if located[i] >= 0 else ("", "")
+        qc.sample('bad', {
+            "id": columns['id'][i],
+            "province": columns['province'][i],
+            "district": columns['district'][i],
+            "ward": columns['ward'][i],
+            "latitude": raw_lats[i],
+            "longitude": raw_lons[i],
+            "geo_status": columns['geo_status'][i],
+            "located_district": landed[0],
+            "located_ward": landed[1],
+        })
+    bad_samples = qc.samples.get('bad', [])
+    match = qc.by_status.get('ok', 0)
+    fail = qc.total - match
+    by_province = qc.groups['province']
+
+    # Ward agreement per claimed ward, and where misplaced points landed
+    wards = QCAggregator(levels=('district', 'ward'), statuses=('ok',))
+    for (c, ok), count in Counter(zip(claimed[checked].tolist(), ward_ok[checked].tolist())).items():
+        wards.record((ward_keys[c][0], ward_keys[c]), 'ok' if ok else 'fail', count)
+    ward_match = wards.by_status.get('ok', 0)
+    ward_checked = wards.total
+    ward_rate = 100 * ward_match / ward_checked if ward_checked > 0 else 0
+    outside_wards = int(np.count_nonzero(located < 0))
+
+    def landed_name(i: int) -> str:
+        return "|".join(ward_keys[i]) if i >= 0 else "(outside all wards)"
+
+    failed = np.flatnonzero(~inside)
+    district_moves = Counter(
+        (keys[i], ward_keys[w][0] if w >= 0 else "(outside all wards)")
+        for i, w in zip(failed.tolist(), located[failed].tolist()))
+    # How far failing points are from their listed district
+    fail_distances = MetricProjector().boundary_distances(
+        [district_polys.get(keys[i]) for i in failed.tolist()], lats[failed], lons[failed])
+    fail_histogram = distance_histogram(fail_distances)
+    wrong = np.flatnonzero(checked & ~ward_ok)
+    ward_moves = Counter(zip(claimed[wrong].tolist(), located[wrong].tolist()))
+    misplaced_districts = [
+        {"district": claimed_d, "landed_district": landed_d, "count": count}
+        for (claimed_d, landed_d), count in heapq.nlargest(TOP_MISPLACED, district_moves.items(),
+                                                            key=lambda item: item[1])
+    ]
+    misplaced_wards = [
+        {"ward": "|".join(ward_keys[c]), "landed_ward": landed_name(w), "count": count}
+        for (c, w), count in heapq.nlargest(TOP_MISPLACED, ward_moves.items(), key=lambda item: item[1])
+    ]
 
     rate = 100 * match / (match + fail) if (match + fail) > 0 else 0
     passed = rate >= 99
 
     # Generate report
-    report_md = f"""# Geo QC Report - Admin Level Verification
-
-**Generated:** {datetime.now().isoformat()}
-**Dataset:** {DATA_FILE}
-**Boundaries:** GADM Level 3 (Vietnam)
-
-## Summary
-
-| Metric | Value |
-|--------|-------|
-| Total Records | {len(data)} |
-| District Match | {match} ({rate:.2f}%) |
-| District Fail | {fail} |
-| **Status** | **{"✅ PASS" if passed else "❌ FAIL"}** |
-
-## Acceptance Criteria
-
-- **District Match Rate >= 99%**: {"✅ PASS" if passed else "❌ FAIL"} ({rate:.2f}%)
-
-## By Province
-
-| Province | Total | Match | Rate |
-|----------|-------|-------|------|
-"""
+    report_md = [
+        "# Geo QC Report - Admin Level Verification",
+        "",
+        f"**Generated:** {datetime.now().isoformat()}",
+        f"**Dataset:** {args.input}",
+        "**Boundaries:** GADM Level 3 (Vietnam)",
+        "",
+        "## Summary",
+        "",
+        "| Metric | Value |",
+        "|--------|-------|",
+        f"| Total Records | {total} |",
+        f"| District Match | {match} ({rate:.2f}%) |",
+        f"| District Fail | {fail} |",
+        f"| Ward Match | {ward_match} / {ward_checked} ({ward_rate:.2f}%) |",
+        f"| Ward Not in GADM | {total - ward_checked} |",
+        f"| Outside All Wards | {outside_wards} |",
+        f"| **Status** | **{'✅ PASS' if passed else '❌ FAIL'}** |",
+        "",
+        "## Acceptance Criteria",
+        "",
+        f"- **District Match Rate >= 99%**: {'✅ PASS' if passed else '❌ FAIL'} ({rate:.2f}%)",
+        "",
+        "## By Province",
+        "",
+        "| Province | Total | Match | Rate |",
+        "|----------|-------|-------|------|",
+    ]
     for prov, s in sorted(by_province.items()):
-        pct = 100 * s["ok"] / s["total"] if s["total"] > 0 else 0
-        report_md += f"| {prov} | {s['total']} | {s['ok']} | {pct:.1f}% |\n"
-
-    report_md += """
-## By District (Top 20)
-
-| District | Total | Match | Rate |
-|----------|-------|-------|------|
-"""
-    sorted_districts = sorted(by_district.items(), key=lambda x: x[1]["total"], reverse=True)[:20]
-    for dist, s in sorted_districts:
-        pct = 100 * s["ok"] / s["total"] if s["total"] > 0 else 0
-        report_md += f"| {dist} | {s['total']} | {s['ok']} | {pct:.1f}% |\n"
+        report_md.append(f"| {prov} | {s['total']} | {s['ok']} | {100 * s['ok'] / s['total'] if s['total'] > 0 else 0:.1f}% |")
+
+    report_md += [
+        "",
+        "## By District (Top 20)",
+        "",
+        "| District | Total | Match | Rate |",
+        "|----------|-------|-------|------|",
+    ]
+    for dist, s in qc.top('district', 20, lambda c: c['total']):
+        report_md.append(f"| {dist} | {s['total']} | {s['ok']} | {100 * s['ok'] / s['total'] if s['total'] > 0 else 0:.1f}% |")
+
+    report_md += [
+        "",
+        "## Wards with Most Mismatches (Top 20)",
+        "",
+        "| District | Ward | Total | Match | Rate |",
+        "|----------|------|-------|-------|------|",
+    ]
+    for (dist, ward), s in wards.top('ward', 20, lambda c: c['total'] - c['ok'], where=lambda c: c['ok'] < c['total']):
+        report_md.append(f"| {dist} | {ward} | {s['total']} | {s['ok']} | {100 * s['ok'] / s['total']:.1f}% |")
+
+    if any(fail_histogram.values()):
+        report_md += [
+            "",
+            "## Distance of Failing Points to Listed District",
+            "",
+            "| Distance | Count |",
+            "|----------|-------|",
+        ]
+        report_md += [f"| {label} | {count} |" for label, count in fail_histogram.items()]
+
+    tier_stats = tiers.stats()
+    if tier_stats['points']:
+        report_md += [
+            "",
+            "## District PIP Tiers",
+            "",
+            "| Tier | Points | Hit Rate |",
+            "|------|--------|----------|",
+        ]
+        report_md += [f"| {tier} | {tier_stats[tier]} | {tier_stats[f'{tier}_rate'] * 100:.1f}% |"
+                      for tier in PolygonTiers.TIERS]
+
+    if grid_stats['points']:
+        report_md += [
+            "",
+            "## Ward Grid (Spatial Join)",
+            "",
+            f"- Cells: {grid_stats['cells']} of {grid_stats['cell_size']}° ({grid_stats['boundary_cells']} on ward boundaries)",
+            f"- Cell lookup: {grid_stats['cell_hits']} ({grid_stats['cell_hit_rate'] * 100:.1f}%)",
+            f"- Exact check (boundary cells): {grid_stats['exact_checks']}",
+        ]
+
+    if misplaced_districts:
+        report_md += [
+            "",
+            f"## District Misplacements (Top {TOP_MISPLACED})",
+            "",
+            "| Listed District | Landed In | Count |",
+            "|-----------------|-----------|-------|",
+        ]
+        for m in misplaced_districts:
+            report_md.append(f"| {m['district']} | {m['landed_district']} | {m['count']} |")
+
+    if misplaced_wards:
+        report_md += [
+            "",
+            f"## Ward Misplacements (Top {TOP_MISPLACED})",
+            "",
+            "| Listed Ward | Landed In | Count |",
+            "|-------------|-----------|-------|",
+        ]
+        for m in misplaced_wards:
+            report_md.append(f"| {m['ward']} | {m['landed_ward']} | {m['count']} |")
 
     if bad_samples:
-        report_md += f"""
-## Bad Samples ({len(bad_samples)} records)
-
-| ID | District | Lat | Lon |
-|----|----------|-----|-----|
-"""
+        report_md += [
+            "",
+            f"## Bad Samples ({len(bad_samples)} records)",
+            "",
+            "| ID | District | Lat | Lon | Landed In |",
+            "|----|----------|-----|-----|-----------|",
+        ]
         for s in bad_samples[:10]:
-            report_md += f"| {s['id']} | {s['district']} | {s['latitude']:.5f} | {s['longitude']:.5f} |\n"
+            landed = f"{s['located_district']}|{s['located_ward']}" if s['located_district'] else "(outside all wards)"
+            report_md.append(f"| {s['id']} | {s['district']} | {s['latitude']:.5f} | {s['longitude']:.5f} | {landed} |")
 
     # Save reports
     REPORT_MD.parent.mkdir(parents=True, exist_ok=True)
     with open(REPORT_MD, 'w', encoding='utf-8') as f:
-        f.write(report_md)
+        f.write("\n".join(report_md) + "\n")
     print(f"\nSaved: {REPORT_MD}")
 
     report_json = {
         "generated": datetime.now().isoformat(),
-        "total": len(data),
+        "total": total,
         "district_match": match,
         "district_match_rate": rate,
         "district_fail": fail,
         "passed": passed,
-        "by_province": dict(by_province),
-        "bad_samples_count": len(bad_samples)
+        "by_province": by_province,
+        "ward_checked": ward_checked,
+        "ward_match": ward_match,
+        "ward_match_rate": ward_rate,
+        "ward_not_in_gadm": total - ward_checked,
+        "outside_all_wards": outside_wards,
+        "fail_distance_histogram": fail_histogram,
+        "misplaced_districts": misplaced_districts,
+        "misplaced_wards": misplaced_wards,
+        "spatial_join": {"points": total, "wards": len(ward_keys), "seconds": round(join_seconds, 3)},
+        "ward_grid": grid_stats,
+        "pip_tiers": tier_stats,
+        "bad_samples_count": len(bad_samples),
+        "normalizer_cache": cache_stats()
     }
+    if results is not None:
+        report_json["result_cache"] = results.stats()
     with open(REPORT_JSON, 'w', encoding='utf-8') as f:
         json.dump(report_json, f, indent=2, ensure_ascii=False)
     print(f"Saved: {REPORT_JSON}")
@@ -226,9 +396,15 @@ def main():
     print("\n" + "=" * 60)
     print("SUMMARY")
     print("=" * 60)
-    print(f"Total: {len(data)}")
+    print(f"Total: {total}")
     print(f"District Match: {match} ({rate:.2f}%)")
     print(f"District Fail: {fail}")
+    print(f"Ward Match: {ward_match}/{ward_checked} ({ward_rate:.2f}%)")
+    print(format_tier_stats(tier_stats))
+    print(format_grid_stats(grid_stats))
+    print(format_cache_stats())
+    if results is not None:
+        print(results.format_stats())
     print(f"\n{'✅ PASS' if passed else '❌ FAIL'}: District >= 99%")
 
     return 0 if passed else 1
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+JFinder Geo QC - Mergeable streaming QC counters
+================================================
+Bộ đếm QC dùng chung cho geo_normalize.py, geo_normalize_admin.py và
+geo_qa.py:
+
+- cập nhật theo từng record (hoặc theo nhóm record giống nhau, `count`);
+- mỗi worker / shard giữ một bộ đếm riêng, process cha merge() lại theo
+  thứ tự shard, kết quả giống hệt khi chạy tuần tự;
+- bộ nhớ tăng theo số nhóm (tỉnh / quận / phường), không theo số record;
+- top-K nhóm (ví dụ quận có nhiều record bị điều chỉnh nhất) lấy bằng heap
+  kích thước K thay vì sort toàn bộ.
+
+Usage:
+    qc = QCAggregator(levels=('province', 'district'), statuses=('ok',))
+    qc.record((province, district), 'ok' if inside else 'fail')
+    qc.sample('bad', {...})
+    total.merge(qc)                       # shard / worker partials
+    for district, counts in total.top('district', 20, lambda c: c['total']): ...
+"""
+
+import heapq
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+Counts = Dict[str, int]
+
+
+def rate(counts: Counts, *statuses: str) -> float:
+    """Share of a group's total with one of `statuses` (0 for an empty group)."""
+    total = counts.get('total', 0)
+    return sum(counts.get(s, 0) for s in statuses) / total if total > 0 else 0
+
+
+class QCAggregator:
+    """Status counts per group at each level, plus tallies and bounded samples.
+
+    `levels` name the group levels; record() takes one group key per level
+    (callers choose the keys, e.g. district keys that include the
+    province). Each group counts 'total' and the `statuses`; other
+    statuses only count towards the totals. Groups, tallies and samples
+    keep first-seen order.
+    """
+
+    def __init__(self, levels: Sequence[str] = ('province', 'district', 'ward'),
+                 statuses: Sequence[str] = ('matched', 'adjusted', 'failed'), sample_limit: int = 50):
+        self.levels = tuple(levels)
+        self.statuses = tuple(statuses)
+        self.sample_limit = sample_limit
+        self.total = 0
+        self.by_status: Counts = {}
+        self.groups: Dict[str, Dict[Hashable, Counts]] = {level: {} for level in self.levels}
+        self.tallies: Dict[str, Dict[Hashable, int]] = {}
+        self.samples: Dict[str, List[Any]] = {}
+
+    def _new_counts(self) -> Counts:
+        counts = {'total': 0}
+        for status in self.statuses:
+            counts[status] = 0
+        return counts
+
+    def record(self, keys: Sequence[Hashable], status: str, count: int = 1):
+        """Count `count` records with `status` in the groups `keys` (one per level)."""
+        self.total += count
+        self.by_status[status] = self.by_status.get(status, 0) + count
+        for level, key in zip(self.levels, keys):
+            groups = self.groups[level]
+            counts = groups.get(key)
+            if counts is None:
+                counts = groups[key] = self._new_counts()
+            counts['total'] += count
+            if status in counts:
+                counts[status] += count
+
+    def tally(self, name: str, value: Hashable, count: int = 1):
+        """Count `value` in the free-form tally `name` (e.g. by method)."""
+        tally = self.tallies.setdefault(name, {})
+        tally[value] = tally.get(value, 0) + count
+
+    def wants_sample(self, name: str) -> bool:
+        """True while sample list `name` has room (build costly items only then)."""
+        return len(self.samples.get(name, ())) < self.sample_limit
+
+    def sample(self, name: str, item: Any) -> bool:
+        """Keep `item` in sample list `name` unless it is full; True if kept."""
+        samples = self.samples.setdefault(name, [])
+        if len(samples) >= self.sample_limit:
+            return False
+        samples.append(item)
+        return True
+
+    def merge(self, other: 'QCAggregator') -> 'QCAggregator':
+        """Add the counts of a later shard into this one (returns self)."""
+        self.total += other.total
+        for status, count in other.by_status.items():
+            self.by_status[status] = self.by_status.get(status, 0) + count
+        for level, groups in other.groups.items():
+            mine = self.groups[level]
+            for key, counts in groups.items():
+                target = mine.get(key)
+                if target is None:
+                    mine[key] = dict(counts)
+                else:
+                    for status, count in counts.items():
+                        target[status] = target.get(status, 0) + count
+        for name, tally in other.tallies.items():
+            for value, count in tally.items():
+                self.tally(name, value, count)
+        for name, items in other.samples.items():
+            samples = self.samples.setdefault(name, [])
+            samples.extend(items[:self.sample_limit - len(samples)])
+        return self
+
+    def status_counts(self) -> Counts:
+        """Records per status, the configured statuses first (zero if unseen)."""
+        counts = {status: self.by_status.get(status, 0) for status in self.statuses}
+        for status, count in self.by_status.items():
+            counts.setdefault(status, count)
+        return counts
+
+    def top(self, level: str, k: int, score: Callable[[Counts], float],
+            where: Optional[Callable[[Counts], bool]] = None) -> List[Tuple[Hashable, Counts]]:
+        """The `k` groups of `level` with the highest score, best first.
+
+        Uses a size-k heap over the groups; ties keep first-seen order
+        (same result as a stable descending sort cut to k).
+        """
+        items = self.groups[level].items()
+        if where is not None:
+            items = ((key, counts) for key, counts in items if where(counts))
+        return heapq.nlargest(k, items, key=lambda item: score(item[1]))
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+JFinder Geo Reader - Streaming GeoJSON feature reader
+=====================================================
+Đọc FeatureCollection (GADM) theo từng feature thay vì json.load /
+gpd.read_file toàn bộ file cả nước. Feature được lọc theo NAME_1 ngay
+khi parse, nên chỉ geometry của các tỉnh cần dùng mới được build.
+
+Usage:
+    for props, geom in read_features(GADM_FILE, provinces=["HàNội"]):
+        ...
+"""
+
+import json
+import re
+import sys
+from pathlib import Path
+from typing import Any, Callable, Collection, Dict, Iterator, Optional, Tuple
+
+from shapely.geometry import shape
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+CHUNK_SIZE = 1 << 20  # characters read per refill
+
+_SEPARATOR_RE = re.compile(r'[\s,]*')
+
+
+def iter_feature_dicts(path: Path, chunk_size: int = CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """Yield raw feature dicts from a GeoJSON FeatureCollection, one at a time.
+
+    Only the current feature and a read buffer are held in memory.
+    """
+    return iter_json_array(path, key='features', chunk_size=chunk_size)
+
+
+def iter_json_array(path: Path, key: Optional[str] = None,
+                    chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+    """Yield the items of a JSON array one at a time.
+
+    The array is the whole document (key=None) or the first value of
+    `"key": [...]` in the file. Only the current item and a read buffer are
+    held in memory.
+    """
+    start_re = re.compile(r'"%s"\s*:\s*\[' % re.escape(key)) if key else re.compile(r'\s*\[')
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        # Skip to the start of the array
+        buf = ''
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            buf += chunk
+            match = start_re.search(buf) if key else start_re.match(buf)
+            if match:
+                buf = buf[match.end():]
+                break
+            if not key:
+                raise ValueError(f"{path} is not a JSON array")
+            buf = buf[-(len(key) + 64):]  # the key may straddle two chunks
+
+        pos = 0
+        read_size = chunk_size
+        while True:
+            pos = _SEPARATOR_RE.match(buf, pos).end()
+            if pos >= len(buf):
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                buf, pos = buf[pos:] + chunk, 0
+                continue
+            if buf[pos] == ']':
+                return
+
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # Item not fully buffered yet; grow reads for very large ones
+                chunk = f.read(read_size)
+                if not chunk:
+                    raise
+                buf, pos = buf[pos:] + chunk, 0
+                read_size *= 2
+                continue
+
+            read_size = chunk_size
+            pos = end
+            yield item
+
+
+def read_features(path: Path, provinces: Optional[Collection[str]] = None,
+                  field: str = 'NAME_1',
+                  match: Optional[Callable[[Dict[str, Any]], bool]] = None
+                  ) -> Iterator[Tuple[Dict[str, Any], Any]]:
+    """Yield (properties, shapely geometry) for matching features.
+
+    A feature matches when its `field` is in `provinces` (if given) and
+    `match(properties)` is true (if given). Geometries are only built for
+    matching features.
+    """
+    wanted = set(provinces) if provinces is not None else None
+    for feature in iter_feature_dicts(path):
+        props = feature.get('properties') or {}
+        if wanted is not None and props.get(field) not in wanted:
+            continue
+        if match is not None and not match(props):
+            continue
+        geometry = feature.get('geometry')
+        if not geometry:
+            continue
+        yield props, shape(geometry)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB (None if unavailable)."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def format_load_stats(count: int, seconds: float) -> str:
+    """One-line load summary with time and peak RSS."""
+    rss = peak_rss_mb()
+    rss_text = f", peak RSS {rss:.0f} MB" if rss is not None else ""
+    return f"Read {count} features in {seconds:.2f}s{rss_text}"
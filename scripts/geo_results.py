@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+JFinder Geo Results - Persistent resolution and containment cache
+=================================================================
+Cache SQLite dùng chung cho geo_normalize.py, geo_normalize_admin.py và
+geo_qa.py. Rất nhiều listing có cùng bộ (tỉnh, quận, phường) và tọa độ
+gần như trùng nhau, nên kết quả được giữ lại giữa các lần chạy:
+
+- resolutions: admin key đã chuẩn hóa -> polygon id + match level;
+- containment: (polygon id, lat, lon lượng tử hóa) -> điểm có nằm trong
+  polygon không.
+
+Mỗi script có namespace riêng, và mọi kết quả được khóa thêm theo
+boundary version (file GADM, tham số lọc, CACHE_VERSION). Slot (như
+BoundaryCache.slot: namespace + tham số + đường dẫn file nguồn) ghi lại
+version hiện tại của nó; khi version của một slot đổi, chỉ kết quả của
+version cũ trong slot đó bị xóa. Chạy xen kẽ mặc định / --all-provinces
+hay hai file boundary không xóa kết quả của nhau.
+
+Usage:
+    results = ResultCache('gadm_admin', boundaries.version, slot=boundaries.slot)
+    resolved = results.resolve_many(keys, boundaries.resolve_key)   # [(polygon_id, level)]
+    inside = results.contains_many(polygon_ids, polygons, lats, lons)
+    print(results.format_stats())
+"""
+
+import os
+import sqlite3
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from geo_cache import DEFAULT_CACHE_DIR
+from geo_spatial import PolygonTiers, batch_contains
+
+DEFAULT_RESULT_CACHE = DEFAULT_CACHE_DIR / "geo_results.sqlite"
+
+# Containment verdicts are cached on a 1e-7 degree grid (~1 cm): a point
+# within a centimetre of a boundary may reuse the verdict of an earlier
+# point in the same cell
+COORD_QUANTUM = 1e-7
+
+# Separator for admin key parts (never produced by the name normalizers)
+KEY_SEPARATOR = "\x1f"
+
+# Bump when the tables below change; older cache files are rebuilt
+SCHEMA_VERSION = 2
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS boundary_slots (
+    namespace TEXT NOT NULL,
+    slot TEXT NOT NULL,
+    version TEXT NOT NULL,
+    PRIMARY KEY (namespace, slot)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS resolutions (
+    namespace TEXT NOT NULL,
+    version TEXT NOT NULL,
+    admin_key TEXT NOT NULL,
+    polygon_id TEXT,
+    match_level TEXT NOT NULL,
+    PRIMARY KEY (namespace, version, admin_key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS containment (
+    namespace TEXT NOT NULL,
+    version TEXT NOT NULL,
+    polygon_id TEXT NOT NULL,
+    qlat INTEGER NOT NULL,
+    qlon INTEGER NOT NULL,
+    inside INTEGER NOT NULL,
+    PRIMARY KEY (namespace, version, polygon_id, qlat, qlon)
+) WITHOUT ROWID;
+"""
+OLD_TABLES = ('boundary_versions', 'boundary_slots', 'resolutions', 'containment')
+
+
+def join_key(key: Sequence[Hashable]) -> str:
+    """Storage form of a normalized admin key tuple (None -> empty part)."""
+    return KEY_SEPARATOR.join('' if part is None else str(part) for part in key)
+
+
+def summarize_counts(counts: Dict[str, int]) -> Dict[str, Dict[str, Any]]:
+    """Per-table hits, misses and hit rate from ResultCache.counts-style counts."""
+    summary = {}
+    for table in ('resolution', 'containment'):
+        hits, misses = counts.get(f'{table}_hits', 0), counts.get(f'{table}_misses', 0)
+        total = hits + misses
+        summary[table] = {'hits': hits, 'misses': misses, 'hit_rate': round(hits / total, 4) if total > 0 else 0}
+    return summary
+
+
+class ResultCache:
+    """On-disk cache of one script's admin resolutions and PIP verdicts.
+
+    Every process opens its own SQLite connection on first use (forked
+    workers never reuse the parent's). All resolutions of the namespace
+    and version are read into memory then; containment verdicts are looked
+    up one batch at a time.
+
+    `slot` names the results a new version replaces (BoundaryCache.slot of
+    the boundary file); without it old versions are never dropped.
+    """
+
+    def __init__(self, namespace: str, version: str, path: Path = DEFAULT_RESULT_CACHE,
+                 quantum: float = COORD_QUANTUM, slot: Optional[str] = None):
+        self.namespace = namespace
+        self.version = version
+        self.slot = slot or version
+        self.path = Path(path)
+        self.quantum = quantum
+        self.counts = {'resolution_hits': 0, 'resolution_misses': 0,
+                       'containment_hits': 0, 'containment_misses': 0}
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._inherited: List[sqlite3.Connection] = []
+        self._resolutions: Dict[str, Tuple[Optional[str], str]] = {}
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+        if self._conn is not None:
+            # Opened before fork: keep a reference so it is never closed here
+            self._inherited.append(self._conn)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=60)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with conn:
+            if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                for table in OLD_TABLES:
+                    conn.execute(f"DROP TABLE IF EXISTS {table}")
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.executescript(SCHEMA)
+        with conn:
+            row = conn.execute("SELECT version FROM boundary_slots WHERE namespace = ? AND slot = ?",
+                               (self.namespace, self.slot)).fetchone()
+            if row is None or row[0] != self.version:
+                # Drop the slot's previous version unless another slot still uses it
+                if row is not None and conn.execute(
+                        "SELECT 1 FROM boundary_slots WHERE namespace = ? AND version = ? AND slot != ?",
+                        (self.namespace, row[0], self.slot)).fetchone() is None:
+                    conn.execute("DELETE FROM resolutions WHERE namespace = ? AND version = ?",
+                                 (self.namespace, row[0]))
+                    conn.execute("DELETE FROM containment WHERE namespace = ? AND version = ?",
+                                 (self.namespace, row[0]))
+                conn.execute("INSERT OR REPLACE INTO boundary_slots VALUES (?, ?, ?)",
+                             (self.namespace, self.slot, self.version))
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS probe (polygon_id TEXT, qlat INTEGER, qlon INTEGER)")
+
+        self._resolutions = {
+            key: (polygon_id, level)
+            for key, polygon_id, level in conn.execute(
+                "SELECT admin_key, polygon_id, match_level FROM resolutions WHERE namespace = ? AND version = ?",
+                (self.namespace, self.version))
+        }
+        self._conn, self._pid = conn, os.getpid()
+        return conn
+
+    def resolve_many(self, keys: Sequence[Sequence[Hashable]],
+                     resolve: Callable[[Any], Tuple[Optional[str], str]]) -> List[Tuple[Optional[str], str]]:
+        """(polygon id, match level) for each normalized admin key.
+
+        Keys not cached yet are resolved with `resolve(key)` (which must
+        depend on the key and the boundary set only) and stored.
+        """
+        conn = self._connection()
+        out = []
+        new_rows = []
+        for key in keys:
+            stored = join_key(key)
+            found = self._resolutions.get(stored)
+            if found is None:
+                found = resolve(key)
+                self._resolutions[stored] = found
+                new_rows.append((self.namespace, self.version, stored, found[0], found[1]))
+                self.counts['resolution_misses'] += 1
+            else:
+                self.counts['resolution_hits'] += 1
+            out.append(found)
+
+        if new_rows:
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO resolutions VALUES (?, ?, ?, ?, ?)", new_rows)
+        return out
+
+    def contains_many(self, polygon_ids: Sequence[Optional[str]], polygons: Sequence[Any],
+                      lats: np.ndarray, lons: np.ndarray, tiers: Optional[PolygonTiers] = None) -> np.ndarray:
+        """Cached batch_contains: one verdict per record.
+
+        Records with no polygon id or NaN coordinates are outside and never
+        cached; verdicts missing from the cache are computed with
+        batch_contains (through `tiers` when given) and stored.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        inside = np.zeros(len(polygon_ids), dtype=bool)
+
+        has_id = np.fromiter((pid is not None for pid in polygon_ids), dtype=bool, count=len(polygon_ids))
+        idx = np.flatnonzero(has_id & np.isfinite(lats) & np.isfinite(lons))
+        if len(idx) == 0:
+            return inside
+
+        qlats = np.rint(lats[idx] / self.quantum).astype(np.int64).tolist()
+        qlons = np.rint(lons[idx] / self.quantum).astype(np.int64).tolist()
+        keys = [(polygon_ids[i], qlat, qlon) for i, qlat, qlon in zip(idx.tolist(), qlats, qlons)]
+
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM probe")
+            conn.executemany("INSERT INTO probe VALUES (?, ?, ?)", set(keys))
+            known = {
+                (polygon_id, qlat, qlon): bool(verdict)
+                for polygon_id, qlat, qlon, verdict in conn.execute(
+                    "SELECT c.polygon_id, c.qlat, c.qlon, c.inside FROM probe p "
+                    "JOIN containment c ON c.namespace = ? AND c.version = ? AND c.polygon_id = p.polygon_id "
+                    "AND c.qlat = p.qlat AND c.qlon = p.qlon",
+                    (self.namespace, self.version))
+            }
+
+        missing = []
+        for j, key in enumerate(keys):
+            verdict = known.get(key)
+            if verdict is None:
+                missing.append(j)
+            else:
+                inside[idx[j]] = verdict
+        self.counts['containment_hits'] += len(keys) - len(missing)
+        self.counts['containment_misses'] += len(missing)
+
+        if missing:
+            rows = idx[missing]
+            computed = batch_contains([polygons[i] for i in rows], lats[rows], lons[rows], tiers)
+            inside[rows] = computed
+            new_rows = {keys[j]: int(v) for j, v in zip(missing, computed.tolist())}
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO containment VALUES (?, ?, ?, ?, ?, ?)",
+                                 [(self.namespace, self.version, *key, v) for key, v in new_rows.items()])
+        return inside
+
+    def add_counts(self, deltas: Dict[str, int]):
+        """Add hit/miss counts from a worker process."""
+        for key, count in deltas.items():
+            self.counts[key] += count
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counts and hit rates of both tables, plus the cache location."""
+        return {'path': str(self.path), 'namespace': self.namespace, 'version': self.version,
+                **summarize_counts(self.counts)}
+
+    def format_stats(self) -> str:
+        """One-line summary for console output."""
+        stats = self.stats()
+        return ("Result cache: " + ", ".join(
+            f"{table} {stats[table]['hits']}/{stats[table]['hits'] + stats[table]['misses']} hits "
+            f"({stats[table]['hit_rate'] * 100:.1f}%)"
+            for table in ('resolution', 'containment')))
+
+    def close(self):
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
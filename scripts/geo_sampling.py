@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+JFinder Geo Sampling - Uniform random points inside polygons
+============================================================
+Thay rejection sampling (tối đa 100 lần contains() trong bounding box,
+rồi rơi về centroid) bằng tam giác hóa: mỗi polygon được chia thành tam
+giác (constrained Delaunay) một lần, cache lại kèm trọng số diện tích,
+sau đó lấy bao nhiêu điểm cũng được bằng một lần tính NumPy.
+
+Phường hẹp/lõm dọc sông (vd. ven sông Sài Gòn) không còn rơi về centroid.
+RNG có seed để kết quả lặp lại được giữa các lần chạy.
+
+Usage:
+    sampler = PolygonSampler(seed=42)
+    lats, lons = sampler.sample(ward_polygon, 250)
+    lat, lon = sampler.sample_one(ward_polygon)
+    lats, lons = sampler.sample_many([poly_a, None, poly_a, poly_b])
+"""
+
+from collections import defaultdict
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import shapely
+
+
+class PolygonSampler:
+    """Area-weighted triangle sampler with a per-polygon triangulation cache.
+
+    Triangulations are keyed by polygon identity, so the sampler is meant
+    to live as long as the boundary index whose polygons it samples.
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        # id(polygon) -> (polygon, origins, edge vectors u, v, cumulative area weights)
+        self._cache: Dict[int, Tuple[Any, np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def use_stream(self, stream: int):
+        """Switch to the RNG stream for one batch/shard.
+
+        Seeded samplers derive the stream from (seed, stream), so a batch
+        draws the same points whichever process runs it. Unseeded samplers
+        get fresh entropy (forked workers must not share one RNG state).
+        """
+        self.rng = np.random.default_rng([self.seed, stream] if self.seed is not None else None)
+
+    def _triangles(self, polygon: Any):
+        entry = self._cache.get(id(polygon))
+        if entry is None or entry[0] is not polygon:
+            triangles = shapely.get_parts(shapely.constrained_delaunay_triangles(polygon))
+            coords = shapely.get_coordinates(triangles).reshape(len(triangles), 4, 2)
+            origin = coords[:, 0]
+            u = coords[:, 1] - origin
+            v = coords[:, 2] - origin
+            areas = np.abs(u[:, 0] * v[:, 1] - u[:, 1] * v[:, 0])
+            total = areas.sum()
+            weights = np.cumsum(areas / total) if total > 0 else np.empty(0)
+            entry = (polygon, origin, u, v, weights)
+            self._cache[id(polygon)] = entry
+        return entry[1:]
+
+    def sample(self, polygon: Any, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """`n` uniform points inside `polygon` as (lats, lons) arrays.
+
+        Degenerate (empty or zero-area) polygons yield their representative
+        point repeated.
+        """
+        origin, u, v, weights = self._triangles(polygon)
+        if len(weights) == 0:
+            point = polygon.representative_point() if not polygon.is_empty else polygon.centroid
+            return np.full(n, point.y), np.full(n, point.x)
+
+        tri = np.minimum(np.searchsorted(weights, self.rng.random(n), side='right'), len(weights) - 1)
+        r = self.rng.random((n, 2))
+        # Reflect points from the far half of the parallelogram into the triangle
+        flip = r.sum(axis=1) > 1
+        r[flip] = 1 - r[flip]
+        points = origin[tri] + r[:, :1] * u[tri] + r[:, 1:] * v[tri]
+        return points[:, 1], points[:, 0]
+
+    def sample_one(self, polygon: Any) -> Tuple[float, float]:
+        """One uniform (lat, lon) inside `polygon`."""
+        lats, lons = self.sample(polygon, 1)
+        return float(lats[0]), float(lons[0])
+
+    def sample_many(self, polygons: Sequence[Any]) -> Tuple[np.ndarray, np.ndarray]:
+        """One point per record, each inside its own polygon.
+
+        Records are grouped by polygon and each group is drawn in a single
+        sample() call. Records with no polygon (None) get NaN.
+        """
+        lats = np.full(len(polygons), np.nan)
+        lons = np.full(len(polygons), np.nan)
+
+        groups = defaultdict(list)
+        for i, polygon in enumerate(polygons):
+            if polygon is not None:
+                groups[id(polygon)].append(i)
+
+        for idx in groups.values():
+            idx = np.asarray(idx, dtype=np.intp)
+            lats[idx], lons[idx] = self.sample(polygons[idx[0]], len(idx))
+        return lats, lons
@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+"""
+JFinder Geo Service - Local reverse-geocoding / validation HTTP service
+=======================================================================
+Service asyncio chạy lâu dài cho n8n và các công cụ nội bộ: nạp boundaries
+một lần (BoundaryIndex của geo_normalize, hoặc GADMBoundaries của
+geo_normalize_admin với --engine admin) rồi trả lời qua HTTP/1.1 + JSON
+(keep-alive):
+
+- GET  /health                                       trạng thái, số phường, version boundary
+- GET  /stats                                        số request / điểm, counters grid + tiers
+- GET  /locate?lat=..&lon=..                         phường chứa điểm
+- POST /locate    {"points": [[lat, lon], ...]}
+- GET  /validate?lat=..&lon=..&province=..&district=..&ward=..
+- POST /validate  {"records": [{"province", "district", "ward", "latitude", "longitude"}, ...]}
+                  (hoặc một record đơn)
+
+Request đơn lẻ đến cùng lúc được gom (micro-batch) thành một lần gọi vector
+hóa; batch lớn được chia chunk. Mọi phép tính hình học chạy trên một thread
+riêng, tuần tự, nên event loop không bị chặn và index không cần khóa.
+Service chỉ kiểm tra, không dời điểm (khác với geo_normalize).
+
+Usage:
+    python scripts/geo_service.py --boundaries data/boundaries/vn_wards.geojson
+    python scripts/geo_service.py --engine admin --tolerance-m 25 --port 8766
+    curl 'http://127.0.0.1:8765/locate?lat=21.0285&lon=105.8541'
+    curl -X POST http://127.0.0.1:8765/validate -d '{"records": [...]}'
+    python scripts/geo_bench.py service --boundaries data/boundaries/vn_wards.geojson   # load test
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+try:
+    import numpy as np
+except ImportError:
+    print("pip install numpy shapely pyproj")
+    sys.exit(1)
+
+from geo_spatial import to_coord_array
+from geo_metric import within_tolerance
+from geo_cache import DEFAULT_CACHE_DIR
+
+# ==============================================================================
+# CONFIGURATION
+# ==============================================================================
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Single requests arriving within this window share one vectorized call
+BATCH_WINDOW_MS = 2.0
+# Largest micro-batch of single requests, and chunk size of large batch requests
+MAX_MICRO_BATCH = 2000
+BATCH_CHUNK = 20000
+# Request limits
+MAX_BATCH_RECORDS = 200000
+MAX_BODY_BYTES = 64 * 1024 * 1024
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class RequestError(Exception):
+    """Client error answered with an HTTP status and a JSON message."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+# ==============================================================================
+# ENGINES
+# ==============================================================================
+
+
+def verdict(polygon_id: Optional[str], match_level: str, has_coords: bool, inside: bool,
+            distance: float, tolerance_m: float, located: Optional[Dict]) -> Dict[str, Any]:
+    """Validation result of one record (same statuses for both engines)."""
+    if polygon_id is None:
+        status = "no_polygon"
+    elif not has_coords:
+        status = "no_coordinates"
+    elif inside:
+        status = "matched"
+    elif within_tolerance(distance, tolerance_m):
+        status = "within_tolerance"
+    else:
+        status = "outside"
+    return {
+        "status": status,
+        "valid": status in ("matched", "within_tolerance"),
+        "match_level": match_level,
+        "polygon_id": polygon_id,
+        "boundary_distance_m": None if distance != distance else round(distance, 1),
+        "located": located,
+    }
+
+
+class NormalizeEngine:
+    """Ward-level validation on geo_normalize's BoundaryIndex (ward GeoJSON)."""
+
+    name = "normalize"
+
+    def __init__(self, index):
+        self.index = index
+
+    def info(self) -> Dict[str, Any]:
+        return {"engine": self.name, "version": self.index.version, "wards": len(self.index.ward_polygons),
+                "tolerance_m": self.index.tolerance_m}
+
+    def counters(self) -> Dict[str, Any]:
+        counters = {"ward_lookup": self.index.lookup_stats(), "pip_tiers": self.index.tiers.stats()}
+        if self.index.grid is not None:
+            counters["ward_grid"] = self.index.grid.stats()
+        return counters
+
+    def locate(self, lats: np.ndarray, lons: np.ndarray) -> List[Optional[Dict]]:
+        return [{"province": w["province"], "district": w["district"], "ward": w["ward"]} if w else None
+                for w in self.index.locate_many(lats, lons)]
+
+    def validate(self, records: List[Dict]) -> List[Dict]:
+        from geo_normalize import resolve_wards
+
+        index = self.index
+        keys = [index.ward_lookup_key(r.get("province", ""), r.get("district", ""), r.get("ward", ""))
+                for r in records]
+        resolved = resolve_wards(index, keys)
+        for _, path in resolved:
+            index.ward_lookups[path] += 1
+        lats = to_coord_array([r.get("latitude", 0) for r in records])
+        lons = to_coord_array([r.get("longitude", 0) for r in records])
+        inside = index.contains_wards([key for key, _ in resolved], lats, lons)
+        distances = index.boundary_distances(
+            [index.ward_polygons[key]["polygon"] if key is not None and not inside[i] else None
+             for i, (key, _) in enumerate(resolved)], lats, lons)
+        located = self.locate(lats, lons)
+        has_coords = np.isfinite(lats) & np.isfinite(lons)
+        return [verdict(key, "ward" if key is not None else "none", bool(has_coords[i]), bool(inside[i]),
+                        float(distances[i]), index.tolerance_m, located[i])
+                for i, (key, _) in enumerate(resolved)]
+
+
+class AdminEngine:
+    """Ward/district/province validation on geo_normalize_admin's GADMBoundaries."""
+
+    name = "admin"
+
+    def __init__(self, boundaries):
+        self.boundaries = boundaries
+
+    def info(self) -> Dict[str, Any]:
+        return {"engine": self.name, "version": self.boundaries.version, "wards": len(self.boundaries.ward_index),
+                "tolerance_m": self.boundaries.tolerance_m}
+
+    def counters(self) -> Dict[str, Any]:
+        counters = {"pip_tiers": self.boundaries.tiers.stats()}
+        if self.boundaries.grid is not None:
+            counters["ward_grid"] = self.boundaries.grid.stats()
+        return counters
+
+    def locate(self, lats: np.ndarray, lons: np.ndarray) -> List[Optional[Dict]]:
+        return [dict(zip(("province", "district", "ward"), polygon_id.split("|"))) if polygon_id else None
+                for polygon_id in self.boundaries.locate_many(lats, lons)]
+
+    def validate(self, records: List[Dict]) -> List[Dict]:
+        b = self.boundaries
+        ids = [b.resolve_key(b.admin_key(r.get("province", ""), r.get("district", ""), r.get("ward", "")))
+               for r in records]
+        polygons = [b.polygon(polygon_id) for polygon_id, _ in ids]
+        lats = to_coord_array([r.get("latitude", 0) for r in records])
+        lons = to_coord_array([r.get("longitude", 0) for r in records])
+        inside = b.contains_many([polygon_id for polygon_id, _ in ids], polygons, lats, lons)
+        distances = b.metric.boundary_distances(
+            [polygon if not inside[i] else None for i, polygon in enumerate(polygons)], lats, lons)
+        located = self.locate(lats, lons)
+        has_coords = np.isfinite(lats) & np.isfinite(lons)
+        return [verdict(polygon_id, match_level, bool(has_coords[i]), bool(inside[i]), float(distances[i]),
+                        b.tolerance_m, located[i])
+                for i, (polygon_id, match_level) in enumerate(ids)]
+
+
+def load_engine(args):
+    """Boundaries for the chosen engine, loaded once at startup."""
+    if args.engine == "admin":
+        from geo_normalize_admin import load_boundaries
+        return AdminEngine(load_boundaries(tolerance_m=args.tolerance_m))
+
+    from geo_normalize import build_index, PROVINCE_KEYS_3CITIES
+    if not args.boundaries or not Path(args.boundaries).exists():
+        raise SystemExit(f"Ward boundaries file not found: {args.boundaries} (use --boundaries or --engine admin)")
+    cache_dir = None if args.no_cache else Path(args.cache_dir)
+    return NormalizeEngine(build_index(args.boundaries, cache_dir, PROVINCE_KEYS_3CITIES,
+                                       tolerance_m=args.tolerance_m))
+
+# ==============================================================================
+# SERVICE
+# ==============================================================================
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-item calls into one list call.
+
+    submit() queues an item and waits; the queue is flushed `window`
+    seconds after its first item (or at `max_size` items) and `run` gets
+    the items as one list, returning one result per item.
+    """
+
+    def __init__(self, run: Callable[[List[Any]], Awaitable[List[Any]]], window: float, max_size: int):
+        self.run = run
+        self.window = window
+        self.max_size = max_size
+        self.batches = 0
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+
+    async def submit(self, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        if pending:
+            self.batches += 1
+            task = asyncio.ensure_future(self._resolve(pending))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _resolve(self, pending: List[Tuple[Any, asyncio.Future]]):
+        try:
+            results = await self.run([item for item, _ in pending])
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(pending, results):
+            if not future.done():
+                future.set_result(result)
+
+
+class GeoService:
+    """HTTP front end of an engine; geometry runs on one worker thread."""
+
+    def __init__(self, engine, window_ms: float = BATCH_WINDOW_MS, max_micro_batch: int = MAX_MICRO_BATCH):
+        self.engine = engine
+        # One thread: CPU work leaves the event loop, and the engine is never used concurrently
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="geo-service")
+        self.locate_batcher = MicroBatcher(self._locate_points, window_ms / 1000, max_micro_batch)
+        self.validate_batcher = MicroBatcher(self._validate_records, window_ms / 1000, max_micro_batch)
+        self.started = time.time()
+        self.counts = {"requests": 0, "errors": 0, "points": 0, "records": 0}
+
+    async def _compute(self, fn: Callable, *args) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def _locate_points(self, points: List[Tuple[Any, Any]]) -> List[Optional[Dict]]:
+        out: List[Optional[Dict]] = []
+        for start in range(0, len(points), BATCH_CHUNK):
+            chunk = points[start:start + BATCH_CHUNK]
+            lats = to_coord_array([p[0] for p in chunk])
+            lons = to_coord_array([p[1] for p in chunk])
+            out.extend(await self._compute(self.engine.locate, lats, lons))
+        self.counts["points"] += len(points)
+        return out
+
+    async def _validate_records(self, records: List[Dict]) -> List[Dict]:
+        out: List[Dict] = []
+        for start in range(0, len(records), BATCH_CHUNK):
+            out.extend(await self._compute(self.engine.validate, records[start:start + BATCH_CHUNK]))
+        self.counts["records"] += len(records)
+        return out
+
+    # --------------------------------------------------------------------------
+    # Routes
+    # --------------------------------------------------------------------------
+
+    async def dispatch(self, method: str, target: str, body: bytes) -> Dict[str, Any]:
+        url = urlsplit(target)
+        query = dict(parse_qsl(url.query))
+        routes = {
+            "/health": {"GET": self.health},
+            "/stats": {"GET": self.stats},
+            "/locate": {"GET": self.locate_one, "POST": self.locate_many},
+            "/validate": {"GET": self.validate_one, "POST": self.validate_many},
+        }
+        handlers = routes.get(url.path.rstrip("/") or "/")
+        if handlers is None:
+            raise RequestError(404, f"Unknown path {url.path}")
+        handler = handlers.get(method)
+        if handler is None:
+            raise RequestError(405, f"{method} not allowed on {url.path}")
+        return await handler(query, body)
+
+    async def health(self, query: Dict[str, str], body: bytes) -> Dict[str, Any]:
+        return {"status": "ok", **self.engine.info()}
+
+    async def stats(self, query: Dict[str, str], body: bytes) -> Dict[str, Any]:
+        return {
+            **self.counts,
+            "uptime_s": round(time.time() - self.started, 1),
+            "micro_batches": {"locate": self.locate_batcher.batches, "validate": self.validate_batcher.batches},
+            **self.engine.counters(),
+        }
+
+    async def locate_one(self, query: Dict[str, str], body: bytes) -> Dict[str, Any]:
+        lat, lon = _coords(query)
+        return {"latitude": lat, "longitude": lon, "located": await self.locate_batcher.submit((lat, lon))}
+
+    async def locate_many(self, query: Dict[str, str], body: bytes) -> Dict[str, Any]:
+        payload = _json_body(body)
+        points = payload.get("points") if isinstance(payload, dict) else payload
+        if not isinstance(points, list):
+            raise RequestError(400, 'Expected {"points": [[lat, lon], ...]}')
+        _check_size(points)
+        try:
+            points = [(p["latitude"], p["longitude"]) if isinstance(p, dict) else (p[0], p[1]) for p in points]
+        except (KeyError, IndexError, TypeError):
+            raise RequestError(400, "Each point must be [lat, lon] or {latitude, longitude}")
+        results = await self._locate_points(points)
+        return {"count": len(results), "results": results}
+
+    async def validate_one(self, query: Dict[str, str], body: bytes) -> Dict[str, Any]:
+        lat, lon = _coords(query)
+        record = {"province": query.get("province", ""), "district": query.get("district", ""),
+                  "ward": query.get("ward", ""), "latitude": lat, "longitude": lon}
+        return await self.validate_batcher.submit(record)
+
+    async def validate_many(self, query: Dict[str, str], body: bytes) -> Dict[str, Any]:
+        payload = _json_body(body)
+        if isinstance(payload, dict) and "records" not in payload:
+            return await self.validate_batcher.submit(payload)
+        records = payload.get("records") if isinstance(payload, dict) else payload
+        if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+            raise RequestError(400, 'Expected {"records": [{province, district, ward, latitude, longitude}, ...]}')
+        _check_size(records)
+        results = await self._validate_records(records)
+        return {"count": len(results), "results": results}
+
+    # --------------------------------------------------------------------------
+    # HTTP/1.1
+    # --------------------------------------------------------------------------
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve requests on one connection until it closes (keep-alive by default)."""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 400, {"error": "Request header too large"}, False)
+                    break
+
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "Malformed request line"}, False)
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    name, sep, value = line.partition(":")
+                    if sep:
+                        headers[name.strip().lower()] = value.strip()
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+
+                try:
+                    length = int(headers.get("content-length", 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0 or length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413 if length > 0 else 400, {"error": "Bad Content-Length"}, False)
+                    break
+                try:
+                    body = await reader.readexactly(length) if length else b""
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+
+                self.counts["requests"] += 1
+                try:
+                    status, payload = 200, await self.dispatch(method.upper(), target, body)
+                except RequestError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except Exception as e:
+                    status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+                if status != 200:
+                    self.counts["errors"] += 1
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: Any, keep_alive: bool):
+        body = json.dumps(payload, ensure_ascii=False, allow_nan=False).encode("utf-8")
+        head = (f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def serve(self, host: str, port: int):
+        server = await asyncio.start_server(self.handle, host, port, backlog=1024)
+        bound = server.sockets[0].getsockname()
+        print(f"Serving on http://{bound[0]}:{bound[1]}", flush=True)
+        async with server:
+            await server.serve_forever()
+
+
+def _coords(query: Dict[str, str]) -> Tuple[float, float]:
+    try:
+        lat, lon = float(query["lat"]), float(query["lon"])
+    except (KeyError, ValueError):
+        lat = lon = math.nan
+    if not (math.isfinite(lat) and math.isfinite(lon)):
+        raise RequestError(400, "lat and lon query parameters are required numbers")
+    return lat, lon
+
+
+def _json_body(body: bytes) -> Any:
+    try:
+        return json.loads(body)
+    except ValueError as e:
+        raise RequestError(400, f"Invalid JSON body: {e}")
+
+
+def _check_size(items: List[Any]):
+    if len(items) > MAX_BATCH_RECORDS:
+        raise RequestError(413, f"Batch of {len(items)} exceeds {MAX_BATCH_RECORDS} items")
+
+# ==============================================================================
+# MAIN
+# ==============================================================================
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local reverse-geocoding / validation service')
+    parser.add_argument('--engine', choices=('normalize', 'admin'), default='normalize',
+                        help='normalize: ward GeoJSON (BoundaryIndex); admin: GADM with district/province fallback')
+    parser.add_argument('--boundaries', '-b', help='Ward GeoJSON for the normalize engine')
+    parser.add_argument('--cache-dir', default=str(DEFAULT_CACHE_DIR), help='Boundary cache directory')
+    parser.add_argument('--no-cache', action='store_true', help='Always re-parse the boundaries file')
+    parser.add_argument('--tolerance-m', type=float, default=0.0,
+                        help='Points at most this many metres outside their polygon are valid (status within_tolerance)')
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f'Bind address (default: {DEFAULT_HOST})')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'Port (default: {DEFAULT_PORT}, 0 = any free)')
+    parser.add_argument('--batch-window-ms', type=float, default=BATCH_WINDOW_MS,
+                        help='How long single requests wait to share one vectorized call')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("GEO SERVICE")
+    print("=" * 60)
+    start = time.perf_counter()
+    engine = load_engine(args)
+    info = engine.info()
+    print(f"Engine {info['engine']}: {info['wards']} wards, version {info['version']} "
+          f"(loaded in {time.perf_counter() - start:.2f}s)")
+
+    service = GeoService(engine, args.batch_window_ms)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\nStopped")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+JFinder Geo Spatial - Shared vectorized spatial helpers
+=======================================================
+Các hàm PIP dạng batch (NumPy + shapely 2) dùng chung cho
+geo_normalize.py, geo_normalize_admin.py và geo_qa.py.
+
+PolygonTiers: với polygon nhiều đỉnh, dựng sẵn bản đơn giản hóa (giữ
+topology) cùng hai vỏ buffer trong / ngoài; điểm rõ ràng trong hoặc ngoài
+được quyết định trên các tầng rẻ, chỉ điểm nằm trong dải mỏng quanh biên
+mới phải kiểm tra hình học gốc.
+"""
+
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+import shapely
+from shapely import STRtree
+
+
+def to_coord_array(values: Sequence[Any]) -> np.ndarray:
+    """Convert raw lat or lon values to float64; missing/invalid -> NaN.
+
+    Falsy values (None, '', 0) count as missing, matching the
+    `if lat and lon` guards of the per-record code.
+    """
+    out = np.full(len(values), np.nan, dtype=np.float64)
+    for i, v in enumerate(values):
+        if not v:
+            continue
+        try:
+            out[i] = float(v)
+        except (TypeError, ValueError):
+            pass
+    return out
+
+
+# Douglas-Peucker tolerance of the cheap tiers, in degrees (~5 m)
+TIER_TOLERANCE = 5e-5
+# Polygons with fewer vertices are checked exactly; tiers don't pay off there
+TIER_MIN_VERTICES = 500
+
+
+class PolygonTiers:
+    """Tiered point-in-polygon: inner envelope, outer envelope, then exact.
+
+    For a polygon with at least `min_vertices` vertices, a topology-
+    preserving simplification (`tolerance` degrees) is buffered inwards and
+    outwards by slightly more than the tolerance. The inner envelope lies
+    inside the polygon and the outer one contains it (both checked when
+    built; a polygon failing the check gets no tiers). Points in the inner
+    envelope are inside, points outside the outer one are outside, and only
+    the band in between is checked against the exact geometry, so verdicts
+    equal shapely.contains_xy.
+
+    Tiers are keyed by polygon identity (like PolygonSampler), built by
+    add() at index build time or on first use. `counts` tallies points
+    decided per tier: inner, outer, exact (band) and direct (no tiers).
+    """
+
+    TIERS = ('inner', 'outer', 'exact', 'direct')
+
+    def __init__(self, tolerance: float = TIER_TOLERANCE, min_vertices: int = TIER_MIN_VERTICES):
+        self.tolerance = tolerance
+        self.min_vertices = min_vertices
+        # id(polygon) -> (polygon, (inner, outer) or None)
+        self._cache: Dict[int, Tuple[Any, Optional[Tuple[Any, Any]]]] = {}
+        self.counts = {tier: 0 for tier in self.TIERS}
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def _build(self, polygon: Any) -> Optional[Tuple[Any, Any]]:
+        if shapely.get_num_coordinates(polygon) < self.min_vertices:
+            return None
+        simplified = shapely.simplify(polygon, self.tolerance, preserve_topology=True)
+        margin = self.tolerance * 1.01
+        inner = shapely.buffer(simplified, -margin, join_style='mitre')
+        outer = shapely.buffer(simplified, margin, join_style='mitre')
+        if not shapely.contains(outer, polygon) or not (inner.is_empty or shapely.contains(polygon, inner)):
+            return None
+        shapely.prepare(inner)
+        shapely.prepare(outer)
+        return inner, outer
+
+    def tiers(self, polygon: Any) -> Optional[Tuple[Any, Any]]:
+        """(inner, outer) envelopes of `polygon`, or None when it is checked exactly."""
+        entry = self._cache.get(id(polygon))
+        if entry is None:
+            entry = self._cache[id(polygon)] = (polygon, self._build(polygon))
+        return entry[1]
+
+    def add(self, polygons: Iterable[Any]) -> int:
+        """Precompute the tiers of `polygons`; returns how many got tiers."""
+        return sum(self.tiers(polygon) is not None for polygon in polygons)
+
+    def contains(self, polygon: Any, lons: np.ndarray, lats: np.ndarray) -> np.ndarray:
+        """Same as shapely.contains_xy(polygon, lons, lats) for arrays, through the tiers."""
+        lons = np.asarray(lons, dtype=np.float64)
+        lats = np.asarray(lats, dtype=np.float64)
+        envelopes = self.tiers(polygon)
+        if envelopes is None:
+            self.counts['direct'] += len(lons)
+            return shapely.contains_xy(polygon, lons, lats)
+        inner, outer = envelopes
+        inside = shapely.contains_xy(inner, lons, lats)
+        n_inner = int(np.count_nonzero(inside))
+        band = np.flatnonzero(~inside)
+        band = band[shapely.contains_xy(outer, lons[band], lats[band])]
+        inside[band] = shapely.contains_xy(polygon, lons[band], lats[band])
+        self.counts['inner'] += n_inner
+        self.counts['exact'] += len(band)
+        self.counts['outer'] += len(lons) - n_inner - len(band)
+        return inside
+
+    def add_counts(self, deltas: Dict[str, int]):
+        """Add tier counts from a worker process."""
+        for tier, count in deltas.items():
+            self.counts[tier] += count
+
+    def stats(self) -> Dict[str, Any]:
+        """Tier hit counts and rates, plus how many polygons have tiers."""
+        return {
+            'polygons': len(self._cache),
+            'tiered_polygons': sum(envelopes is not None for _, envelopes in self._cache.values()),
+            **summarize_tier_counts(self.counts),
+        }
+
+
+def summarize_tier_counts(counts: Dict[str, int]) -> Dict[str, Any]:
+    """Points checked, and points and hit rate per tier, from PolygonTiers counts."""
+    total = sum(counts.values())
+    summary: Dict[str, Any] = {'points': total}
+    for tier in PolygonTiers.TIERS:
+        summary[tier] = counts.get(tier, 0)
+        summary[f'{tier}_rate'] = round(counts.get(tier, 0) / total, 4) if total else 0
+    return summary
+
+
+def format_tier_stats(stats: Dict[str, Any]) -> str:
+    """One-line summary of tier stats for console output."""
+    return (f"PIP tiers ({stats['points']} points): "
+            + ", ".join(f"{tier} {stats[f'{tier}_rate'] * 100:.1f}%" for tier in PolygonTiers.TIERS))
+
+
+def batch_contains(polygons: Sequence[Any], lats: np.ndarray, lons: np.ndarray,
+                   tiers: Optional[PolygonTiers] = None) -> np.ndarray:
+    """Point-in-polygon for records that each target one polygon.
+
+    Records are grouped by target polygon and each group is checked with a
+    single shapely.contains_xy call (through `tiers` when given). Records
+    with no polygon (None) or NaN coordinates are reported as outside.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    inside = np.zeros(len(polygons), dtype=bool)
+
+    groups = defaultdict(list)
+    for i, polygon in enumerate(polygons):
+        if polygon is not None:
+            groups[id(polygon)].append(i)
+
+    contains = tiers.contains if tiers is not None else shapely.contains_xy
+    for idx in groups.values():
+        idx = np.asarray(idx, dtype=np.intp)
+        inside[idx] = contains(polygons[idx[0]], lons[idx], lats[idx])
+    return inside
+
+
+def grouped_contains(groups: np.ndarray, polygons: Sequence[Any], lats: np.ndarray, lons: np.ndarray,
+                     tiers: Optional[PolygonTiers] = None) -> np.ndarray:
+    """Point-in-polygon for records given as group codes: record i targets polygons[groups[i]].
+
+    Like batch_contains, but the grouping is one argsort over integer codes
+    instead of a per-record loop. Groups whose polygon is None, and NaN
+    coordinates, are reported as outside.
+    """
+    groups = np.asarray(groups)
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    inside = np.zeros(len(groups), dtype=bool)
+
+    contains = tiers.contains if tiers is not None else shapely.contains_xy
+    order = np.argsort(groups, kind='stable')
+    bounds = np.searchsorted(groups[order], np.arange(len(polygons) + 1))
+    for g, polygon in enumerate(polygons):
+        idx = order[bounds[g]:bounds[g + 1]]
+        if polygon is not None and len(idx):
+            inside[idx] = contains(polygon, lons[idx], lats[idx])
+    return inside
+
+
+class PointLocator:
+    """Bulk spatial join of points against a fixed set of polygons.
+
+    All points go through one STRtree bounding-box query, then one
+    vectorized `intersects` over the candidate (polygon, point) pairs with
+    prepared polygons, which is several times faster than a predicate
+    query. A point on a shared boundary gets the polygon with the lowest
+    index.
+    """
+
+    def __init__(self, polygons: Sequence[Any]):
+        self.polygons = np.empty(len(polygons), dtype=object)
+        self.polygons[:] = list(polygons)
+        shapely.prepare(self.polygons)
+        self.tree = STRtree(self.polygons)
+
+    def __len__(self) -> int:
+        return len(self.polygons)
+
+    def locate(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        """Index of the polygon containing each point; -1 when none (or NaN)."""
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        located = np.full(len(lats), -1, dtype=np.intp)
+        idx = np.flatnonzero(np.isfinite(lats) & np.isfinite(lons))
+        if len(idx) == 0 or len(self.polygons) == 0:
+            return located
+
+        points = shapely.points(lons[idx], lats[idx])
+        point_idx, polygon_idx = self.tree.query(points)
+        hit = shapely.intersects(self.polygons[polygon_idx], points[point_idx])
+        point_idx, polygon_idx = point_idx[hit], polygon_idx[hit]
+
+        # First (lowest-index) polygon per point
+        order = np.lexsort((polygon_idx, point_idx))
+        point_idx, polygon_idx = point_idx[order], polygon_idx[order]
+        first = np.ones(len(point_idx), dtype=bool)
+        first[1:] = point_idx[1:] != point_idx[:-1]
+        located[idx[point_idx[first]]] = polygon_idx[first]
+        return located
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+JFinder Geo Stream - Record-by-record listing I/O
+=================================================
+Đọc listings từ JSONL, CSV hoặc JSON array theo từng record, và ghi kết
+quả ra JSONL + CSV ngay khi xử lý xong, để bộ nhớ không tăng theo kích
+thước dataset (chỉ giữ một batch tại một thời điểm).
+
+Usage:
+    with RecordWriter(Path("out.jsonl"), Path("out.csv")) as writer:
+        for batch in batched(iter_records(Path("listings.jsonl")), 10000):
+            writer.write_many(process(batch))
+"""
+
+import csv
+import json
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from geo_reader import iter_json_array
+
+JSONL_SUFFIXES = ('.jsonl', '.ndjson')
+
+
+def iter_records(path: Path) -> Iterator[Dict[str, Any]]:
+    """Yield listings one at a time from a .jsonl/.ndjson, .csv or .json (array) file."""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == '.csv':
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            yield from csv.DictReader(f)
+    elif suffix in JSONL_SUFFIXES:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+    else:
+        yield from iter_json_array(path)
+
+
+def batched(records: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Consecutive lists of at most `size` records."""
+    records = iter(records)
+    while True:
+        batch = list(islice(records, max(1, size)))
+        if not batch:
+            return
+        yield batch
+
+
+def union_fieldnames(records: Iterable[Dict[str, Any]]) -> List[str]:
+    """All keys of `records`, in first-seen order (CSV header for ragged records)."""
+    return list(dict.fromkeys(key for record in records for key in record))
+
+
+class RecordWriter:
+    """Incremental JSONL (+ optional CSV) writer.
+
+    The CSV header is taken from the first record plus `extra_fields`
+    (keys that only some records carry, e.g. original_latitude). Keys
+    outside the header are left out of the CSV but kept in the JSONL.
+    """
+
+    def __init__(self, jsonl_path: Path, csv_path: Optional[Path] = None,
+                 extra_fields: Sequence[str] = ()):
+        self.jsonl_path = Path(jsonl_path)
+        self.csv_path = Path(csv_path) if csv_path else None
+        self.extra_fields = list(extra_fields)
+        self.count = 0
+        self._jsonl = open(self.jsonl_path, 'w', encoding='utf-8')
+        self._csv_file = None
+        self._csv = None
+
+    def write(self, record: Dict[str, Any]):
+        self._jsonl.write(json.dumps(record, ensure_ascii=False))
+        self._jsonl.write('\n')
+        if self.csv_path:
+            if self._csv is None:
+                fieldnames = list(record.keys())
+                fieldnames += [k for k in self.extra_fields if k not in record]
+                self._csv_file = open(self.csv_path, 'w', encoding='utf-8', newline='')
+                self._csv = csv.DictWriter(self._csv_file, fieldnames=fieldnames, extrasaction='ignore')
+                self._csv.writeheader()
+            self._csv.writerow(record)
+        self.count += 1
+
+    def write_many(self, records: Iterable[Dict[str, Any]]):
+        for record in records:
+            self.write(record)
+
+    def close(self):
+        self._jsonl.close()
+        if self._csv_file is not None:
+            self._csv_file.close()
+
+    def __enter__(self) -> 'RecordWriter':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+JFinder Geo Table - Typed column ingestion for listings CSV
+===========================================================
+Đọc CSV listings thẳng thành cột thay vì một dict chuỗi cho mỗi dòng:
+
+- latitude/longitude: mảng float64 (ô trống / không parse được -> NaN);
+- province/district/ward: mã int32 + bảng tên (dictionary, theo thứ tự
+  xuất hiện đầu tiên);
+- các cột khác: giữ nguyên các dòng CSV, chỉ ghép thành record khi ghi
+  output.
+
+Bước PIP batch và report của geo_normalize dùng trực tiếp các mảng này.
+
+Usage:
+    table = read_csv_table(Path("app/data/listings_vn_postmerge.csv"))
+    lats, lons = table.lats, table.lons
+    codes, names = table.categorical('district')
+    for record in table.records({'geo_status': statuses}): ...
+"""
+
+import csv
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from geo_spatial import to_coord_array
+
+ADMIN_FIELDS = ('province', 'district', 'ward')
+
+
+def parse_coords(values: Sequence[Optional[str]]) -> np.ndarray:
+    """Coordinate strings to float64 in one NumPy conversion (None -> NaN).
+
+    Columns with empty or unparsable cells fall back to the per-value
+    to_coord_array (which maps them to NaN).
+    """
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return to_coord_array(list(values))
+
+
+def encode_categorical(values: Sequence[Any]) -> Tuple[np.ndarray, List[Any]]:
+    """(int32 codes, categories) with categories in first-seen order."""
+    categories: Dict[Any, int] = {}
+    codes = np.fromiter((categories.setdefault(v, len(categories)) for v in values),
+                        dtype=np.int32, count=len(values))
+    return codes, list(categories)
+
+
+class ListingTable:
+    """Listings held as raw CSV rows plus typed columns.
+
+    `rows` are the CSV rows as read (lists of str, padded to the header);
+    the typed views are `lats`/`lons` (float64) and the dictionary-coded
+    province/district/ward. Record dicts are only built by records().
+    """
+
+    def __init__(self, fieldnames: List[str], rows: List[List[Optional[str]]], _typed: Optional[Dict] = None):
+        self.fieldnames = fieldnames
+        self.rows = rows
+        self._index = {field: i for i, field in enumerate(fieldnames)}
+        if _typed is None:
+            _typed = {
+                'lats': parse_coords(self.column('latitude')),
+                'lons': parse_coords(self.column('longitude')),
+                'categorical': {field: encode_categorical(self.column(field)) for field in ADMIN_FIELDS},
+            }
+        self.lats: np.ndarray = _typed['lats']
+        self.lons: np.ndarray = _typed['lons']
+        self._categorical = _typed['categorical']
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def column(self, field: str) -> List[Optional[str]]:
+        """Raw values of one CSV field (all None when the CSV has no such column)."""
+        i = self._index.get(field)
+        if i is None:
+            return [None] * len(self.rows)
+        return [row[i] for row in self.rows]
+
+    def categorical(self, field: str) -> Tuple[np.ndarray, List[Optional[str]]]:
+        """(codes, names) of province, district or ward (None = missing)."""
+        return self._categorical[field]
+
+    def slice(self, start: int, stop: int) -> 'ListingTable':
+        """Rows [start, stop) as a new table sharing the parsed columns (a batch / worker shard)."""
+        rows = slice(start, stop)
+        return ListingTable(self.fieldnames, self.rows[rows], {
+            'lats': self.lats[rows],
+            'lons': self.lons[rows],
+            'categorical': {field: (codes[rows], names) for field, (codes, names) in self._categorical.items()},
+        })
+
+    def records(self, updates: Dict[str, Sequence[Any]]) -> Iterator[Dict[str, Any]]:
+        """Record dicts for output: CSV fields, with `updates` columns set or added.
+
+        Existing fields keep their position; new fields follow the CSV
+        columns in the order of `updates`.
+        """
+        fieldnames = self.fieldnames
+        for i, row in enumerate(self.rows):
+            record = dict(zip(fieldnames, row))
+            for field, values in updates.items():
+                record[field] = values[i]
+            yield record
+
+
+def read_csv_table(path: Path) -> ListingTable:
+    """Read a listings CSV into a ListingTable (one csv.reader pass, no per-row dicts).
+
+    Short rows are padded with None like csv.DictReader; values beyond
+    the header are dropped.
+    """
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        fieldnames = next(reader, [])
+        rows = [row for row in reader if row]  # DictReader skips blank lines too
+
+    width = len(fieldnames)
+    if any(len(row) != width for row in rows):
+        rows = [row[:width] + [None] * (width - len(row)) for row in rows]
+    return ListingTable(fieldnames, rows)
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+JFinder Geo Text - Shared Vietnamese admin-name normalizer
+==========================================================
+Chuẩn hóa tên hành chính (tỉnh/quận/phường) dùng chung cho
+geo_normalize.py, geo_normalize_admin.py và geo_qa.py.
+
+- Bảng dịch ký tự tiếng Việt được build một lần (str.translate)
+- Regex được compile sẵn
+- Kết quả được memo theo (name, level) với cache có giới hạn
+
+Levels:
+    text           plain normalized text
+    province       geo_normalize: no prefix removal
+    district       geo_normalize: strip DISTRICT_PREFIXES
+    ward           geo_normalize: strip WARD_PREFIXES
+    gadm_district  geo_normalize_admin: compact key, "Quận 1" -> "1"
+    gadm_ward      geo_normalize_admin: compact key without prefix/spaces
+    compact        geo_qa: compact district/ward key
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+# ==============================================================================
+# CONSTANTS
+# ==============================================================================
+
+# Vietnamese character mapping for normalization
+VIET_CHARS = {
+    'à': 'a', 'á': 'a', 'ả': 'a', 'ã': 'a', 'ạ': 'a',
+    'ă': 'a', 'ằ': 'a', 'ắ': 'a', 'ẳ': 'a', 'ẵ': 'a', 'ặ': 'a',
+    'â': 'a', 'ầ': 'a', 'ấ': 'a', 'ẩ': 'a', 'ẫ': 'a', 'ậ': 'a',
+    'è': 'e', 'é': 'e', 'ẻ': 'e', 'ẽ': 'e', 'ẹ': 'e',
+    'ê': 'e', 'ề': 'e', 'ế': 'e', 'ể': 'e', 'ễ': 'e', 'ệ': 'e',
+    'ì': 'i', 'í': 'i', 'ỉ': 'i', 'ĩ': 'i', 'ị': 'i',
+    'ò': 'o', 'ó': 'o', 'ỏ': 'o', 'õ': 'o', 'ọ': 'o',
+    'ô': 'o', 'ồ': 'o', 'ố': 'o', 'ổ': 'o', 'ỗ': 'o', 'ộ': 'o',
+    'ơ': 'o', 'ờ': 'o', 'ớ': 'o', 'ở': 'o', 'ỡ': 'o', 'ợ': 'o',
+    'ù': 'u', 'ú': 'u', 'ủ': 'u', 'ũ': 'u', 'ụ': 'u',
+    'ư': 'u', 'ừ': 'u', 'ứ': 'u', 'ử': 'u', 'ữ': 'u', 'ự': 'u',
+    'ỳ': 'y', 'ý': 'y', 'ỷ': 'y', 'ỹ': 'y', 'ỵ': 'y',
+    'đ': 'd', 'Đ': 'd'
+}
+
+# geo_normalize prefixes (matched on the raw, lowercased name)
+DISTRICT_PREFIXES = ["quận", "huyện", "thành phố", "thị xã", "tx", "tp"]
+WARD_PREFIXES = ["phường", "xã", "thị trấn", "tt", "p."]
+
+# geo_normalize_admin prefixes (matched on normalized text, longest first)
+ADMIN_PREFIXES = [
+    "thành phố", "tỉnh", "quận", "huyện", "thị xã",
+    "phường", "xã", "thị trấn", "tp", "tx", "tt", "p", "q", "h"
+]
+
+# geo_qa prefixes (matched on normalized text, in order)
+QA_PREFIXES = ['quan', 'huyen', 'thi xa', 'phuong', 'xa', 'thi tran', 'thanh pho']
+
+# Max (name, level) entries kept in memory. Admin names repeat heavily, so
+# the working set for 3 cities is a few thousand entries.
+NORMALIZE_CACHE_SIZE = 65536
+
+_VIET_TABLE = str.maketrans(VIET_CHARS)
+_PUNCT_RE = re.compile(r'[^\w\s]')
+_SPACE_RE = re.compile(r'\s+')
+_NUMBER_RE = re.compile(r'\d+')
+_DIGITS_ONLY_RE = re.compile(r'^(\d+)$')
+
+# ==============================================================================
+# UNCACHED CORE
+# ==============================================================================
+
+def _normalize_text(text) -> str:
+    """Lowercase, strip diacritics and punctuation, collapse spaces."""
+    if not text:
+        return ""
+    text = str(text).lower().strip()
+    text = unicodedata.normalize('NFC', text)
+    text = text.translate(_VIET_TABLE)
+    text = _PUNCT_RE.sub('', text)
+    return _SPACE_RE.sub(' ', text).strip()
+
+
+_ADMIN_PREFIXES_NORM = [_normalize_text(p) for p in sorted(ADMIN_PREFIXES, key=len, reverse=True)]
+
+
+def _strip_raw_prefix(name: str, prefixes) -> str:
+    """Remove administrative prefixes from the raw name (geo_normalize)."""
+    name = str(name)
+    name_lower = name.lower().strip()
+    for prefix in prefixes:
+        if name_lower.startswith(prefix + " "):
+            return name[len(prefix)+1:].strip()
+        if name_lower.startswith(prefix + "."):
+            return name[len(prefix)+1:].strip()
+    return name
+
+
+def _gadm_ward(name) -> str:
+    """Remove administrative prefixes and spaces for GADM matching."""
+    name_lower = _normalize_text(name)
+    for prefix_norm in _ADMIN_PREFIXES_NORM:
+        if name_lower.startswith(prefix_norm + " "):
+            result = name_lower[len(prefix_norm)+1:].strip()
+            return result.replace(" ", "")
+        if name_lower.startswith(prefix_norm):
+            rest = name_lower[len(prefix_norm):].strip()
+            if rest and rest[0].isdigit():
+                return rest
+    return name_lower.replace(" ", "")
+
+
+def _gadm_district(name) -> str:
+    """Normalize district numbers (Quận 1 -> 1) and remove spaces."""
+    name_clean = _gadm_ward(name)
+    match = _DIGITS_ONLY_RE.match(name_clean)
+    if match:
+        return match.group(1)
+    return name_clean.replace(" ", "")
+
+
+def _compact(name) -> str:
+    """geo_qa key: normalized, prefix removed ("quan 1" and "quan1"), no spaces."""
+    name = _normalize_text(name)
+    for prefix in QA_PREFIXES:
+        if name.startswith(prefix + ' '):
+            name = name[len(prefix)+1:].strip()
+        elif name.startswith(prefix) and len(name) > len(prefix) and name[len(prefix)].isdigit():
+            name = name[len(prefix):].strip()
+    return name.replace(' ', '')
+
+
+_LEVELS = {
+    'text': _normalize_text,
+    'province': _normalize_text,
+    'district': lambda n: _normalize_text(_strip_raw_prefix(n, DISTRICT_PREFIXES)),
+    'ward': lambda n: _normalize_text(_strip_raw_prefix(n, WARD_PREFIXES)),
+    'gadm_district': _gadm_district,
+    'gadm_ward': _gadm_ward,
+    'compact': _compact,
+}
+
+# ==============================================================================
+# PUBLIC API
+# ==============================================================================
+
+# Hits/misses reported by worker processes (see geo_parallel)
+_worker_counts = {'hits': 0, 'misses': 0}
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _normalize_cached(name, level: str) -> str:
+    return _LEVELS[level](name)
+
+
+def normalize(name, level: str = 'text') -> str:
+    """Normalize an admin name for the given level (memoized)."""
+    if not name:
+        return ""
+    if level not in _LEVELS:
+        raise ValueError(f"Unknown normalize level: {level}")
+    return _normalize_cached(name, level)
+
+
+def normalize_text(text) -> str:
+    """Normalize Vietnamese text for matching."""
+    return normalize(text, 'text')
+
+
+def extract_number(text: str) -> Optional[int]:
+    """Extract number from text like 'Quận 1' -> 1."""
+    match = _NUMBER_RE.search(text)
+    return int(match.group()) if match else None
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Memo cache statistics (hits, misses, size, hit_rate).
+
+    Hits and misses include those merged in from worker processes.
+    """
+    info = _normalize_cached.cache_info()
+    hits = info.hits + _worker_counts['hits']
+    misses = info.misses + _worker_counts['misses']
+    lookups = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'size': info.currsize,
+        'maxsize': info.maxsize,
+        'hit_rate': round(hits / lookups, 4) if lookups > 0 else 0,
+    }
+
+
+def format_cache_stats() -> str:
+    """One-line summary of the memo cache for console output."""
+    s = cache_stats()
+    return (f"Name normalizer cache: {s['hits']} hits / {s['misses']} misses "
+            f"({s['hit_rate'] * 100:.1f}% hit rate, {s['size']} entries)")
+
+
+def clear_cache():
+    """Reset the memo cache and its statistics."""
+    _normalize_cached.cache_clear()
+    _worker_counts.update(hits=0, misses=0)
+
+
+def add_worker_stats(hits: int, misses: int):
+    """Merge memo cache hits/misses counted in a worker process."""
+    _worker_counts['hits'] += hits
+    _worker_counts['misses'] += misses
@@ -1,11 +1,25 @@
 """
 Import JFinder data from JSON file to PostgreSQL database
 Updated schema for verified dataset with market_segment, type, frontage
+
+Usage:
+    python scripts/import_to_postgres.py                                  # execute_values, one batch
+    python scripts/import_to_postgres.py --method copy                    # streamed COPY FROM STDIN (CSV)
+    python scripts/import_to_postgres.py --method copy --format binary -i out/listings.jsonl
 """
+import argparse
+import io
 import psycopg2
 from psycopg2.extras import execute_values
 import json
+import re
+import struct
+import time
+from datetime import datetime
 from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Tuple
+
+from geo_stream import iter_records
 
 # Configuration
 DATA_FILE = Path(__file__).parent.parent / "app" / "data" / "listings_vn_postmerge.json"
@@ -17,11 +31,30 @@ POSTGRES_CONFIG = {
     "password": "jfinder_password"
 }
 
-def load_data():
+# Table columns in order, with the kind used to encode COPY rows
+# (must match the CREATE TABLE below)
+COLUMNS = [
+    ("id", "text"), ("name", "text"), ("address", "text"),
+    ("province", "text"), ("district", "text"), ("ward", "text"), ("admin_codes", "text"),
+    ("latitude", "real"), ("longitude", "real"), ("type", "text"), ("market_segment", "text"),
+    ("area", "real"), ("frontage", "real"), ("floors", "int"), ("rent_per_sqm_million", "real"),
+    ("price", "real"), ("currency", "text"), ("price_unit", "text"),
+    ("images", "text"), ("amenities_schools", "int"), ("amenities_offices", "int"), ("amenities_competitors", "int"),
+    ("ai_suggested_price", "real"), ("ai_potential_score", "real"), ("ai_risk_level", "text"),
+    ("views", "int"), ("saved_count", "int"), ("posted_at", "timestamp"),
+    ("owner_name", "text"), ("owner_phone", "text"), ("primary_image_url", "text"),
+    ("image_source", "text"), ("image_author", "text"), ("image_license_names", "text"), ("image_license_urls", "text"),
+    ("image_page_url", "text"), ("image_required_credit", "text"),
+]
+COLUMN_NAMES = ", ".join(name for name, _ in COLUMNS)
+# Rows per encoded chunk handed to COPY
+COPY_CHUNK_ROWS = 1000
+
+def load_data(path=DATA_FILE):
     """Load data from JSON file"""
-    print(f"📥 Loading data from {DATA_FILE}...")
+    print(f"📥 Loading data from {path}...")
     try:
-        with open(DATA_FILE, 'r', encoding='utf-8') as f:
+        with open(path, 'r', encoding='utf-8') as f:
             data = json.load(f)
         print(f"✅ Loaded {len(data)} listings")
         return data
@@ -83,7 +116,12 @@ def create_table(conn):
 
     cursor.execute(create_table_sql)
 
-    # Create indexes for common queries
+    conn.commit()
+    print("✅ Table created successfully")
+
+def create_indexes(conn):
+    """Create indexes for common queries"""
+    cursor = conn.cursor()
     cursor.execute("CREATE INDEX idx_province ON jfinder_listings(province);")
     cursor.execute("CREATE INDEX idx_district ON jfinder_listings(district);")
     cursor.execute("CREATE INDEX idx_type ON jfinder_listings(type);")
@@ -91,101 +129,241 @@ def create_table(conn):
     cursor.execute("CREATE INDEX idx_price ON jfinder_listings(price);")
     cursor.execute("CREATE INDEX idx_area ON jfinder_listings(area);")
     cursor.execute("CREATE INDEX idx_lat_lon ON jfinder_listings(latitude, longitude);")
-
     conn.commit()
-    print("✅ Table created successfully")
+
+# The usual owner string, parsed without ast.literal_eval
+OWNER_PATTERN = re.compile(r"\{'name': '([^'\\]*)', 'phone': '([^'\\]*)'\}")
+
+def parse_owner(owner_str):
+    """Parse owner string like {'name': 'X', 'phone': 'Y'}"""
+    if not owner_str:
+        return None, None
+    if isinstance(owner_str, dict):
+        return owner_str.get('name'), owner_str.get('phone')
+    match = OWNER_PATTERN.fullmatch(owner_str)
+    if match:
+        return match.group(1), match.group(2)
+    try:
+        import ast
+        owner_dict = ast.literal_eval(owner_str)
+        return owner_dict.get('name'), owner_dict.get('phone')
+    except:
+        return None, None
+
+def listing_row(listing: Dict[str, Any]) -> Tuple:
+    """Table row (COLUMNS order) for one listing"""
+    owner_name, owner_phone = parse_owner(listing.get('owner'))
+    return (
+        listing.get('id'),
+        listing.get('name'),
+        listing.get('address'),
+        listing.get('province'),
+        listing.get('district'),
+        listing.get('ward'),
+        listing.get('admin_codes'),
+        listing.get('latitude'),
+        listing.get('longitude'),
+        listing.get('type'),
+        listing.get('market_segment'),
+        listing.get('area'),
+        listing.get('frontage'),
+        listing.get('floors'),
+        listing.get('rent_per_sqm_million'),
+        listing.get('price'),
+        listing.get('currency', 'VND'),
+        listing.get('price_unit', 'million_vnd_per_month'),
+        listing.get('images'),
+        listing.get('amenities_schools'),
+        listing.get('amenities_offices'),
+        listing.get('amenities_competitors'),
+        listing.get('ai_suggested_price'),
+        listing.get('ai_potential_score'),
+        listing.get('ai_risk_level'),
+        listing.get('views'),
+        listing.get('savedCount'),
+        listing.get('posted_at'),
+        owner_name,
+        owner_phone,
+        listing.get('primary_image_url'),
+        listing.get('image_source'),
+        listing.get('image_author'),
+        listing.get('image_license_names'),
+        listing.get('image_license_urls'),
+        listing.get('image_page_url'),
+        listing.get('image_required_credit')
+    )
 
 def insert_data(conn, listings):
     """Insert listings into PostgreSQL with new schema"""
     print(f"💾 Inserting {len(listings)} listings...")
+    start = time.perf_counter()
 
     cursor = conn.cursor()
+    insert_sql = f"INSERT INTO jfinder_listings ({COLUMN_NAMES}) VALUES %s"
+    execute_values(cursor, insert_sql, [listing_row(listing) for listing in listings])
+    conn.commit()
+
+    seconds = time.perf_counter() - start
+    print(f"✅ Inserted {len(listings)} records successfully "
+          f"in {seconds:.2f}s ({len(listings) / max(seconds, 1e-9):,.0f} rows/s)")
+
+# ==============================================================================
+# COPY loader
+# ==============================================================================
+
+PG_EPOCH = datetime(2000, 1, 1)
+BINARY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+BINARY_NULL = struct.pack("!i", -1)
+_INT32 = struct.Struct("!i")
+_REAL = struct.Struct("!if")
+_INTEGER = struct.Struct("!ii")
+_TIMESTAMP = struct.Struct("!iq")
+
+def _binary_text(value):
+    data = str(value).encode("utf-8")
+    return _INT32.pack(len(data)) + data
+
+def _binary_real(value):
+    return _REAL.pack(4, float(value))
+
+def _binary_int(value):
+    return _INTEGER.pack(4, int(value))
 
-    insert_sql = """
-    INSERT INTO jfinder_listings (
-        id, name, address, province, district, ward, admin_codes,
-        latitude, longitude, type, market_segment,
-        area, frontage, floors, rent_per_sqm_million, price, currency, price_unit,
-        images, amenities_schools, amenities_offices, amenities_competitors,
-        ai_suggested_price, ai_potential_score, ai_risk_level,
-        views, saved_count, posted_at,
-        owner_name, owner_phone, primary_image_url,
-        image_source, image_author, image_license_names, image_license_urls,
-        image_page_url, image_required_credit
-    ) VALUES %s
+def _binary_timestamp(value):
+    stamp = value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+    delta = stamp.replace(tzinfo=None) - PG_EPOCH  # timestamp without time zone ignores the offset
+    return _TIMESTAMP.pack(8, (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds)
+
+# Binary field encoders per column kind (length prefix included); NULL is handled by encode_binary
+BINARY_ENCODERS = {"text": _binary_text, "real": _binary_real, "int": _binary_int, "timestamp": _binary_timestamp}
+
+def _csv_text(value):
+    return '"' + str(value).replace('"', '""') + '"'
+
+def _csv_real(value):
+    return repr(float(value))
+
+def _csv_int(value):
+    return str(int(value))
+
+# COPY ... (FORMAT csv): an unquoted empty field is NULL, text is always quoted so "" stays ""
+CSV_ENCODERS = {"text": _csv_text, "real": _csv_real, "int": _csv_int, "timestamp": _csv_text}
+
+def encode_csv(rows: Iterable[Tuple]) -> Iterator[bytes]:
+    """COPY CSV bytes for rows, COPY_CHUNK_ROWS rows per chunk
+
+    NULL (None, or "" outside text columns) is written as an unquoted empty field.
+    """
+    columns = [(CSV_ENCODERS[kind], kind != "text") for _, kind in COLUMNS]
+    lines = []
+    for i, row in enumerate(rows, 1):
+        lines.append(",".join(["" if value is None or (typed and value == "") else encode(value)
+                               for value, (encode, typed) in zip(row, columns)]))
+        if i % COPY_CHUNK_ROWS == 0:
+            lines.append("")
+            yield "\n".join(lines).encode("utf-8")
+            lines = []
+    if lines:
+        lines.append("")
+        yield "\n".join(lines).encode("utf-8")
+
+def encode_binary(rows: Iterable[Tuple]) -> Iterator[bytes]:
+    """COPY binary bytes (header, tuples, trailer) for rows, COPY_CHUNK_ROWS rows per chunk
+
+    Each field is an int32 length (-1 = NULL) and the big-endian value.
     """
+    columns = [(BINARY_ENCODERS[kind], kind != "text") for _, kind in COLUMNS]
+    field_count = struct.pack("!h", len(COLUMNS))
+    yield BINARY_HEADER
+    parts = []
+    for i, row in enumerate(rows, 1):
+        parts.append(field_count)
+        parts.extend(BINARY_NULL if value is None or (typed and value == "") else encode(value)
+                     for value, (encode, typed) in zip(row, columns))
+        if i % COPY_CHUNK_ROWS == 0:
+            yield b"".join(parts)
+            parts = []
+    parts.append(struct.pack("!h", -1))
+    yield b"".join(parts)
 
-    def parse_owner(owner_str):
-        """Parse owner string like {'name': 'X', 'phone': 'Y'}"""
-        if not owner_str:
-            return None, None
-        if isinstance(owner_str, dict):
-            return owner_str.get('name'), owner_str.get('phone')
-        try:
-            import ast
-            owner_dict = ast.literal_eval(owner_str)
-            return owner_dict.get('name'), owner_dict.get('phone')
-        except:
-            return None, None
-
-    values = []
-    for listing in listings:
-        owner_name, owner_phone = parse_owner(listing.get('owner'))
-
-        values.append((
-            listing.get('id'),
-            listing.get('name'),
-            listing.get('address'),
-            listing.get('province'),
-            listing.get('district'),
-            listing.get('ward'),
-            listing.get('admin_codes'),
-            listing.get('latitude'),
-            listing.get('longitude'),
-            listing.get('type'),
-            listing.get('market_segment'),
-            listing.get('area'),
-            listing.get('frontage'),
-            listing.get('floors'),
-            listing.get('rent_per_sqm_million'),
-            listing.get('price'),
-            listing.get('currency', 'VND'),
-            listing.get('price_unit', 'million_vnd_per_month'),
-            listing.get('images'),
-            listing.get('amenities_schools'),
-            listing.get('amenities_offices'),
-            listing.get('amenities_competitors'),
-            listing.get('ai_suggested_price'),
-            listing.get('ai_potential_score'),
-            listing.get('ai_risk_level'),
-            listing.get('views'),
-            listing.get('savedCount'),
-            listing.get('posted_at'),
-            owner_name,
-            owner_phone,
-            listing.get('primary_image_url'),
-            listing.get('image_source'),
-            listing.get('image_author'),
-            listing.get('image_license_names'),
-            listing.get('image_license_urls'),
-            listing.get('image_page_url'),
-            listing.get('image_required_credit')
-        ))
-
-    execute_values(cursor, insert_sql, values)
+class ChunkReader(io.RawIOBase):
+    """Read-only file over an iterator of byte chunks (what cursor.copy_expert reads from)"""
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._buffer = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._buffer:
+            try:
+                self._buffer = next(self._chunks)
+            except StopIteration:
+                return 0
+        n = min(len(buffer), len(self._buffer))
+        buffer[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+def copy_data(conn, listings: Iterable[Dict[str, Any]], fmt: str = "csv"):
+    """Stream listings into the table with COPY FROM STDIN, then verify the row count.
+
+    Rows are built and encoded lazily from the `listings` iterator, so only
+    one chunk is in client memory at a time. The copied count reported by
+    the server and the table's count(*) must both equal the rows sent,
+    otherwise the load is rolled back.
+    """
+    print(f"💾 Copying listings (COPY FROM STDIN, {fmt})...")
+    start = time.perf_counter()
+    sent = 0
+
+    def rows():
+        nonlocal sent
+        for listing in listings:
+            sent += 1
+            yield listing_row(listing)
+
+    encode = encode_binary if fmt == "binary" else encode_csv
+    cursor = conn.cursor()
+    options = "FORMAT binary" if fmt == "binary" else "FORMAT csv"
+    cursor.copy_expert(f"COPY jfinder_listings ({COLUMN_NAMES}) FROM STDIN WITH ({options})",
+                       ChunkReader(encode(rows())), size=1 << 16)
+    copied = cursor.rowcount
+    cursor.execute("SELECT count(*) FROM jfinder_listings")
+    in_table = cursor.fetchone()[0]
+    if not sent == copied == in_table:
+        conn.rollback()
+        raise RuntimeError(f"Row count mismatch: sent {sent}, copied {copied}, in table {in_table}")
     conn.commit()
 
-    print(f"✅ Inserted {len(listings)} records successfully")
+    seconds = time.perf_counter() - start
+    print(f"✅ Copied {sent} records (verified: {in_table} in table) "
+          f"in {seconds:.2f}s ({sent / max(seconds, 1e-9):,.0f} rows/s)")
+    return sent
 
 def main():
+    parser = argparse.ArgumentParser(description='Import JFinder listings into PostgreSQL')
+    parser.add_argument('--input', '-i', type=Path, default=DATA_FILE,
+                        help='Listings JSON (COPY also reads JSONL / CSV, streamed)')
+    parser.add_argument('--method', choices=('values', 'copy'), default='values',
+                        help='values: one execute_values batch; copy: streamed COPY FROM STDIN')
+    parser.add_argument('--format', choices=('csv', 'binary'), default='csv', help='COPY format (--method copy)')
+    args = parser.parse_args()
+
     print("\n" + "="*60)
     print("🚀 JFinder → PostgreSQL Import Tool (New Schema)")
     print("="*60 + "\n")
 
-    # Step 1: Load data from file
-    listings = load_data()
-    if not listings:
-        print("\n❌ No data to import")
+    # Step 1: Load data from file (COPY streams it while loading instead)
+    if args.method == 'values':
+        listings = load_data(args.input)
+        if not listings:
+            print("\n❌ No data to import")
+            return
+    elif not args.input.exists():
+        print(f"\n❌ Input not found: {args.input}")
         return
 
     # Step 2: Connect to PostgreSQL
@@ -201,15 +379,21 @@ def main():
         # Step 3: Create table
         create_table(conn)
 
-        # Step 4: Insert data
-        insert_data(conn, listings)
+        # Step 4: Insert data (COPY loads into the bare table, indexes come after)
+        if args.method == 'copy':
+            count = copy_data(conn, iter_records(args.input), args.format)
+            create_indexes(conn)
+        else:
+            create_indexes(conn)
+            insert_data(conn, listings)
+            count = len(listings)
 
         print("\n" + "="*60)
         print("✅ SUCCESS! Data imported to PostgreSQL")
         print("="*60)
         print(f"\n📊 Database: jfinder_db")
         print(f"📁 Table: jfinder_listings")
-        print(f"📈 Records: {len(listings)}")
+        print(f"📈 Records: {count}")
         print(f"\n🌐 Next steps:")
         print(f"   1. Open http://localhost:8088")
         print(f"   2. The PostgreSQL connection already exists")